@@ -0,0 +1,9 @@
+"""
+benchmarks
+==========
+
+Benchmarks for cc_backend_lib, run against local stand-ins for the upstream
+APIs. Run with:
+
+    python -m benchmarks --help
+"""
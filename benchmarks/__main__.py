@@ -0,0 +1,56 @@
+import sys
+import asyncio
+import argparse
+from . import harness, synthetic, stand_in
+from . import bench_dal, bench_clients, bench_import, bench_either, bench_aggregation, bench_spatial, bench_simplify, bench_offload # pylint: disable=unused-import
+
+def arguments() -> argparse.Namespace:
+    defaults = synthetic.Config()
+    parser = argparse.ArgumentParser(prog = "python -m benchmarks", description = "Run cc_backend_lib benchmarks")
+    parser.add_argument("names", nargs = "*", help = "Run only benchmarks whose names start with these prefixes")
+    parser.add_argument("--repeat", type = int, default = 5)
+    parser.add_argument("--predictions", type = int, default = defaults.predictions_per_shift, help = "Predictions per shift")
+    parser.add_argument("--countries", type = int, default = defaults.countries)
+    parser.add_argument("--users", type = int, default = defaults.users)
+    parser.add_argument("--geometry-points", type = int, default = defaults.geometry_points, help = "Vertices per polygon")
+    parser.add_argument("--shifts", type = int, default = defaults.shifts)
+    parser.add_argument("--latency", type = float, default = defaults.latency, help = "Seconds of latency added to each response")
+    parser.add_argument("--memory", action = "store_true", help = "Also measure peak and retained memory with tracemalloc")
+    parser.add_argument("--save", help = "Write results to this JSON file")
+    parser.add_argument("--compare", help = "Compare results with a JSON file written with --save")
+    parser.add_argument("--threshold", type = float, default = 0.2, help = "Allowed relative slowdown when comparing")
+    return parser.parse_args()
+
+async def main(args: argparse.Namespace) -> int:
+    config = synthetic.Config(
+            predictions_per_shift = args.predictions,
+            countries = args.countries,
+            users = args.users,
+            geometry_points = args.geometry_points,
+            shifts = args.shifts,
+            latency = args.latency)
+
+    names = [n for n in harness.BENCHMARKS if not args.names or any(n.startswith(p) for p in args.names)]
+    results = []
+    async with stand_in.StandIn(config) as server:
+        env = harness.Environment(server)
+        for name in names:
+            result = await harness.run(name, env, args.repeat, args.memory)
+            results.append(result)
+            line = f"{name:<40} median {result.median * 1000:9.2f}ms   min {result.min * 1000:9.2f}ms"
+            if result.peak_bytes is not None:
+                line += f"   peak {result.peak_bytes / 1024:9.1f}KiB   retained {result.retained_bytes / 1024:9.1f}KiB"
+            print(line)
+
+    if args.save:
+        harness.save(results, args.save)
+
+    if args.compare:
+        regressions = harness.compare(results, args.compare, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(arguments())))
@@ -0,0 +1,22 @@
+"""
+Aggregation benchmarks, comparing exact distinct counting of participants
+with sets to approximate counting with HyperLogLogs. Run with --memory to
+compare the memory used, and with a large --users to see the difference.
+"""
+from cc_backend_lib import aggregation
+from .harness import benchmark
+
+def _tally_benchmark(approximate: bool):
+    async def bench(env):
+        features = (await env.predictions().list()).value.features
+        return lambda: aggregation.tally_countries(features, approximate)
+    benchmark("aggregation.tally_countries" + (".approximate" if approximate else ".exact"))(bench)
+
+_tally_benchmark(False)
+_tally_benchmark(True)
+
+@benchmark("dal.participant_summaries.approximate")
+async def participant_summaries_approximate(env):
+    client = env.dal()
+    shifts = range(-env.config.shifts + 1, 1)
+    return lambda: client.participant_summaries(shifts, [None, 400, 401], approximate = True)
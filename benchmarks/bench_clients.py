@@ -0,0 +1,76 @@
+"""
+Client deserialization and cache serializer benchmarks. Payloads are
+fetched from the stand-in APIs once, and only the parsing is timed.
+
+Deserialization is measured with each available JSON backend, both with full
+validation and in trusted mode, to quantify the gain per model type.
+"""
+from cc_backend_lib import models, json_backend
+from cc_backend_lib.cache import pydantic_serializer, redis_cache
+from .harness import benchmark
+
+async def _payload(client, path: str) -> bytes:
+    return (await client._get(path, client._parameters())).value
+
+def _with_backend(backend: json_backend.Backend, operation):
+    def inner():
+        previous = json_backend.get_backend()
+        json_backend.set_backend(backend)
+        try:
+            return operation()
+        finally:
+            json_backend.set_backend(previous)
+    return inner
+
+def _deserialization_benchmarks(name: str, client_name: str, path: str, method: str, times: int = 1):
+    """
+    Registers deserialization benchmarks for each JSON backend, with and
+    without validation (trusted), named deserialize.{name}.{backend}[.trusted]
+    """
+    backends = [b for b in (json_backend.STDLIB, json_backend.ORJSON) if b is not None]
+    for backend in backends:
+        for trusted in (False, True):
+            async def bench(env, backend = backend, trusted = trusted):
+                client = getattr(env, client_name)(trusted = trusted)
+                data = await _payload(client, client._path(path))
+                deserialize = getattr(client, method)
+                return _with_backend(backend, lambda: [deserialize(data) for _ in range(times)])
+
+            benchmark(f"deserialize.{name}.{backend.name}" + (".trusted" if trusted else ""))(bench)
+
+_deserialization_benchmarks("predictions", "predictions", "", "deserialize_list")
+_deserialization_benchmarks("prediction", "predictions", "1/", "deserialize_detail", times = 100)
+_deserialization_benchmarks("country", "countries", "400/", "deserialize_detail")
+_deserialization_benchmarks("country_list", "countries", "", "deserialize_list")
+_deserialization_benchmarks("user", "users", "1/", "deserialize_detail", times = 100)
+
+@benchmark("serializer.predictions.dumps")
+async def serializer_dumps(env):
+    predictions = (await env.predictions().list()).value
+    serializer = pydantic_serializer.PydanticSerializer(models.prediction.PredFeatureCollection)
+    return lambda: serializer.dumps(predictions)
+
+@benchmark("serializer.predictions.loads")
+async def serializer_loads(env):
+    predictions = (await env.predictions().list()).value
+    serializer = pydantic_serializer.PydanticSerializer(models.prediction.PredFeatureCollection)
+    data = serializer.dumps(predictions)
+    return lambda: serializer.loads(data)
+
+def _redis_encoding_benchmark(name: str, compress_threshold):
+    async def bench(env):
+        predictions = (await env.predictions().list()).value
+        data = pydantic_serializer.PydanticSerializer(models.prediction.PredFeatureCollection).dumps(predictions)
+        # Only encodes and decodes, no connection is made
+        cache = redis_cache.RedisCache("localhost", compress_threshold = compress_threshold)
+        return lambda: cache._decode(cache._encode(data))
+    benchmark("cache.redis.encoding." + name)(bench)
+
+_redis_encoding_benchmark("raw", None)
+_redis_encoding_benchmark("compressed", 1024)
+
+@benchmark("deserialize.user.anonymized")
+async def deserialize_user_anonymized(env):
+    client = env.users(anonymize = True)
+    data = await _payload(client, client._path("1/"))
+    return lambda: [client.deserialize_detail(data) for _ in range(100)]
@@ -0,0 +1,30 @@
+"""
+Dal benchmarks, made against the stand-in APIs.
+"""
+from .harness import benchmark
+
+@benchmark("dal.participant_summary")
+async def participant_summary(env):
+    client = env.dal()
+    return lambda: client.participant_summary(0)
+
+@benchmark("dal.participant_summary.country")
+async def participant_summary_country(env):
+    client = env.dal()
+    return lambda: client.participant_summary(0, 400)
+
+@benchmark("dal.participants")
+async def participants(env):
+    client = env.dal()
+    return lambda: client.participants(0)
+
+@benchmark("dal.participants.compact")
+async def participants_compact(env):
+    client = env.dal()
+    return lambda: client.participants(0, compact = True)
+
+@benchmark("dal.participant_summaries")
+async def participant_summaries(env):
+    client = env.dal()
+    shifts = range(-env.config.shifts + 1, 1)
+    return lambda: client.participant_summaries(shifts, [None, 400, 401])
@@ -0,0 +1,18 @@
+"""
+Benchmarks of combining the results of large fan-outs of requests, such as
+the user detail requests made for participants.
+"""
+from pymonad.either import Left, Right
+from cc_backend_lib.errors import http_error
+from cc_backend_lib import helpers
+from .harness import benchmark
+
+@benchmark("either.combine_http_errors.right")
+async def combine_right(env):
+    results = [Right(i) for i in range(env.config.users)]
+    return lambda: helpers.combine_http_errors(results)
+
+@benchmark("either.combine_http_errors.left")
+async def combine_left(env):
+    results = [Left(http_error.HttpError(http_code = 404, message = f"User {i} not found")) for i in range(env.config.users)]
+    return lambda: helpers.combine_http_errors(results)
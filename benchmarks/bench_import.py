@@ -0,0 +1,26 @@
+"""
+Import time benchmarks. Each import is made in a fresh interpreter, and
+only the import itself is timed.
+"""
+import sys
+import subprocess
+from .harness import benchmark, Measured
+
+_TIMED_IMPORT = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+def _import_benchmark(module: str):
+    async def bench(env):
+        def operation():
+            process = subprocess.run([sys.executable, "-c", _TIMED_IMPORT.format(module = module)], check = True, capture_output = True)
+            return Measured(float(process.stdout))
+        return operation
+    benchmark(f"import.{module}")(bench)
+
+for _module in (
+        "cc_backend_lib",
+        "cc_backend_lib.dal",
+        "cc_backend_lib.models.user",
+        "cc_backend_lib.clients.users_client",
+        "cc_backend_lib.cache.redis_cache",
+        ):
+    _import_benchmark(_module)
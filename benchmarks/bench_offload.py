@@ -0,0 +1,69 @@
+"""
+Executor offload benchmarks. The loop_lag benchmarks measure how long the
+event loop is blocked (the longest delay of a 1ms ticker) while predictions
+are listed or summarized, which is the latency added to every other request
+served concurrently. The other benchmarks time the same operations.
+
+The stand-in server runs on the same event loop, so the time it takes to
+serve the response is included in all variants.
+"""
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from cc_backend_lib import dal
+from .harness import benchmark, Measured
+
+EXECUTORS = {
+        "inline": lambda: None,
+        "thread": lambda: ThreadPoolExecutor(2),
+        "process": lambda: ProcessPoolExecutor(2),
+    }
+
+async def _loop_lag(operation) -> Measured:
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - start - 0.001)
+
+    task = asyncio.get_running_loop().create_task(ticker())
+    try:
+        await operation()
+    finally:
+        done = True
+        await task
+    return Measured(lag)
+
+def _offload_benchmarks(executor_name: str):
+    async def list_predictions(env):
+        client = env.predictions(executor = EXECUTORS[executor_name](), offload_threshold = 0)
+        return client.list
+
+    async def summaries(env):
+        executor = EXECUTORS[executor_name]()
+        cc_dal = dal.Dal(
+                predictions = env.predictions(executor = executor, offload_threshold = 0),
+                scheduler = env.scheduler(cache_partitions = False),
+                users = env.users(),
+                countries = env.countries(),
+                executor = executor,
+                offload_threshold = 0)
+        return lambda: cc_dal.participant_summaries(range(-env.config.shifts + 1, 1), [None])
+
+    for name, bench in (("predictions.list", list_predictions), ("dal.participant_summaries", summaries)):
+        if name.startswith("dal") and executor_name == "process":
+            # Aggregation is not meant for process pools, see cc_backend_lib.dal.Dal
+            continue
+        benchmark(f"offload.{name}.{executor_name}")(bench)
+
+        async def lag(env, bench = bench):
+            operation = await bench(env)
+            return lambda: _loop_lag(operation)
+        benchmark(f"offload.loop_lag.{name}.{executor_name}")(lag)
+
+for _executor_name in EXECUTORS:
+    _offload_benchmarks(_executor_name)
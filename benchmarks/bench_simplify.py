@@ -0,0 +1,27 @@
+"""
+Geometry simplification benchmarks: processing predictions into zoom
+levels, and loading cached predictions at full resolution compared with a
+simplified level.
+"""
+from cc_backend_lib import models, simplify
+from cc_backend_lib.cache import pydantic_serializer
+from .harness import benchmark
+
+ZOOMS = (2, 5, 8)
+
+@benchmark("simplify.levels")
+async def levels(env):
+    predictions = (await env.predictions().list()).value
+    return lambda: simplify.levels(predictions, ZOOMS)
+
+def _loads_benchmark(zoom):
+    async def bench(env):
+        predictions = simplify.levels((await env.predictions().list()).value, [] if zoom is None else [zoom])[zoom]
+        serializer = pydantic_serializer.PydanticSerializer(models.prediction.PredFeatureCollection)
+        data = serializer.dumps(predictions)
+        return lambda: serializer.loads(data)
+    benchmark("simplify.loads." + ("full" if zoom is None else f"z{zoom}"))(bench)
+
+_loads_benchmark(None)
+for _zoom in ZOOMS:
+    _loads_benchmark(_zoom)
@@ -0,0 +1,38 @@
+"""
+Spatial index benchmarks: building an index over the predictions, and
+bounding box queries compared with a linear scan over the features (with
+their bounding boxes computed in advance).
+"""
+import random
+from cc_backend_lib import spatial
+from .harness import benchmark
+
+QUERIES = 100
+
+async def _features(env):
+    return (await env.predictions().list()).value.features
+
+def _boxes(count: int):
+    rng = random.Random(0)
+    boxes = []
+    for _ in range(count):
+        x, y = rng.uniform(-20, 50), rng.uniform(-30, 30)
+        boxes.append((x, y, x + 5, y + 5))
+    return boxes
+
+@benchmark("spatial.build")
+async def build(env):
+    features = await _features(env)
+    return lambda: spatial.SpatialIndex.from_features(features)
+
+@benchmark("spatial.query.index")
+async def query_index(env):
+    index = spatial.SpatialIndex.from_features(await _features(env))
+    boxes = _boxes(QUERIES)
+    return lambda: [index.query(box) for box in boxes]
+
+@benchmark("spatial.query.scan")
+async def query_scan(env):
+    entries = [(spatial.bbox(f.geometry), f) for f in await _features(env)]
+    boxes = _boxes(QUERIES)
+    return lambda: [[f for b, f in entries if spatial._intersects(b, box)] for box in boxes]
@@ -0,0 +1,132 @@
+"""
+harness
+=======
+
+Registration, timing and comparison of benchmarks.
+
+A benchmark is an async function that receives an Environment and returns
+the operation to time: a function that is called without arguments, and
+which may return an awaitable. Operations that can only be timed from the
+inside (such as imports in a subprocess) return Measured instead.
+
+With memory measurement, the operation is run once more under tracemalloc
+to record its peak allocation, and the size of what it returns.
+"""
+import json
+import time
+import inspect
+import statistics
+import tracemalloc
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from cc_backend_lib import dal
+from cc_backend_lib.clients import predictions_client, scheduler_client, users_client, countries_client
+from . import stand_in
+
+Operation = Callable[[], Union[Awaitable[object], object]]
+BENCHMARKS: Dict[str, Callable[["Environment"], Awaitable[Operation]]] = {}
+
+def benchmark(name: str):
+    def decorator(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return decorator
+
+class Environment():
+    """
+    Environment
+    ===========
+
+    parameters:
+        server (benchmarks.stand_in.StandIn)
+
+    Builds clients pointing at a running stand-in server.
+    """
+    def __init__(self, server: stand_in.StandIn):
+        self.server = server
+        self.config = server.config
+
+    def predictions(self, **kwargs) -> predictions_client.PredictionsClient:
+        return predictions_client.PredictionsClient(self.server.url, "predictions", **kwargs)
+
+    def scheduler(self, **kwargs) -> scheduler_client.SchedulerClient:
+        return scheduler_client.SchedulerClient(self.server.url, "scheduler", **kwargs)
+
+    def users(self, **kwargs) -> users_client.UsersClient:
+        return users_client.UsersClient(self.server.url, "users", **kwargs)
+
+    def countries(self, **kwargs) -> countries_client.CountriesClient:
+        return countries_client.CountriesClient(self.server.url, "countries", **kwargs)
+
+    def dal(self, **kwargs) -> dal.Dal:
+        return dal.Dal(
+                predictions = self.predictions(),
+                scheduler = self.scheduler(cache_partitions = False),
+                users = self.users(),
+                countries = self.countries(),
+                **kwargs)
+
+class Measured(NamedTuple):
+    seconds: float
+
+class Result(NamedTuple):
+    name:   str
+    runs:   int
+    min:    float
+    median: float
+    mean:   float
+    peak_bytes:     Optional[int] = None
+    retained_bytes: Optional[int] = None
+
+async def _call(operation: Operation) -> object:
+    result = operation()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+async def _measure_memory(operation: Operation) -> Tuple[int, int]:
+    tracemalloc.start()
+    try:
+        result = await _call(operation)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, retained
+
+async def run(name: str, env: Environment, repeat: int = 5, memory: bool = False) -> Result:
+    operation = await BENCHMARKS[name](env)
+    timings: List[float] = []
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        result = await _call(operation)
+        elapsed = result.seconds if isinstance(result, Measured) else time.perf_counter() - start
+        if i > 0:
+            timings.append(elapsed)
+    peak, retained = await _measure_memory(operation) if memory else (None, None)
+    return Result(name, repeat, min(timings), statistics.median(timings), statistics.mean(timings), peak, retained)
+
+def save(results: List[Result], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump({r.name: r._asdict() for r in results}, f, indent = 2)
+
+def compare(results: List[Result], path: str, threshold: float) -> List[str]:
+    """
+    compare
+    =======
+
+    parameters:
+        results (List[Result])
+        path (str): Results previously written with save
+        threshold (float): Allowed relative slowdown of the median
+    returns:
+        List[str]: Descriptions of regressions
+    """
+    with open(path) as f:
+        previous = json.load(f)
+
+    regressions = []
+    for result in results:
+        before: Optional[dict] = previous.get(result.name)
+        if before is not None and result.median > before["median"] * (1 + threshold):
+            regressions.append(f"{result.name}: {before['median'] * 1000:.2f}ms -> {result.median * 1000:.2f}ms")
+    return regressions
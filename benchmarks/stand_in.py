@@ -0,0 +1,106 @@
+"""
+stand_in
+========
+
+A local aiohttp application standing in for the predictions, scheduler,
+users and countries APIs, serving synthetic data.
+"""
+import json
+import asyncio
+from typing import Optional
+from aiohttp import web
+from . import synthetic
+
+class StandIn():
+    """
+    StandIn
+    =======
+
+    parameters:
+        config (benchmarks.synthetic.Config)
+
+    Serves synthetic data on a random local port:
+
+        /predictions/            FeatureCollection, filtered by start_date, end_date and country
+        /predictions/{id}/       Feature
+        /scheduler/?shift=N      TimePartition
+        /users/{id}/             UserDetail
+        /countries/              List of CountryProperties
+        /countries/{id}/         Country
+
+    Use as an async context manager, and read the base url from .url.
+    """
+    def __init__(self, config: synthetic.Config = synthetic.Config()):
+        self.config = config
+        self.requests = 0
+        self._predictions = synthetic.predictions(config)
+        self._predictions_by_id = {p["id"]: p for p in self._predictions}
+        self._countries = {c["id"]: c for c in synthetic.countries(config)}
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares = [self._latency])
+        app.add_routes([
+            web.get("/predictions/", self.predictions),
+            web.get("/predictions/{id}/", self.prediction),
+            web.get("/scheduler/", self.scheduler),
+            web.get("/users/{id}/", self.user),
+            web.get("/countries/", self.countries),
+            web.get("/countries/{id}/", self.country),
+            ])
+        return app
+
+    async def __aenter__(self) -> "StandIn":
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *_):
+        await self._runner.cleanup()
+
+    @web.middleware
+    async def _latency(self, request: web.Request, handler):
+        self.requests += 1
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        return await handler(request)
+
+    async def predictions(self, request: web.Request) -> web.Response:
+        features = self._predictions
+        if "start_date" in request.query:
+            features = [f for f in features if f["properties"]["date"] >= request.query["start_date"]]
+        if "end_date" in request.query:
+            features = [f for f in features if f["properties"]["date"] <= request.query["end_date"]]
+        if "country" in request.query:
+            country = int(request.query["country"])
+            features = [f for f in features if f["properties"]["country"] == country]
+        return web.json_response({"type": "FeatureCollection", "features": features}, dumps = json.dumps)
+
+    async def prediction(self, request: web.Request) -> web.Response:
+        try:
+            return web.json_response(self._predictions_by_id[int(request.match_info["id"])])
+        except KeyError:
+            raise web.HTTPNotFound()
+
+    async def scheduler(self, request: web.Request) -> web.Response:
+        return web.json_response(synthetic.partition(int(request.query.get("shift", 0))))
+
+    async def user(self, request: web.Request) -> web.Response:
+        id = int(request.match_info["id"])
+        if not 1 <= id <= self.config.users:
+            raise web.HTTPNotFound()
+        return web.json_response(synthetic.user(id))
+
+    async def countries(self, _: web.Request) -> web.Response:
+        return web.json_response([c["properties"] for c in self._countries.values()])
+
+    async def country(self, request: web.Request) -> web.Response:
+        try:
+            return web.json_response(self._countries[int(request.match_info["id"])])
+        except KeyError:
+            raise web.HTTPNotFound()
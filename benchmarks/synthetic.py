@@ -0,0 +1,100 @@
+"""
+synthetic
+=========
+
+Generation of synthetic upstream data for the benchmarks. All data is
+generated deterministically from a seed, as plain JSON-compatible dicts.
+"""
+import math
+import random
+import datetime
+from typing import Any, Dict, List, NamedTuple
+
+ANCHOR = datetime.date(2021, 1, 1)
+
+class Config(NamedTuple):
+    """
+    Config
+    ======
+
+    parameters:
+        predictions_per_shift (int): Number of predictions in each partition
+        countries (int): Number of countries
+        users (int): Number of distinct users making predictions
+        geometry_points (int): Number of vertices in each polygon
+        shifts (int): Number of past shifts with predictions
+        latency (float): Seconds of latency added to every response
+        seed (int)
+    """
+    predictions_per_shift: int = 500
+    countries: int = 50
+    users: int = 200
+    geometry_points: int = 32
+    shifts: int = 4
+    latency: float = 0.0
+    seed: int = 0
+
+def partition(shift: int) -> Dict[str, Any]:
+    month_index = ANCHOR.year * 12 + ANCHOR.month - 1 + 3 * shift
+    start = datetime.date(month_index // 12, month_index % 12 + 1, 1)
+    month_index += 3
+    end = datetime.date(month_index // 12, month_index % 12 + 1, 1) - datetime.timedelta(days = 1)
+    return {"start": start.isoformat(), "end": end.isoformat(), "duration_months": 3}
+
+def polygon(rng: random.Random, points: int) -> Dict[str, Any]:
+    x, y = rng.uniform(-20, 50), rng.uniform(-30, 30)
+    radius = rng.uniform(0.5, 3)
+    ring = [[x + radius * math.cos(2 * math.pi * i / points) * rng.uniform(0.8, 1.2),
+             y + radius * math.sin(2 * math.pi * i / points) * rng.uniform(0.8, 1.2)]
+            for i in range(points)]
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+def gwno(index: int) -> int:
+    return 400 + index
+
+def predictions(config: Config) -> List[Dict[str, Any]]:
+    rng = random.Random(config.seed)
+    features = []
+    for shift in range(-config.shifts + 1, 1):
+        span = partition(shift)
+        start = datetime.date.fromisoformat(span["start"])
+        days = (datetime.date.fromisoformat(span["end"]) - start).days + 1
+        for _ in range(config.predictions_per_shift):
+            intensity = rng.randint(0, 2)
+            features.append({
+                "type": "Feature",
+                "id": len(features) + 1,
+                "geometry": polygon(rng, config.geometry_points),
+                "properties": {
+                    "intensity": intensity,
+                    "confidence": rng.randint(0, 100),
+                    "author": rng.randint(1, config.users),
+                    "country": gwno(rng.randrange(config.countries)),
+                    "date": (start + datetime.timedelta(days = rng.randrange(days))).isoformat(),
+                    "casualties": {"lower": 1, "upper": 25, "text": "Low"},
+                    },
+                })
+    return features
+
+def countries(config: Config) -> List[Dict[str, Any]]:
+    rng = random.Random(config.seed + 1)
+    return [{
+        "type": "Feature",
+        "id": gwno(i),
+        "geometry": polygon(rng, config.geometry_points * 8),
+        "properties": {"gwno": gwno(i), "name": f"Country {i}", "iso2c": f"C{i}"},
+        } for i in range(config.countries)]
+
+def user(id: int) -> Dict[str, Any]:
+    return {
+        "id": id,
+        "name": f"User {id}",
+        "email": f"user{id}@example.com",
+        "date_joined": "2020-01-01T00:00:00",
+        "last_login": "2021-01-01T00:00:00",
+        "assigned_countries": [gwno(id % 10)],
+        "has_signed_waiver": True,
+        "has_unsubscribed": False,
+        "last_mailed": None,
+        }
@@ -0,0 +1,25 @@
+"""
+Submodules and subpackages are loaded on first attribute access (PEP 562),
+so that importing cc_backend_lib only costs what is used.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+_SUBMODULES = (
+        "aggregation", "async_either", "cache", "clients", "compat", "dal", "email", "errors",
+        "helpers", "hyperloglog", "json_backend", "metrics", "models", "offload", "request_scope", "simplify", "spatial", "summary_store", "trusted", "warmer",
+    )
+
+if TYPE_CHECKING:
+    from . import (
+        aggregation, async_either, cache, clients, compat, dal, email, errors,
+        helpers, hyperloglog, json_backend, metrics, models, offload, request_scope, simplify, spatial, summary_store, trusted, warmer,
+    )
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
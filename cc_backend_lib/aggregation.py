@@ -0,0 +1,168 @@
+"""
+aggregation
+===========
+
+Pure functions for aggregating predictions into participation summaries.
+These do no I/O, and are shared by the single and batch summary methods of
+cc_backend_lib.dal.Dal.
+"""
+import bisect
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+from cc_backend_lib import models, compat, hyperloglog
+
+Authors = Union[Set[int], hyperloglog.HyperLogLog]
+
+class CountryTally():
+    """
+    CountryTally
+    ============
+
+    parameters:
+        approximate (bool) = False: Count authors with a HyperLogLog instead of a set
+
+    Number of predictions and distinct authors for a single country.
+    """
+    __slots__ = ("predictions", "authors")
+
+    def __init__(self, approximate: bool = False):
+        self.predictions: int = 0
+        self.authors: Authors = hyperloglog.HyperLogLog() if approximate else set()
+
+def tally_countries(features: Iterable[models.prediction.PredictionFeature], approximate: bool = False) -> Dict[int, CountryTally]:
+    """
+    tally_countries
+    ===============
+
+    parameters:
+        features (Iterable[cc_backend_lib.models.prediction.PredictionFeature])
+        approximate (bool) = False: Count distinct authors approximately (see cc_backend_lib.hyperloglog)
+    returns:
+        Dict[int, CountryTally]
+
+    Count predictions and distinct authors per country in a single pass.
+    """
+    tallies: Dict[int, CountryTally] = defaultdict(lambda: CountryTally(approximate))
+    for feature in features:
+        tally = tallies[feature.properties.country]
+        tally.predictions += 1
+        tally.authors.add(feature.properties.author)
+    return dict(tallies)
+
+def country_summaries(
+        tallies: Mapping[int, CountryTally],
+        country_properties: Mapping[int, models.country.CountryProperties]
+        ) -> List[models.country.CountryProperties]:
+    """
+    country_summaries
+    =================
+
+    parameters:
+        tallies (Mapping[int, CountryTally])
+        country_properties (Mapping[int, cc_backend_lib.models.country.CountryProperties])
+    returns:
+        List[cc_backend_lib.models.country.CountryProperties]
+
+    Returns copies of the properties of each tallied country, with
+    predictions and participants filled in.
+    """
+    return [compat.model_copy(country_properties[gwno], update = {
+                "predictions": tally.predictions,
+                "participants": len(tally.authors),
+            }) for gwno, tally in tallies.items()]
+
+def participation_summary(
+        tallies: Mapping[int, CountryTally],
+        partition: models.time_partition.TimePartition,
+        country_properties: Mapping[int, models.country.CountryProperties]
+        ) -> models.emailer.ParticipationSummary:
+    """
+    participation_summary
+    =====================
+
+    parameters:
+        tallies (Mapping[int, CountryTally])
+        partition (cc_backend_lib.models.time_partition.TimePartition)
+        country_properties (Mapping[int, cc_backend_lib.models.country.CountryProperties])
+    returns:
+        cc_backend_lib.models.emailer.ParticipationSummary
+    """
+    authors: Optional[Authors] = None
+    for tally in tallies.values():
+        if authors is None:
+            authors = tally.authors.copy()
+        else:
+            authors |= tally.authors
+
+    return models.emailer.ParticipationSummary(
+            number_of_users = len(authors) if authors is not None else 0,
+            partition = partition,
+            countries = country_summaries(tallies, country_properties))
+
+def bucket_by_partition(
+        features: Iterable[models.prediction.PredictionFeature],
+        partitions: Mapping[int, models.time_partition.TimePartition]
+        ) -> Dict[int, List[models.prediction.PredictionFeature]]:
+    """
+    bucket_by_partition
+    ===================
+
+    parameters:
+        features (Iterable[cc_backend_lib.models.prediction.PredictionFeature])
+        partitions (Mapping[int, cc_backend_lib.models.time_partition.TimePartition]): Partitions by shift
+    returns:
+        Dict[int, List[cc_backend_lib.models.prediction.PredictionFeature]]: Features by shift
+
+    Sort features into the partitions that contain their date (start <= date
+    <= end). If partitions share a boundary date, features from that date
+    are put in the later partition. Features outside all partitions are
+    dropped.
+    """
+    ordered: List[Tuple[int, models.time_partition.TimePartition]] = sorted(partitions.items(), key = lambda sp: sp[1].start)
+    starts = [p.start for _, p in ordered]
+    buckets: Dict[int, List[models.prediction.PredictionFeature]] = {shift: [] for shift in partitions}
+
+    for feature in features:
+        date = feature.properties.date
+        index = bisect.bisect_right(starts, date) - 1
+        if index >= 0 and date <= ordered[index][1].end:
+            buckets[ordered[index][0]].append(feature)
+    return buckets
+
+def tally_partitions(
+        features: Iterable[models.prediction.PredictionFeature],
+        partitions: Mapping[int, models.time_partition.TimePartition],
+        approximate: bool = False
+        ) -> Dict[int, Dict[int, CountryTally]]:
+    """
+    tally_partitions
+    ================
+
+    parameters:
+        features (Iterable[cc_backend_lib.models.prediction.PredictionFeature])
+        partitions (Mapping[int, cc_backend_lib.models.time_partition.TimePartition]): Partitions by shift
+        approximate (bool) = False
+    returns:
+        Dict[int, Dict[int, CountryTally]]: Tallies by shift and country
+
+    bucket_by_partition followed by tally_countries for each partition.
+    """
+    return {shift: tally_countries(bucket, approximate)
+            for shift, bucket in bucket_by_partition(features, partitions).items()}
+
+def restrict(tallies: Mapping[int, CountryTally], country_id: Optional[int]) -> Dict[int, CountryTally]:
+    """
+    restrict
+    ========
+
+    parameters:
+        tallies (Mapping[int, CountryTally])
+        country_id (Optional[int])
+    returns:
+        Dict[int, CountryTally]
+
+    Subset tallies to a single country. None means all countries.
+    """
+    if country_id is None:
+        return dict(tallies)
+    return {country_id: tallies[country_id]} if country_id in tallies else {}
@@ -24,14 +24,17 @@ class AsyncEither(Either):
             return self.__class__(result, (None, True))
 
     async def async_then(self, function: Callable[[Either[T,U]],Coroutine[Either[V,W], None, None]]) -> Coroutine[Either[V,W], None, None]:
-        result = await self.async_map(function)
-        try:
-            return result.join()
-        except (TypeError, AttributeError):
+        if self.is_left():
+            return self
+        result = await function(self.value)
+        if isinstance(result, Either):
             return result
+        return self.__class__(result, (None, True))
 
     @classmethod
     def from_either(cls, regular_either: Either[T,U]) -> "AsyncEither[T,U]":
+        if isinstance(regular_either, cls):
+            return regular_either
         return cls(regular_either.value, regular_either.monoid)
 
     def to_either(self: "AsyncEither[T,U]") -> Either[T,U]:
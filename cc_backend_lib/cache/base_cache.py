@@ -1,5 +1,5 @@
 
-from typing import Generic, TypeVar
+from typing import Generic, Iterable, List, Mapping, Sequence, TypeVar
 from abc import ABC, abstractmethod
 from pymonad.maybe import Maybe
 
@@ -11,7 +11,14 @@ class BaseCache(ABC, Generic[T]):
     =========
 
     Base class for caches.
+
+    Subclasses must implement get and set. Caches that support invalidation
+    also implement delete, and keep an index of keys by tag to implement
+    tag and invalidate, and set supports_tags to True. The defaults raise
+    NotImplementedError.
     """
+    supports_tags = False
+
     def __init__(self):
         self._name = "" 
 
@@ -23,6 +30,91 @@ class BaseCache(ABC, Generic[T]):
     def set(self, key: int, val: T) -> None:
         pass
 
+    def get_many(self, keys: Sequence[int]) -> List[Maybe[T]]:
+        """
+        get_many
+        ========
+
+        parameters:
+            keys (Sequence[int])
+        returns:
+            List[Maybe[T]]: A value (or Nothing) for each key, in order
+
+        Get several values at once. Caches backed by a remote store should
+        override this to make a single round trip.
+        """
+        return [self.get(key) for key in keys]
+
+    def set_many(self, values: Mapping[int, T]) -> None:
+        """
+        set_many
+        ========
+
+        parameters:
+            values (Mapping[int, T]): Values by key
+
+        Set several values at once. Caches backed by a remote store should
+        override this to make a single round trip.
+        """
+        for key, val in values.items():
+            self.set(key, val)
+
+    def delete(self, key: int) -> None:
+        """
+        delete
+        ======
+
+        parameters:
+            key (int)
+
+        Remove a value from the cache, if present.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support deletion")
+
+    def tag(self, key: int, tags: Iterable[str]) -> None:
+        """
+        tag
+        ===
+
+        parameters:
+            key (int)
+            tags (Iterable[str])
+
+        Add a key to the index of each tag, so that it is deleted when any
+        of the tags is invalidated.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support tags")
+
+    def set_tagged(self, key: int, val: T, tags: Iterable[str]) -> None:
+        """
+        set_tagged
+        ==========
+
+        parameters:
+            key (int)
+            val (T)
+            tags (Iterable[str])
+
+        Set a value and replace the tags of its key. Caches that support
+        tags override this to drop the key from its previous tags.
+        """
+        self.set(key, val)
+        self.tag(key, tags)
+
+    def invalidate(self, tag: str) -> int:
+        """
+        invalidate
+        ==========
+
+        parameters:
+            tag (str)
+        returns:
+            int: The number of keys that were deleted
+
+        Delete all values whose keys were tagged with tag.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support tags")
+
     def _key(self, key:int):
         return self._name + "/" + str(key) if self._name else str(key)
 
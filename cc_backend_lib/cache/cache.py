@@ -1,9 +1,11 @@
 
+import time
 import logging
 import inspect
 import functools
-from typing import TypeVar, Callable, Any, List, Dict
-from toolz.functoolz import curry, compose
+from typing import TypeVar, Callable, Any, List, Dict, Iterable, Optional
+from toolz.functoolz import curry
+from cc_backend_lib import metrics
 from . import base_cache, signature, cache_serializer
 
 logger = logging.getLogger(__name__)
@@ -12,47 +14,109 @@ T = TypeVar("T")
 def _always_true(*_, **__):
     return True
 
-def _sync_wrapper(cache_class, serializer_class, conditional, fn: Callable[[Any], T]):
+def _get(cache_class, name: str, sig):
+    start = time.perf_counter()
+    cached = cache_class.get(sig)
+    metrics.get_metrics().observe("cc_cache_get_seconds", time.perf_counter() - start, function = name)
+    metrics.get_metrics().increment("cc_cache_requests", function = name, result = "hit" if cached.is_just() else "miss")
+    return cached
+
+def _loads(serializer_class, name: str, data):
+    with metrics.timer("cc_cache_serializer_seconds", function = name, operation = "loads"):
+        return serializer_class.loads(data)
+
+def _dump_and_set(cache_class, serializer_class, name: str, sig, value, tags: Optional[Iterable[str]]) -> None:
+    with metrics.timer("cc_cache_serializer_seconds", function = name, operation = "dumps"):
+        data = serializer_class.dumps(value)
+    if isinstance(data, (bytes, str)):
+        metrics.get_metrics().observe("cc_cache_payload_bytes", len(data), function = name)
+    if tags is not None:
+        cache_class.set_tagged(sig, data, tags)
+    else:
+        cache_class.set(sig, data)
+
+def _call_tags(tags, args, kwargs) -> Optional[List[str]]:
+    return list(tags(*args, **kwargs)) if tags is not None else None
+
+def _bind(fn_signature: inspect.Signature, args, kwargs):
+    # Arguments are bound to the parameters of the function, with defaults
+    # applied, so that f(1), f(a = 1) and f(1, None) share a key
+    bound = fn_signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return signature.make_signature(bound.args, bound.kwargs)
+
+def _add_methods(cache_class, serializer_class, tags, make_key, inner) -> None:
+    name = inner.__name__
+
+    def invalidate(tag: str) -> int:
+        deleted = cache_class.invalidate(tag)
+        logger.debug("Invalidated %s cached results of %s tagged %s", deleted, name, tag)
+        metrics.get_metrics().increment("cc_cache_invalidations", deleted, function = name)
+        return deleted
+
+    def delete(*args, **kwargs) -> None:
+        cache_class.delete(make_key(args, kwargs))
+
+    def prime(value, *args, **kwargs) -> None:
+        _dump_and_set(cache_class, serializer_class, name, make_key(args, kwargs), value, _call_tags(tags, args, kwargs))
+
+    inner.invalidate = invalidate
+    inner.delete = delete
+    inner.prime = prime
+
+def _sync_wrapper(cache_class, serializer_class, conditional, tags, make_key, fn: Callable[[Any], T]):
+    name = fn.__name__
+
     @functools.wraps(fn)
     def inner(*args, **kwargs):
         if conditional(*args, **kwargs):
-            logger.info(f"Conditional returned True with *{str(args)} / **{str(kwargs)}")
-            sig = signature.make_signature(args, kwargs)
-            fn_then_cache = compose(curry(cache_class.set, sig), serializer_class.dumps, fn)
-            get_from_cache = compose(lambda r: r.then(serializer_class.loads), cache_class.get)
-            proc = get_from_cache(sig).maybe(lambda: fn_then_cache(*args, **kwargs), lambda x: lambda: x)
-            return proc()
+            logger.debug("Conditional returned True with *%s / **%s", args, kwargs)
+            sig = make_key(args, kwargs)
+            if (cached := _get(cache_class, name, sig)).is_just():
+                return _loads(serializer_class, name, cached.value)
+            else:
+                value = fn(*args, **kwargs)
+                _dump_and_set(cache_class, serializer_class, name, sig, value, _call_tags(tags, args, kwargs))
+                return value
         else:
-            logger.info(f"Conditional returned False with *{str(args)} / **{str(kwargs)}")
+            logger.debug("Conditional returned False with *%s / **%s", args, kwargs)
+            metrics.get_metrics().increment("cc_cache_requests", function = name, result = "skip")
             return fn(*args, **kwargs)
+    _add_methods(cache_class, serializer_class, tags, make_key, inner)
     return inner
 
-def _async_wrapper(cache_class, serializer_class, conditional, fn: Callable[[Any], T]):
+def _async_wrapper(cache_class, serializer_class, conditional, tags, make_key, fn: Callable[[Any], T]):
+    name = fn.__name__
+
     @functools.wraps(fn)
     async def inner(*args, **kwargs):
         if conditional(*args, **kwargs):
-            logger.info(f"Conditional returned True with *{str(args)} / **{str(kwargs)}")
-            sig = signature.make_signature(args, kwargs)
-            if (cached := cache_class.get(sig)).is_just():
-                return serializer_class.loads(cached.value)
+            logger.debug("Conditional returned True with *%s / **%s", args, kwargs)
+            sig = make_key(args, kwargs)
+            if (cached := _get(cache_class, name, sig)).is_just():
+                return _loads(serializer_class, name, cached.value)
             else:
                 value = await fn(*args, **kwargs)
-                cache_class.set(sig, serializer_class.dumps(value))
+                _dump_and_set(cache_class, serializer_class, name, sig, value, _call_tags(tags, args, kwargs))
                 return value
         else:
-            logger.info(f"Conditional returned False with *{str(args)} / **{str(kwargs)}")
+            logger.debug("Conditional returned False with *%s / **%s", args, kwargs)
+            metrics.get_metrics().increment("cc_cache_requests", function = name, result = "skip")
             return await fn(*args, **kwargs)
+    _add_methods(cache_class, serializer_class, tags, make_key, inner)
     return inner
 
-def _wrapper(cache_class, serializer_class, conditional, fn):
+def _wrapper(cache_class, serializer_class, conditional, tags, fn):
     wrapper_fn = _sync_wrapper if not inspect.iscoroutinefunction(fn) else _async_wrapper
     cache_class.set_name(fn.__name__)
-    return wrapper_fn(cache_class, serializer_class, conditional, fn)
+    make_key = functools.partial(_bind, inspect.signature(fn))
+    return wrapper_fn(cache_class, serializer_class, conditional, tags, make_key, fn)
 
 def cache(
         cache_class: Callable[[], base_cache.BaseCache[T]],
         serializer: Callable[[], cache_serializer.CacheSerializer],
-        conditional: Callable[[List[Any], Dict[str, Any]], bool] = _always_true):
+        conditional: Callable[[List[Any], Dict[str, Any]], bool] = _always_true,
+        tags: Optional[Callable[..., Iterable[str]]] = None):
     """
     cache
     =====
@@ -60,15 +124,32 @@ def cache(
     parameters:
         cache_class (base_cache.BaseCache)
         conditional (Callable[[List[Any], Dict[str, Any]])
+        tags (Optional[Callable[..., Iterable[str]]]) = None
 
     Decorator that caches function results using the provided class. The class
     must be a subclass of base_cache, providing get and set methods with
-    appropriate signatures.
+    appropriate signatures. Results are keyed by the arguments bound to the
+    parameters of the function, with defaults applied, so calls that pass
+    the same arguments positionally, by keyword or by default share a result.
 
     An optional conditional can be passed, which receives the *args and
     **kwargs of the called function. This function determines whether or not to
     cache, or to always recompute, based on whether it returns True or False.
+
+    An optional tags function can be passed, which also receives the *args
+    and **kwargs of the called function, and returns tags for the result
+    (such as "shift:0" or "country:10"). The decorated function then has an
+    invalidate(tag) method, that deletes all cached results with the tag,
+    and a delete(*args, **kwargs) method, that deletes the cached result of
+    a single call. The cache class must support tags and deletion (see
+    base_cache.BaseCache), which is checked when the decorator is applied.
+
+    Decorated functions also have a prime(value, *args, **kwargs) method,
+    that stores value as the result of calling the function with *args and
+    **kwargs, for results computed elsewhere (see cc_backend_lib.warmer).
     """
     serializer_instance = serializer()
     cache_instance = cache_class()
-    return curry(_wrapper, cache_instance, serializer_instance, conditional)
+    if tags is not None and not cache_instance.supports_tags:
+        raise ValueError(f"{type(cache_instance).__name__} does not support tags")
+    return curry(_wrapper, cache_instance, serializer_instance, conditional, tags)
@@ -1,20 +1,77 @@
-
-from typing import TypeVar
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple, TypeVar
 from pymonad.maybe import Maybe, Just, Nothing
 from . import base_cache
 
 T = TypeVar("T")
 
 class DictCache(base_cache.BaseCache[T]):
-    def __init__(self):
+    """
+    DictCache
+    =========
+
+    parameters:
+        expiry_time (Optional[float]): Seconds to keep values for = None (forever)
+
+    A cache kept in memory, in a dict. Supports deletion and tags. Keys are
+    removed from the tag index when they are deleted or expire, and
+    set_tagged replaces the tags of a key.
+    """
+    supports_tags = True
+
+    def __init__(self, expiry_time: Optional[float] = None):
         super().__init__()
-        self._dict = {}
+        self._expiry_time = expiry_time
+        self._dict: Dict[str, Tuple[T, Optional[float]]] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Set[str]] = {}
 
     def get(self, key: str) -> Maybe[T]:
+        key = self._key(key)
         try:
-            return Just(self._dict[self._key(key)])
+            value, expires = self._dict[key]
         except KeyError:
             return Nothing
+        if expires is not None and expires <= time.monotonic():
+            self._remove(key)
+            return Nothing
+        return Just(value)
 
     def set(self, key: str, val: T) -> None:
-        self._dict[self._key(key)] = val
+        expires = time.monotonic() + self._expiry_time if self._expiry_time is not None else None
+        self._dict[self._key(key)] = (val, expires)
+
+    def delete(self, key: str) -> None:
+        self._remove(self._key(key))
+
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        key = self._key(key)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+            self._key_tags.setdefault(key, set()).add(tag)
+
+    def set_tagged(self, key: str, val: T, tags: Iterable[str]) -> None:
+        self._untag(self._key(key))
+        self.set(key, val)
+        self.tag(key, tags)
+
+    def invalidate(self, tag: str) -> int:
+        deleted = 0
+        for key in list(self._tags.get(tag, ())):
+            if key in self._dict:
+                deleted += 1
+            self._remove(key)
+        self._tags.pop(tag, None)
+        return deleted
+
+    def _remove(self, key: str) -> None:
+        self._dict.pop(key, None)
+        self._untag(key)
+
+    def _untag(self, key: str) -> None:
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
@@ -1,6 +1,6 @@
 
-import json
 from pydantic import BaseModel
+from cc_backend_lib import compat
 from . import cache_serializer
 
 class PydanticSerializer(cache_serializer.CacheSerializer[BaseModel]):
@@ -9,7 +9,7 @@ class PydanticSerializer(cache_serializer.CacheSerializer[BaseModel]):
         self._model = model
 
     def dumps(self, value: BaseModel) -> bytes:
-        return value.json().encode()
+        return compat.model_dump_json(value)
 
     def loads(self, data: bytes) -> BaseModel:
-        return self._model(**json.loads(data))
+        return compat.validate_json(self._model, data)
@@ -1,23 +1,70 @@
 
+import zlib
 import logging
-from typing import Optional
+from typing import Iterable, List, Mapping, Optional, Sequence, Union
 from pymonad.maybe import Just, Nothing, Maybe
-import redis
+from cc_backend_lib import metrics
 from . import base_cache
 
 logger = logging.getLogger(__name__)
 
+# Keys deleted per DEL command when invalidating a tag
+_DELETE_BATCH = 1000
+
+# Header bytes of stored values. Values written before compression was added
+# have no header, and are read as they are: serializers write text, which
+# never starts with either byte.
+_ZLIB = b"\x00"
+_RAW = b"\x01"
+
 class RedisCache(base_cache.BaseCache[str]):
+    """
+    RedisCache
+    ==========
+
+    parameters:
+        host (str)
+        expiry_time (Optional[int]): Seconds to keep values for = 10
+        port (int) = 6379
+        db (int) = 0
+        compress_threshold (Optional[int]): Compress values of at least this many bytes, or never if None = 1024
+        compression_level (int): zlib compression level = 1
+        max_value_size (Optional[int]): Do not cache values that are larger than this when stored = None
+
+    A cache kept in Redis. Values of at least compress_threshold bytes are
+    compressed with zlib (unless that does not make them smaller), and a
+    header byte marks how each value is stored, so values written by earlier
+    versions (without a header) are still read. Values that are larger than
+    max_value_size after compression are not cached, and any previous value
+    for their key is deleted. Compression ratios and skipped values are
+    recorded in cc_backend_lib.metrics.
+
+    The cache supports deletion and tags: the keys of each tag are kept in
+    a Redis set, and the tags of each key in another, so that a key is
+    removed from its tags when it is deleted, invalidated or set again with
+    set_tagged. The sets expire along with the last key added to them, and
+    without an expiry time they hold only the keys that are still cached.
+    Tags are updated in WATCH/MULTI transactions.
+        """
+    supports_tags = True
+
     def __init__(self,
             host: str,
             expiry_time: Optional[int] = 10,
             port: int = 6379,
-            db: int = 0):
+            db: int = 0,
+            compress_threshold: Optional[int] = 1024,
+            compression_level: int = 1,
+            max_value_size: Optional[int] = None):
 
         super().__init__()
 
+        import redis
         self._redis = redis.Redis(host = host, port = port, db = db)
         self._expiry_time = expiry_time
+        self._compress_threshold = compress_threshold
+        self._compression_level = compression_level
+        self._max_value_size = max_value_size
         logger.debug(f"Initialized redis cache: redis://{host}:{port}/{db}")
 
     def get(self, key: str) -> Maybe[str]:
@@ -25,12 +72,149 @@ class RedisCache(base_cache.BaseCache[str]):
         if value is None:
             return Nothing
         else:
-            logger.info(f"Returning {self._key(key)} from cache")
-            return Just(value.decode())
+            logger.debug("Returning %s from cache", self._key(key))
+            return Just(self._decode(value))
 
     def set(self, key: str, val: str) ->  None:
-        logger.info(f"Setting {self._key(key)} in cache")
-        self._redis.set(self._key(key), val, ex = self._expiry_time)
+        data = self._encode(val)
+        if data is None:
+            self.delete(key)
+            return
+        logger.debug("Setting %s in cache", self._key(key))
+        self._redis.set(self._key(key), data, ex = self._expiry_time)
+
+    def get_many(self, keys: Sequence[str]) -> List[Maybe[str]]:
+        if not keys:
+            return []
+        values = self._redis.mget([self._key(key) for key in keys])
+        logger.debug("Got %s of %s keys from cache", sum(v is not None for v in values), len(values))
+        return [Nothing if value is None else Just(self._decode(value)) for value in values]
+
+    def set_many(self, values: Mapping[str, str]) -> None:
+        if not values:
+            return
+        logger.debug("Setting %s keys in cache", len(values))
+        pipeline = self._redis.pipeline(transaction = False)
+        for key, val in values.items():
+            data = self._encode(val)
+            if data is None:
+                pipeline.delete(self._key(key))
+            else:
+                pipeline.set(self._key(key), data, ex = self._expiry_time)
+        pipeline.execute()
+
+    def delete(self, key: str) -> None:
+        logger.debug("Deleting %s from cache", self._key(key))
+
+        def remove(pipeline):
+            tags = pipeline.smembers(self._key_tags_key(self._key(key)))
+            pipeline.multi()
+            self._untag(pipeline, self._key(key), tags)
+            pipeline.delete(self._key(key))
+
+        self._redis.transaction(remove, self._key_tags_key(self._key(key)))
+
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        pipeline = self._redis.pipeline(transaction = False)
+        self._tag(pipeline, key, tags)
+        pipeline.execute()
+
+    def set_tagged(self, key: str, val: str, tags: Iterable[str]) -> None:
+        data = self._encode(val)
+        if data is None:
+            self.delete(key)
+            return
+        logger.debug("Setting %s in cache", self._key(key))
+        tags = list(tags)
+
+        def replace(pipeline):
+            previous = pipeline.smembers(self._key_tags_key(self._key(key)))
+            pipeline.multi()
+            self._untag(pipeline, self._key(key), previous)
+            pipeline.set(self._key(key), data, ex = self._expiry_time)
+            self._tag(pipeline, key, tags)
+
+        self._redis.transaction(replace, self._key_tags_key(self._key(key)))
+
+    def invalidate(self, tag: str) -> int:
+        batches = 0
+
+        def remove(pipeline):
+            nonlocal batches
+            keys = sorted(k.decode() for k in pipeline.smembers(self._tag_key(tag)))
+            key_tags = []
+            if keys:
+                pipeline.watch(*[self._key_tags_key(k) for k in keys])
+                reader = self._redis.pipeline(transaction = False)
+                for k in keys:
+                    reader.smembers(self._key_tags_key(k))
+                key_tags = reader.execute()
+
+            pipeline.multi()
+            batches = 0
+            for i in range(0, len(keys), _DELETE_BATCH):
+                pipeline.delete(*keys[i:i + _DELETE_BATCH])
+                batches += 1
+            for k, tags in zip(keys, key_tags):
+                self._untag(pipeline, k, tags)
+            pipeline.delete(self._tag_key(tag))
+
+        results = self._redis.transaction(remove, self._tag_key(tag))
+        deleted = sum(results[:batches])
+        logger.debug("Invalidated %s keys tagged %s", deleted, tag)
+        return deleted
+
+    def _encode(self, val: Union[str, bytes]) -> Optional[bytes]:
+        data = val.encode() if isinstance(val, str) else bytes(val)
+        if self._compress_threshold is not None and len(data) >= self._compress_threshold:
+            compressed = zlib.compress(data, self._compression_level)
+            metrics.get_metrics().observe(
+                    "cc_cache_compression_ratio",
+                    len(compressed) / len(data),
+                    function = self._name)
+        else:
+            compressed = None
+
+        if compressed is not None and len(compressed) < len(data):
+            stored = _ZLIB + compressed
+        elif data[:1] in (_ZLIB, _RAW):
+            stored = _RAW + data
+        else:
+            stored = data
+
+        if self._max_value_size is not None and len(stored) > self._max_value_size:
+            logger.debug("Not caching %s byte value, above the maximum of %s", len(stored), self._max_value_size)
+            metrics.get_metrics().increment("cc_cache_skipped", function = self._name, reason = "size")
+            return None
+        return stored
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        header = data[:1]
+        if header == _ZLIB:
+            data = zlib.decompress(data[1:])
+        elif header == _RAW:
+            data = data[1:]
+        return data.decode()
+
+    def _tag(self, pipeline, key: str, tags: Iterable[str]) -> None:
+        for tag in tags:
+            pipeline.sadd(self._tag_key(tag), self._key(key))
+            pipeline.sadd(self._key_tags_key(self._key(key)), tag)
+            if self._expiry_time:
+                pipeline.expire(self._tag_key(tag), self._expiry_time)
+                pipeline.expire(self._key_tags_key(self._key(key)), self._expiry_time)
+
+    def _untag(self, pipeline, cache_key: str, tags: Iterable[bytes]) -> None:
+        for tag in tags:
+            pipeline.srem(self._tag_key(tag.decode()), cache_key)
+        pipeline.delete(self._key_tags_key(cache_key))
+
+    def _tag_key(self, tag: str) -> str:
+        return self._name + "#tags/" + tag
+
+    def _key_tags_key(self, cache_key: str) -> str:
+        return self._name + "#keytags/" + cache_key
 
     def _key(self, key: int):
         return self._name + "/" + str(key)
@@ -1,5 +1,6 @@
 import logging
 import pickle
+import hashlib
 from typing import List, Dict, Any, Optional
 
 def make_signature(args: Optional[List[Any]] = None, kwargs: Optional[Dict[str, Any]] = None):
@@ -8,11 +9,13 @@ def make_signature(args: Optional[List[Any]] = None, kwargs: Optional[Dict[str,
     ==============
 
     Turns *args and **kwargs into a hash. Used to make unique cache keys from
-    function arguments.
+    function arguments. The hash is the same in every process (unlike hash(),
+    which is salted per process), so replicas sharing a cache find each
+    other's values.
     """
     sig = tuple()
     if args:
         sig += tuple(args)
     if kwargs:
         sig += tuple(kwargs.items())
-    return hash(pickle.dumps(sig))
+    return int.from_bytes(hashlib.blake2b(pickle.dumps(sig), digest_size = 8).digest(), "big", signed = True)
@@ -1,24 +1,106 @@
 import logging
 import os
 import abc
-from typing import Dict, Optional
-import aiohttp
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from urllib.parse import urlparse
+from typing import TYPE_CHECKING, Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple, TypeVar
 from pymonad.either import Either, Left, Right
 from cc_backend_lib.errors import http_error
+from cc_backend_lib import metrics, trusted, compat, json_backend, offload
+
+if TYPE_CHECKING:
+    import aiohttp
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+DEFAULT_OFFLOAD_THRESHOLD = 1 << 20
+DEFAULT_MAX_VALIDATORS = 1024
+
+class Validators(NamedTuple):
+    """
+    Validators
+    ==========
+
+    The validators (ETag / Last-Modified) returned with a response, along with
+    the body of that response.
+    """
+    etag:          Optional[str]
+    last_modified: Optional[str]
+    content:       bytes
+
+    def headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
 class ApiClient(abc.ABC):
     """
     ApiClient
     =========
+
+    parameters:
+        base_url (str)
+        path (str) = ""
+        base_parameters (Optional[Dict[str,str]]) = None
+        conditional_requests (bool) = False
+        trusted (bool) = False
+        executor (Optional[concurrent.futures.Executor]) = None
+        offload_threshold (int): Size in bytes from which responses are deserialized in the executor = 1 MiB
+        max_validators (int): Number of responses to keep validators for = 1024
+
+    If conditional_requests is True, the ETag and Last-Modified headers and
+    the body of each successful GET response are stored per path and
+    parameters, for the max_validators most recently requested ones.
+    Repeated requests send If-None-Match / If-Modified-Since, and a 304
+    response deserializes the stored body again, without re-downloading it.
+    Each response is a new value, so callers can modify it freely.
+
+    If trusted is True, the upstream API is trusted to return well-formed
+    data, and responses are deserialized without pydantic validation (see
+    cc_backend_lib.trusted). Under pydantic v2, validating JSON with
+    pydantic-core is faster than constructing models in Python, so trusted
+    has no effect there.
+
+    If an executor is passed, responses of list requests that are at least
+    offload_threshold bytes are deserialized in it (see
+    cc_backend_lib.offload), instead of on the event loop. Clients can be
+    pickled for use with a process pool, without their stored validators.
     """
-    def __init__(self, base_url: str, path: str = "", base_parameters: Optional[Dict[str,str]] = None):
+    def __init__(self,
+            base_url: str,
+            path: str = "",
+            base_parameters: Optional[Dict[str,str]] = None,
+            conditional_requests: bool = False,
+            trusted: bool = False,
+            executor: Optional[Executor] = None,
+            offload_threshold: int = DEFAULT_OFFLOAD_THRESHOLD,
+            max_validators: int = DEFAULT_MAX_VALIDATORS):
         self._base_url                = base_url
+        self._host                    = urlparse(base_url).netloc
         self._api_path                = path
         self._headers: Dict[str, str] = {}
         self._cookies: Dict[str, str] = {}
         self._base_parameters         = {} if base_parameters is None else base_parameters
+        self._conditional_requests    = conditional_requests
+        self._trusted                 = trusted
+        self._validators: "OrderedDict[Tuple[str, Tuple[Tuple[str, str], ...]], Validators]" = OrderedDict()
+        self._max_validators          = max_validators
+        self._offloader               = offload.Offloader(executor, offload_threshold)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Executors can not be pickled, and validators are only useful
+        # to the process that made the requests
+        state = self.__dict__.copy()
+        state["_validators"] = OrderedDict()
+        state["_offloader"] = offload.Offloader()
+        return state
 
     def _parameters(self, parameters: Optional[Dict[str,str]] = None):
         base = self._base_parameters.copy()
@@ -28,6 +110,64 @@ class ApiClient(abc.ABC):
     async def _get(self, path: str, parameters: Dict[str,str]):
         return await self._request("get", path, parameters)
 
+    async def _get_deserialized(self,
+            path: str,
+            parameters: Dict[str,str],
+            deserialize: Callable[[bytes], Either[http_error.HttpError, T]],
+            offload: bool = False
+            ) -> Either[http_error.HttpError, T]:
+        """
+        _get_deserialized
+        =================
+
+        parameters:
+            path (str)
+            parameters (Dict[str,str])
+            deserialize (Callable[[bytes], Either[HttpError, T]])
+            offload (bool) = False: Deserialize large responses in the executor, if there is one
+        returns:
+            Either[cc_backend_lib.errors.http_error.HttpError, T]
+
+        GET a resource and deserialize it. Revalidates with the stored
+        validators when conditional requests are enabled.
+        """
+        if not self._conditional_requests:
+            return await self._deserialize(await self._get(path, parameters), deserialize, offload)
+
+        key = (path, tuple(sorted((str(k), str(v)) for k,v in parameters.items())))
+        validators = self._validators.get(key)
+        if validators is not None:
+            self._validators.move_to_end(key)
+
+        status, headers, content = await self._fetch("get", path, parameters,
+                headers = validators.headers() if validators is not None else {})
+
+        if status == 304 and validators is not None:
+            logger.debug(f"{path} not modified, using stored body")
+            return await self._deserialize(Right(validators.content), deserialize, offload)
+
+        result = await self._deserialize(self._to_either(path, status, content), deserialize, offload)
+
+        if result.is_right():
+            etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+            if etag is not None or last_modified is not None:
+                self._validators[key] = Validators(etag, last_modified, content)
+                self._validators.move_to_end(key)
+                while len(self._validators) > self._max_validators:
+                    self._validators.popitem(last = False)
+            else:
+                self._validators.pop(key, None)
+        return result
+
+    async def _deserialize(self,
+            content: Either[http_error.HttpError, bytes],
+            deserialize: Callable[[bytes], Either[http_error.HttpError, T]],
+            offload: bool
+            ) -> Either[http_error.HttpError, T]:
+        if content.is_left() or not offload:
+            return content.then(deserialize)
+        return await self._offloader.run(len(content.value), deserialize, content.value)
+
     async def _request(self,
             method: str,
             path: str,
@@ -35,19 +175,73 @@ class ApiClient(abc.ABC):
             *args,
             **kwargs
             ) -> Either[http_error.HttpError, bytes]:
+        status, _, content = await self._fetch(method, path, parameters, *args, **kwargs)
+        return self._to_either(path, status, content)
+
+    async def _fetch(self,
+            method: str,
+            path: str,
+            parameters: Dict[str,str],
+            *args,
+            **kwargs
+            ) -> Tuple[int, Mapping[str, str], bytes]:
+        start = time.perf_counter()
         async with self._session() as session:
+            metrics.get_metrics().increment("cc_http_sessions_opened", host = self._host)
             async with session.request(method, path, *args, params = parameters, **kwargs) as response:
-                logger.debug(f"Requested {response.url} ({response.status})")
+                logger.debug("Requested %s (%s)", response.url, response.status)
                 content = await response.read()
 
-                if self._status_is_ok(response.status):
-                    return Right(content)
-                else:
-                    return Left(http_error.HttpError(
-                            url = self._base_url + path,
-                            http_code = response.status,
-                            content = content
-                            ))
+        labels = {"host": self._host, "method": method.upper(), "status": str(response.status)}
+        metrics.get_metrics().observe("cc_http_request_seconds", time.perf_counter() - start, **labels)
+        metrics.get_metrics().observe("cc_http_response_bytes", len(content), **labels)
+        return response.status, response.headers, content
+
+    def _to_either(self, path: str, status: int, content: bytes) -> Either[http_error.HttpError, bytes]:
+        if self._status_is_ok(status):
+            return Right(content)
+        else:
+            return Left(http_error.HttpError(
+                    url = self._base_url + path,
+                    http_code = status,
+                    content = content
+                    ))
+
+    def _deserialize_json(self, tp: Any, data: bytes) -> Any:
+        """
+        _deserialize_json
+        =================
+
+        parameters:
+            tp (Any): A pydantic model, or a type such as List[Model]
+            data (bytes)
+        returns:
+            Any
+
+        Validate JSON data as tp. Under pydantic v2, the data is validated
+        directly from JSON by pydantic-core. Raises pydantic.ValidationError
+        or json.JSONDecodeError for invalid data.
+        """
+        if self._trusted and not compat.PYDANTIC_V2:
+            return trusted.convert(tp, json_backend.loads(data))
+        return compat.validate_json(tp, data)
+
+    def _deserialize_value(self, tp: Any, value: Any) -> Any:
+        """
+        _deserialize_value
+        ==================
+
+        parameters:
+            tp (Any): A pydantic model, or a type such as List[Model]
+            value (Any): Parsed JSON data
+        returns:
+            Any
+
+        Like _deserialize_json, for data that has already been parsed.
+        """
+        if self._trusted and not compat.PYDANTIC_V2:
+            return trusted.convert(tp, value)
+        return compat.validate(tp, value)
 
     def _path(self, name: str) -> str:
         return "/"+os.path.join(self._api_path,str(name))
@@ -55,7 +249,10 @@ class ApiClient(abc.ABC):
     def _status_is_ok(self, status: int) -> bool:
         return status == 200
 
-    def _session(self) -> aiohttp.ClientSession:
+    def _session(self) -> "aiohttp.ClientSession":
+        # aiohttp is imported when first needed, since importing it takes
+        # longer than importing the rest of the library
+        import aiohttp
         return aiohttp.ClientSession(
                 base_url = self._base_url,
                 headers = self._headers,
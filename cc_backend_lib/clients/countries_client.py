@@ -1,6 +1,8 @@
 
 import json
+from typing import List
 import pydantic
+from cc_backend_lib import compat
 from pymonad.either import Either, Right, Left
 from cc_backend_lib import models
 from cc_backend_lib.errors import http_error
@@ -10,14 +12,14 @@ class CountriesClient(model_api_client.ModelApiClient[models.country.Country, mo
 
     def deserialize_detail(self, data:bytes) -> Either[http_error.HttpError, models.country.Country]:
         try:
-            return Right(models.country.Country(**json.loads(data)))
-        except (json.JSONDecodeError, pydantic.ValidationError) as err:
+            return Right(self._deserialize_json(models.country.Country, data))
+        except (json.JSONDecodeError, pydantic.ValidationError, TypeError, AttributeError) as err:
             return Left(http_error.HttpError(message = str(err), http_code = 500))
 
     def deserialize_list(self, data:bytes) -> Either[http_error.HttpError, models.country.CountryPropertiesList]:
         try:
-            return Right(models.country.CountryPropertiesList(
-                    countries = json.loads(data)
+            return Right(compat.model_construct(models.country.CountryPropertiesList,
+                    countries = self._deserialize_json(List[models.country.CountryProperties], data)
                     ))
-        except (json.JSONDecodeError, pydantic.ValidationError) as err:
+        except (json.JSONDecodeError, pydantic.ValidationError, TypeError, AttributeError) as err:
             return Left(http_error.HttpError(message = str(err), http_code = 500))
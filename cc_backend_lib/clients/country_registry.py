@@ -0,0 +1,157 @@
+
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+from pymonad.either import Either, Right
+from pymonad.maybe import Just, Nothing, Maybe
+from cc_backend_lib import models, compat, helpers
+from cc_backend_lib.errors import http_error
+from . import countries_client
+
+logger = logging.getLogger(__name__)
+
+class CountryRegistry():
+    """
+    CountryRegistry
+    ===============
+
+    parameters:
+        countries (cc_backend_lib.clients.countries_client.CountriesClient)
+        refresh_interval (float): Seconds between background refreshes = 3600
+
+    An in-memory, id-indexed registry of country properties. The full list of
+    countries is bulk-loaded once via CountriesClient.list, and can be kept
+    fresh by a background task (see start / stop). Lookups are served from
+    memory, without any network calls.
+
+    Lookups return copies, so callers are free to modify the returned
+    properties.
+    """
+    def __init__(self, countries: countries_client.CountriesClient, refresh_interval: float = 3600):
+        self._countries = countries
+        self._refresh_interval = refresh_interval
+        self._properties: Dict[int, models.country.CountryProperties] = {}
+        self._loaded = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def refresh(self) -> Either[http_error.HttpError, None]:
+        """
+        refresh
+        =======
+
+        returns:
+            Either[cc_backend_lib.errors.http_error.HttpError, None]
+
+        Reload all country properties. If loading fails, the previously
+        loaded properties are kept.
+        """
+        countries = await self._countries.list()
+        if countries.is_right():
+            self._properties = {c.gwno: c for c in countries.value.countries}
+            self._loaded = True
+            logger.debug(f"Loaded {len(self._properties)} countries")
+            return Right(None)
+        else:
+            logger.warning(f"Failed to refresh countries: {helpers.extract_either(countries).message}")
+            return countries
+
+    async def ensure_loaded(self) -> Either[http_error.HttpError, None]:
+        """
+        ensure_loaded
+        =============
+
+        returns:
+            Either[cc_backend_lib.errors.http_error.HttpError, None]
+
+        Load the registry if it has not been loaded yet. Concurrent callers
+        share a single load.
+        """
+        if self._loaded:
+            return Right(None)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._loaded:
+                return Right(None)
+            return await self.refresh()
+
+    def get(self, gwno: int) -> Maybe[models.country.CountryProperties]:
+        """
+        get
+        ===
+
+        parameters:
+            gwno (int)
+        returns:
+            Maybe[cc_backend_lib.models.country.CountryProperties]
+        """
+        try:
+            return Just(compat.model_copy(self._properties[gwno]))
+        except KeyError:
+            return Nothing
+
+    async def properties(self, gwnos: Iterable[int]) -> Either[http_error.HttpError, List[models.country.CountryProperties]]:
+        """
+        properties
+        ==========
+
+        parameters:
+            gwnos (Iterable[int])
+        returns:
+            Either[cc_backend_lib.errors.http_error.HttpError, List[cc_backend_lib.models.country.CountryProperties]]
+
+        Look up the properties of several countries, loading the registry
+        first if necessary. Countries that are not in the registry (such as
+        ones added since it was last refreshed) are fetched with
+        CountriesClient.details and added to it, so ids that do not exist
+        result in the errors of that call.
+        """
+        loaded = await self.ensure_loaded()
+        if loaded.is_left():
+            return loaded
+
+        gwnos = list(gwnos)
+        missing = sorted({id for id in gwnos if id not in self._properties})
+        if missing:
+            logger.debug(f"Fetching {len(missing)} countries missing from the registry")
+            fetched = helpers.combine_http_errors(await self._countries.details(missing))
+            if fetched.is_left():
+                return fetched
+            self._properties.update({c.properties.gwno: c.properties for c in fetched.value})
+        return Right([compat.model_copy(self._properties[id]) for id in gwnos])
+
+    def start(self) -> None:
+        """
+        start
+        =====
+
+        Start refreshing the registry periodically in the background. Must be
+        called from within a running event loop.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        """
+        stop
+        ====
+
+        Stop the background refresh task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self._refresh_interval)
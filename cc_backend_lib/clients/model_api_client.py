@@ -1,8 +1,11 @@
-
 import abc
-from typing import Generic, TypeVar
+import copy
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
 from pymonad.either import Either
 from cc_backend_lib.errors import http_error
+from cc_backend_lib.cache import base_cache
 from . import api_client
 
 T = TypeVar("T")
@@ -13,12 +16,67 @@ class ModelApiClient(api_client.ApiClient, abc.ABC, Generic[T,U]):
     ApiClient
     =========
 
+    parameters:
+        base_url (str)
+        path (str) = ""
+        base_parameters (Optional[Dict[str,str]]) = None
+        conditional_requests (bool) = False
+        trusted (bool) = False
+        entity_cache (Optional[cc_backend_lib.cache.base_cache.BaseCache[str]]) = None
+        executor (Optional[concurrent.futures.Executor]) = None
+        offload_threshold (int) = 1 MiB
+        max_validators (int) = 1024
+
     Generic client for interacting with a RESTful API that yields pydantic
     de-serializable JSON data. To use this class, subclass and:
         * override deserialize method
         * T type for detail model
         * U type for list model
+
+    If an entity_cache is passed, the responses of detail requests that
+    deserialize successfully are cached by path and parameters, and detail
+    (and details) only makes requests for resources that are not cached.
+    Pass a cache with an expiry time (such as a RedisCache, or a DictCache
+    with expiry_time) to bound how stale cached resources can be. Cached
+    responses are deserialized on every hit, so anonymization and the like
+    still apply.
+
+    With an executor, large list responses are deserialized in it (see
+    cc_backend_lib.clients.api_client.ApiClient).
     """
+    def __init__(self,
+            base_url: str,
+            path: str = "",
+            base_parameters: Optional[Dict[str,str]] = None,
+            conditional_requests: bool = False,
+            trusted: bool = False,
+            entity_cache: Optional[base_cache.BaseCache[str]] = None,
+            executor: Optional[Executor] = None,
+            offload_threshold: int = api_client.DEFAULT_OFFLOAD_THRESHOLD,
+            max_validators: int = api_client.DEFAULT_MAX_VALIDATORS):
+        super().__init__(base_url, path, base_parameters, conditional_requests, trusted, executor, offload_threshold, max_validators)
+        self._entity_cache = entity_cache
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super().__getstate__()
+        state["_entity_cache"] = None
+        return state
+
+    def with_entity_cache(self, entity_cache: Optional[base_cache.BaseCache[str]]) -> "ModelApiClient[T, U]":
+        """
+        with_entity_cache
+        =================
+
+        parameters:
+            entity_cache (Optional[cc_backend_lib.cache.base_cache.BaseCache[str]])
+        returns:
+            ModelApiClient[T, U]
+
+        A copy of the client that caches detail responses in entity_cache.
+        """
+        client = copy.copy(self)
+        client._entity_cache = entity_cache
+        return client
 
     @abc.abstractmethod
     def deserialize_detail(self, data: bytes)-> Either[http_error.HttpError, T]:
@@ -40,12 +98,61 @@ class ModelApiClient(api_client.ApiClient, abc.ABC, Generic[T,U]):
 
         Get and deserialize a resource named name
         """
-        name = str(name).strip("/") + "/"
+        path = self._detail_path(name)
+        parameters = self._parameters({str(k): str(v) for k,v in kwargs.items()})
 
-        path = self._path(name)
-        parameters = {str(k): str(v) for k,v in kwargs.items()}
-        response = await self._get(path, parameters = self._parameters(parameters))
-        return response.then(self.deserialize_detail)
+        if self._entity_cache is None:
+            return await self._get_deserialized(path, parameters, self.deserialize_detail)
+
+        key = self._entity_key(path, parameters)
+        cached = self._entity_cache.get(key)
+        if cached.is_just():
+            result = self.deserialize_detail(cached.value.encode())
+            if result.is_right():
+                return result
+
+        result, data = await self._fetch_detail(path, parameters)
+        if data is not None:
+            self._entity_cache.set(key, data)
+        return result
+
+    async def details(self, names: List[str], **kwargs) -> List[Either[http_error.HttpError, T]]:
+        """
+        details
+        =======
+
+        parameters:
+            names (List[str])
+        returns:
+            List[Either[cc_backend_client.http_error.HttpError, T]]: A result for each name, in order
+
+        Get and deserialize several resources. With an entity cache, cached
+        resources are looked up with a single get_many, only the others are
+        requested, and those are stored with a single set_many.
+        """
+        if self._entity_cache is None:
+            return list(await asyncio.gather(*(self.detail(name, **kwargs) for name in names)))
+
+        parameters = self._parameters({str(k): str(v) for k,v in kwargs.items()})
+        paths = [self._detail_path(name) for name in names]
+        keys = [self._entity_key(path, parameters) for path in paths]
+        cached = self._entity_cache.get_many(keys)
+
+        results: List[Optional[Either[http_error.HttpError, T]]] = []
+        for data in cached:
+            result = data.maybe(None, lambda d: self.deserialize_detail(d.encode()))
+            results.append(result if result is not None and result.is_right() else None)
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        fetched = await asyncio.gather(*(self._fetch_detail(paths[i], parameters) for i in missing))
+        store = {}
+        for i, (result, data) in zip(missing, fetched):
+            results[i] = result
+            if data is not None:
+                store[keys[i]] = data
+        if store:
+            self._entity_cache.set_many(store)
+        return results
 
     async def list(self, page: int = 0, **kwargs) -> Either[http_error.HttpError, U]:
         """
@@ -62,5 +169,28 @@ class ModelApiClient(api_client.ApiClient, abc.ABC, Generic[T,U]):
         parameters = self._parameters({"page": str(page)} if page else {})
         parameters.update({str(k): str(v) for k,v in kwargs.items()})
         path = self._path("")
-        response = await self._get(path, parameters = parameters)
-        return response.then(self.deserialize_list)
+        return await self._get_deserialized(path, parameters, self.deserialize_list, offload = True)
+
+    async def _fetch_detail(self, path: str, parameters: Dict[str, str]) -> Tuple[Either[http_error.HttpError, T], Optional[str]]:
+        # Returns the result, and the response to cache if it deserialized
+        fetched: List[str] = []
+
+        def deserialize(data: bytes) -> Either[http_error.HttpError, T]:
+            result = self.deserialize_detail(data)
+            if result.is_right():
+                fetched.append(data.decode())
+            return result
+
+        result = await self._get_deserialized(path, parameters, deserialize)
+        return result, fetched[0] if fetched else None
+
+    def _detail_path(self, name: str) -> str:
+        return self._path(str(name).strip("/") + "/")
+
+    def _entity_key(self, path: str, parameters: Dict[str, str]) -> str:
+        # Clients of different resources may share a cache, and may have the
+        # same paths, so keys include the client class and the base url
+        key = f"{type(self).__name__}:{self._base_url}{path}"
+        if not parameters:
+            return key
+        return key + "?" + "&".join(f"{k}={v}" for k, v in sorted(parameters.items()))
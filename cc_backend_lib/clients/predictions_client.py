@@ -1,5 +1,4 @@
 
-import json
 import pydantic
 from pymonad.either import Left, Right, Either
 from cc_backend_lib import models
@@ -19,7 +18,7 @@ class PredictionsClient(model_api_client.ModelApiClient[models.prediction.Predic
     """
     def _model_deserialize(self, data: bytes, model: pydantic.BaseModel) -> Either[http_error.HttpError, pydantic.BaseModel]:
         try:
-            return Right(model(**json.loads(data)))
+            return Right(self._deserialize_json(model, data))
         except Exception:
             return Left(http_error.HttpError(http_code = 500, message = "Failed to deserialize item"))
 
@@ -1,17 +1,137 @@
 
-import json
+import calendar
+import datetime
+from typing import Dict, Optional, Tuple
 from pymonad.either import Left, Right, Either
 from cc_backend_lib.errors import http_error
-from cc_backend_lib import models
+from cc_backend_lib import models, compat
 from . import api_client
 
+def shift_months(date: datetime.date, months: int) -> datetime.date:
+    """
+    shift_months
+    ============
+
+    parameters:
+        date (datetime.date)
+        months (int)
+    returns:
+        datetime.date
+
+    Move a date a number of months forwards or backwards. Month-end dates stay
+    at the end of the month (2021-03-31 + 3 months = 2021-06-30, and
+    2021-06-30 + 3 months = 2021-09-30).
+    """
+    month_index = date.year * 12 + date.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    last_day = calendar.monthrange(year, month)[1]
+    if date.day == calendar.monthrange(date.year, date.month)[1]:
+        day = last_day
+    else:
+        day = min(date.day, last_day)
+    return datetime.date(year, month, day)
+
 class SchedulerClient(api_client.ApiClient):
+    """
+    SchedulerClient
+    ===============
+
+    parameters:
+        base_url (str)
+        path (str) = ""
+        base_parameters (Optional[Dict[str,str]]) = None
+        conditional_requests (bool) = False
+        trusted (bool) = False
+        cache_partitions (bool) = False
+        derive_shifts (bool) = False
+
+    A client that resolves time partitions (shifts relative to the current
+    partition) from the scheduler API.
+
+    If cache_partitions is True, resolved partitions are kept in memory until
+    the last day of the current partition has passed, since the partition
+    for a given shift only changes at partition boundaries. This assumes
+    that the scheduler does not change existing partitions, and that the
+    local date matches the one of the scheduler.
+
+    If derive_shifts is True, partitions for other shifts are computed locally
+    from any cached partition by moving its start and end by
+    duration_months, instead of asking the scheduler. This assumes that
+    partitions are contiguous and of equal length. Since partitions are
+    derived from cached ones, derive_shifts requires cache_partitions, and
+    a ValueError is raised otherwise.
+    """
+    def __init__(self,
+            base_url: str,
+            path: str = "",
+            base_parameters: Optional[Dict[str,str]] = None,
+            conditional_requests: bool = False,
+            trusted: bool = False,
+            cache_partitions: bool = False,
+            derive_shifts: bool = False):
+        if derive_shifts and not cache_partitions:
+            raise ValueError("derive_shifts requires cache_partitions")
+        super().__init__(base_url, path, base_parameters, conditional_requests, trusted)
+        self._cache_partitions = cache_partitions
+        self._derive_shifts = derive_shifts
+        self._partitions: Dict[int, Tuple[models.time_partition.TimePartition, datetime.date]] = {}
+
     def deserialize(self, data: bytes) -> Either[http_error.HttpError, models.time_partition.TimePartition]:
         try:
-            return Right(models.time_partition.TimePartition(**json.loads(data)))
+            return Right(self._deserialize_json(models.time_partition.TimePartition, data))
         except Exception as e:
             return Left(http_error.HttpError(message = str(e), http_code = 500))
 
     async def time_partition(self, shift: int = 0) -> Either[http_error.HttpError, models.time_partition.TimePartition]:
-        response = await self._get(self._path(""), parameters = self._parameters({"shift":shift}))
-        return response.then(self.deserialize)
+        if self._cache_partitions:
+            cached = self._cached_partition(shift)
+            if cached is not None:
+                return Right(cached)
+
+        partition = await self._get_deserialized(self._path(""), self._parameters({"shift":shift}), self.deserialize)
+
+        if self._cache_partitions and partition.is_right():
+            self._store_partition(shift, partition.value)
+        return partition
+
+    def clear_partitions(self) -> None:
+        """
+        clear_partitions
+        ================
+
+        Forget all cached time partitions.
+        """
+        self._partitions = {}
+
+    def _cached_partition(self, shift: int) -> Optional[models.time_partition.TimePartition]:
+        today = self._today()
+        self._partitions = {s: (p, expires) for s, (p, expires) in self._partitions.items() if today <= expires}
+
+        if shift in self._partitions:
+            return compat.model_copy(self._partitions[shift][0])
+
+        if self._derive_shifts and self._partitions:
+            known_shift, (known, _) = next(iter(self._partitions.items()))
+            partition = self._shifted(known, shift - known_shift)
+            self._store_partition(shift, partition)
+            return compat.model_copy(partition)
+
+        return None
+
+    def _store_partition(self, shift: int, partition: models.time_partition.TimePartition) -> None:
+        # The end date of the current partition, which is its last day
+        current_end = shift_months(partition.end, -shift * partition.duration_months)
+        self._partitions[shift] = (compat.model_copy(partition), current_end)
+
+    @staticmethod
+    def _shifted(partition: models.time_partition.TimePartition, shift: int) -> models.time_partition.TimePartition:
+        months = shift * partition.duration_months
+        return models.time_partition.TimePartition(
+                start = shift_months(partition.start, months),
+                end = shift_months(partition.end, months),
+                duration_months = partition.duration_months)
+
+    @staticmethod
+    def _today() -> datetime.date:
+        return datetime.date.today()
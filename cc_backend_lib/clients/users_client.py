@@ -1,12 +1,13 @@
 
 from typing import Optional
+from concurrent.futures import Executor
 import datetime
-import json
 import base64
 from pymonad.either import Left, Right, Either
 from cc_backend_lib.errors import http_error
-from cc_backend_lib import models
-from . import model_api_client
+from cc_backend_lib.cache import base_cache
+from cc_backend_lib import models, json_backend, compat
+from . import model_api_client, api_client
 
 class UsersClient(model_api_client.ModelApiClient[models.user.UserDetail, models.user.UserList]):
     """
@@ -17,28 +18,54 @@ class UsersClient(model_api_client.ModelApiClient[models.user.UserDetail, models
         base_url (str):   URL poiting to API exposing users
         path (str):       Path in API that exposes users = ""
         anonymize (bool): Anonymize user data on retrieval = False
-
-    A client that is used to fetch user data from an API.
+        conditional_requests (bool): Revalidate GET requests with ETags = False
+        trusted (bool): Skip validation of responses = False
+        entity_cache (Optional[cc_backend_lib.cache.base_cache.BaseCache[str]]): Cache for user details = None
+        executor (Optional[concurrent.futures.Executor]): Executor for deserializing large lists = None
+        offload_threshold (int): Size in bytes from which lists are deserialized in the executor = 1 MiB
+        max_validators (int): Number of responses to keep validators for = 1024
+
+    A client that is used to fetch user data from an API. When
+    anonymizing, identifiable fields are dropped from the parsed JSON before
+    the models are constructed, so they are never parsed or validated.
     """
 
-    def __init__(self, base_url: str, path: str = "", anonymize: bool = False):
-        super().__init__(base_url, path)
+    def __init__(self,
+            base_url: str,
+            path: str = "",
+            anonymize: bool = False,
+            conditional_requests: bool = False,
+            trusted: bool = False,
+            entity_cache: Optional[base_cache.BaseCache[str]] = None,
+            executor: Optional[Executor] = None,
+            offload_threshold: int = api_client.DEFAULT_OFFLOAD_THRESHOLD,
+            max_validators: int = api_client.DEFAULT_MAX_VALIDATORS):
+        super().__init__(base_url, path,
+                conditional_requests = conditional_requests,
+                trusted = trusted,
+                entity_cache = entity_cache,
+                executor = executor,
+                offload_threshold = offload_threshold,
+                max_validators = max_validators)
         self._anonymize = anonymize
 
     def deserialize_detail(self, data:bytes)-> Either[http_error.HttpError, models.user.UserDetail]:
         try:
-            data = models.user.UserDetail(**json.loads(data))
             if self._anonymize:
-                data.scrub()
+                data = self._deserialize_value(models.user.UserDetail, models.user.UserDetail.scrub_data(json_backend.loads(data)))
+            else:
+                data = self._deserialize_json(models.user.UserDetail, data)
             return Right(data)
         except Exception:
             return Left(http_error.HttpError(message= f"Failed to deserialize: {data}", http_code = 500))
 
     def deserialize_list(self, data:bytes)-> Either[http_error.HttpError, models.user.UserList]:
         try:
-            data = models.user.UserList(**json.loads(data))
             if self._anonymize:
-                data.scrub()
+                data = self._deserialize_value(models.user.UserList, models.user.UserList.scrub_data(json_backend.loads(data)))
+                data.mark_scrubbed()
+            else:
+                data = self._deserialize_json(models.user.UserList, data)
             return Right(data)
         except Exception as e:
             return Left(http_error.HttpError(message = str(e), http_code = 500))
@@ -59,8 +86,8 @@ class UsersClient(model_api_client.ModelApiClient[models.user.UserDetail, models
         result = await self._request("put",
                 self._path(name) + "/email-subscription",
                 parameters = parameters,
-                json = models.user.EmailStatus(has_unsubscribed = status).dict())
-        return result.then(lambda data: models.user.UserEmailStatus(**json.loads(data)))
+                json = compat.model_dump(models.user.EmailStatus(has_unsubscribed = status)))
+        return result.then(lambda data: models.user.UserEmailStatus(**json_backend.loads(data)))
 
     async def id_from_email(self, email: str) -> Either[http_error.HttpError, models.user.UserDetail]:
         """
@@ -81,7 +108,7 @@ class UsersClient(model_api_client.ModelApiClient[models.user.UserDetail, models
                 self._path("") + f"whois-email/{encoded_email}",
                 parameters = self._parameters({}))
 
-        return result.then(lambda data: models.user.UserIdentification(**json.loads(data)))
+        return result.then(lambda data: models.user.UserIdentification(**json_backend.loads(data)))
 
     async def set_email_cooldown_status(self, name: str, last_mailed: Optional[datetime.date] = None):
         """
@@ -101,7 +128,7 @@ class UsersClient(model_api_client.ModelApiClient[models.user.UserDetail, models
         result = await self._request("put",
                 self._path(name) + "/last-emailed",
                 parameters = self._parameters({}),
-                data = models.user.EmailCooldownStatus(last_mailed = last_mailed).json().encode(),
+                data = compat.model_dump_json(models.user.EmailCooldownStatus(last_mailed = last_mailed)),
                 headers = {"content-type":"application/json"})
 
-        return result.then(lambda data: models.user.EmailCooldownStatus(**json.loads(data)))
+        return result.then(lambda data: models.user.EmailCooldownStatus(**json_backend.loads(data)))
@@ -0,0 +1,90 @@
+"""
+compat
+======
+
+Helpers that let the library work with both pydantic v1 and v2. Under v2,
+the compiled validators of pydantic-core are used, and JSON is validated
+directly from bytes without parsing it into Python objects first.
+"""
+import functools
+from typing import Any, Callable, Collection, Dict, Optional, Tuple, Type, TypeVar
+import pydantic
+from cc_backend_lib import json_backend
+
+PYDANTIC_V2 = pydantic.VERSION.startswith("2.")
+
+M = TypeVar("M", bound = pydantic.BaseModel)
+
+if PYDANTIC_V2:
+    from pydantic import field_validator as _field_validator
+
+    def validator(field: str) -> Callable[[Callable], classmethod]:
+        return _field_validator(field)
+
+    def model_dump(model: pydantic.BaseModel, **kwargs) -> Dict[str, Any]:
+        return model.model_dump(**kwargs)
+
+    def model_dump_json(model: pydantic.BaseModel) -> bytes:
+        return model.__pydantic_serializer__.to_json(model)
+
+    def model_copy(model: M, update: Optional[Dict[str, Any]] = None) -> M:
+        return model.model_copy(update = update)
+
+    def model_construct(model: Type[M], **values: Any) -> M:
+        return model.model_construct(**values)
+
+    def rebuild(model: Type[pydantic.BaseModel]) -> None:
+        model.model_rebuild()
+
+    @functools.lru_cache(maxsize = None)
+    def _type_adapter(tp: Any) -> pydantic.TypeAdapter:
+        return pydantic.TypeAdapter(tp)
+
+    def validate_json(tp: Any, data: bytes) -> Any:
+        if isinstance(tp, type) and issubclass(tp, pydantic.BaseModel):
+            return tp.model_validate_json(data)
+        return _type_adapter(tp).validate_json(data)
+
+    def validate(tp: Any, value: Any) -> Any:
+        if isinstance(tp, type) and issubclass(tp, pydantic.BaseModel):
+            return tp.model_validate(value)
+        return _type_adapter(tp).validate_python(value)
+
+    def fields(model: Type[pydantic.BaseModel]) -> Dict[str, Tuple[str, Any]]:
+        return {name: (field.alias or name, field.default) for name, field in model.model_fields.items()}
+
+    def field_names(model: Type[pydantic.BaseModel]) -> Collection[str]:
+        return model.model_fields.keys()
+
+else:
+    def validator(field: str) -> Callable[[Callable], classmethod]:
+        return pydantic.validator(field, allow_reuse = True)
+
+    def model_dump(model: pydantic.BaseModel, **kwargs) -> Dict[str, Any]:
+        return model.dict(**kwargs)
+
+    def model_dump_json(model: pydantic.BaseModel) -> bytes:
+        return json_backend.dumps(model.dict(), default = model.__json_encoder__)
+
+    def model_copy(model: M, update: Optional[Dict[str, Any]] = None) -> M:
+        return model.copy(update = update)
+
+    def model_construct(model: Type[M], **values: Any) -> M:
+        return model.construct(**values)
+
+    def rebuild(model: Type[pydantic.BaseModel]) -> None:
+        model.update_forward_refs()
+
+    def validate_json(tp: Any, data: bytes) -> Any:
+        return validate(tp, json_backend.loads(data))
+
+    def validate(tp: Any, value: Any) -> Any:
+        if isinstance(tp, type) and issubclass(tp, pydantic.BaseModel):
+            return tp.parse_obj(value)
+        return pydantic.parse_obj_as(tp, value)
+
+    def fields(model: Type[pydantic.BaseModel]) -> Dict[str, Tuple[str, Any]]:
+        return {name: (field.alias, field.default) for name, field in model.__fields__.items()}
+
+    def field_names(model: Type[pydantic.BaseModel]) -> Collection[str]:
+        return model.__fields__.keys()
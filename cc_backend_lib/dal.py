@@ -1,21 +1,30 @@
 
+import copy
 import json
 import asyncio
-from typing import Optional, TypeVar
+import warnings
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple, TypeVar, Union
 import pydantic
 from toolz.functoolz import curry, do
 
 from pymonad.either import Either, Right
 from pymonad.maybe import Just, Nothing, Maybe
 
-from cc_backend_lib.clients import predictions_client, scheduler_client, users_client, countries_client
+from cc_backend_lib.clients import predictions_client, scheduler_client, users_client, countries_client, country_registry
 from cc_backend_lib.cache import dict_cache, base_cache, signature
+from cc_backend_lib.summary_store import base_summary_store
 from cc_backend_lib.errors import http_error
-from cc_backend_lib import models, async_either, helpers
+from cc_backend_lib import models, async_either, helpers, request_scope, aggregation, metrics, compat, offload
 
 T = TypeVar("T")
 U = TypeVar("U")
 
+DEFAULT_OFFLOAD_THRESHOLD = 10000
+
+# Users fetched per details call for compact participant lists
+COMPACT_BATCH_SIZE = 100
+
 class Dal():
     """
     Summaries
@@ -26,21 +35,95 @@ class Dal():
         scheduler   (cc_backend_lib.clients.scheduler_client.SchedulerClient)
         users       (cc_backend_lib.clients.users_client.UsersClient)
         countries   (cc_backend_lib.clients.countries_client.CountriesClient)
+        country_registry (Optional[cc_backend_lib.clients.country_registry.CountryRegistry]) = None
+        user_cache (Optional[cc_backend_lib.cache.base_cache.BaseCache[str]]): Deprecated, pass an entity_cache to the UsersClient = None
+        summary_store (Optional[cc_backend_lib.summary_store.base_summary_store.BaseSummaryStore]) = None
+        executor (Optional[concurrent.futures.Executor]) = None
+        offload_threshold (int): Number of predictions from which aggregation is done in the executor = 10000
 
     A class that can be used to fetch various useful summaries.
+
+    Users are fetched with UsersClient.details, so user details are cached
+    by the entity_cache of the UsersClient, if it has one, and are not
+    refetched while they remain in the cache, even if other users in the
+    same fan-out failed. The deprecated user_cache is used as the entity
+    cache of a copy of users, replacing any entity cache it had, so users
+    are only cached once.
+
+    If a summary_store is passed, participant_summary keeps per-partition
+    aggregates in it, and only fetches predictions made since the last
+    ingested prediction date, instead of all predictions in the partition.
+    This assumes that predictions are not added with dates before the
+    latest date that has been ingested.
+
+    If an executor is passed, summaries of at least offload_threshold
+    predictions are aggregated in it, instead of on the event loop (see
+    cc_backend_lib.offload). Aggregation takes prediction models, which
+    would be pickled for a process pool, so prefer a thread pool here, and
+    pass process pools to the clients, for deserialization.
+
+    If a country_registry is passed, country properties are looked up in
+    memory instead of fetching each country from the countries API.
+
+    Use Dal.scoped to get a Dal that shares intermediate results (time
+    partitions, predictions) between all calls made through it, for example
+    when one page needs both participants and a participation summary.
     """
     def __init__(self,
             predictions: predictions_client.PredictionsClient,
             scheduler: scheduler_client.SchedulerClient,
             users: users_client.UsersClient,
-            countries: countries_client.CountriesClient):
+            countries: countries_client.CountriesClient,
+            country_registry: Optional[country_registry.CountryRegistry] = None,
+            user_cache: Optional[base_cache.BaseCache[str]] = None,
+            summary_store: Optional[base_summary_store.BaseSummaryStore] = None,
+            executor: Optional[Executor] = None,
+            offload_threshold: int = DEFAULT_OFFLOAD_THRESHOLD):
+
+        if user_cache is not None:
+            warnings.warn("user_cache is deprecated, pass an entity_cache to the UsersClient instead",
+                    DeprecationWarning, stacklevel = 2)
+            users = users.with_entity_cache(user_cache)
 
         self._predictions = predictions
         self._scheduler = scheduler
         self._users = users
         self._countries = countries
+        self._country_registry = country_registry
+        self._summary_store = summary_store
+        self._offloader = offload.Offloader(executor, offload_threshold)
+        self._scope: Optional[request_scope.RequestScope] = None
+
+    def scoped(self) -> "Dal":
+        """
+        scoped
+        ======
+
+        returns:
+            cc_backend_lib.dal.Dal
+
+        Returns a copy of this Dal with its own request scope. Upstream
+        requests made through the copy are made at most once, and concurrent
+        calls wait for the same request, so independent calls can be run
+        together with asyncio.gather:
+
+            scoped = dal.scoped()
+            participants, summary = await asyncio.gather(
+                    scoped.participants(shift, country_id),
+                    scoped.participant_summary(shift, country_id))
+
+        A scoped Dal should only be used for the duration of a single request.
+        """
+        scoped = copy.copy(self)
+        scoped._scope = request_scope.RequestScope()
+        return scoped
 
+    async def _shared(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        if self._scope is None:
+            return await factory()
+        return await self._scope.run(key, factory)
 
+    @metrics.timed("cc_dal_seconds", method = "predictions")
     async def predictions(self, shift: int, country_id: int) -> Either[http_error.HttpError, models.prediction.PredFeatureCollection]:
         """
         predictions
@@ -59,6 +142,7 @@ class Dal():
         schedule = await self.time_partition(shift)
         return await async_either.AsyncEither.from_either(schedule).async_then(curry(self._predictions_in_partition, country_id))
 
+    @metrics.timed("cc_dal_seconds", method = "time_partition")
     async def time_partition(self, shift: int) -> Either[http_error.HttpError, models.time_partition.TimePartition]:
         """
         time_partition
@@ -70,9 +154,15 @@ class Dal():
         returns:
             Either[cc_backend_lib.errors.http_error.HttpError, cc_backend_lib.models.time_partition.TimePartition]
         """
-        return await self._scheduler.time_partition(shift)
-
-    async def participants(self, shift: int = 0 , country_id: Optional[int] = None) -> Either[http_error.HttpError, models.user.UserList]:
+        return await self._shared(("time_partition", shift), lambda: self._scheduler.time_partition(shift))
+
+    @metrics.timed("cc_dal_seconds", method = "participants")
+    async def participants(self,
+            shift: int = 0 ,
+            country_id: Optional[int] = None,
+            compact: bool = False,
+            partial: bool = False
+            ) -> Either[http_error.HttpError, Union[models.user.UserList, models.user.CompactUserList]]:
         """
         participants
         ============
@@ -80,17 +170,37 @@ class Dal():
         parameters:
             shift (int)
             country_id (int)
+            compact (bool) = False: Return a CompactUserList instead of a UserList
+            partial (bool) = False: Return a PartialUserList instead of failing when some users can not be fetched
 
         returns:
-            Either[cc_backend_lib.errors.http_error.HttpError, cc_backend_lib.models.user.UserList]
+            Either[cc_backend_lib.errors.http_error.HttpError, Union[cc_backend_lib.models.user.UserList, cc_backend_lib.models.user.CompactUserList]]
 
         Returns a UserList of participants for a given shift / country_id
-        combination.
+        combination. With compact, users are stored in a CompactUserList,
+        which keeps them as columns instead of one model per user, and is
+        useful for shifts with many participants. Users are then fetched in
+        batches of COMPACT_BATCH_SIZE, each added as it arrives.
+
+        With partial, the result is a PartialUserList of the users that
+        could be fetched, with errors for the rest by user id. Errors are
+        then only returned if the predictions could not be fetched. compact
+        and partial can not be combined.
         """
+        if compact and partial:
+            raise ValueError("compact and partial can not be combined")
+
         predictions = await self.predictions(shift, country_id)
-        users = await async_either.AsyncEither.from_either(predictions).async_then(self._prediction_authors)
+        if compact:
+            authors = self._compact_prediction_authors
+        elif partial:
+            authors = self._partial_prediction_authors
+        else:
+            authors = self._prediction_authors
+        users = await async_either.AsyncEither.from_either(predictions).async_then(authors)
         return users
 
+    @metrics.timed("cc_dal_seconds", method = "participant_summary")
     async def participant_summary(self,
             shift: int = 0,
             country_id: Optional[int] = None
@@ -109,63 +219,168 @@ class Dal():
         Returns a summary of participation for a time (shift) and country
         (country_id, optional).
         """
-        schedule = await self.time_partition(shift)
-        schedule = async_either.AsyncEither.from_either(schedule)
+        schedule, _ = await asyncio.gather(self.time_partition(shift), self._load_country_registry())
+        if schedule.is_left():
+            return schedule
+
+        if self._summary_store is not None:
+            return await self._incremental_summary(country_id, schedule.value)
+
+        predictions = await self._predictions_in_partition(country_id, schedule.value)
+        if predictions.is_left():
+            return predictions
+
+        features = predictions.value.features
+        tallies = await self._offloader.run(len(features), aggregation.tally_countries, features)
+        country_properties = await self._country_properties(set(tallies))
+        return country_properties.then(lambda props: aggregation.participation_summary(
+                tallies, schedule.value, {c.gwno: c for c in props}))
+
+    @metrics.timed("cc_dal_seconds", method = "participant_summaries")
+    async def participant_summaries(self,
+            shifts: Iterable[int],
+            country_ids: Optional[Iterable[Optional[int]]] = None,
+            approximate: bool = False
+            ) -> Either[http_error.HttpError, Dict[Tuple[int, Optional[int]], models.emailer.ParticipationSummary]]:
+        """
+        participant_summaries
+        =====================
 
-        predictions = await schedule.async_then(curry(self._predictions_in_partition, country_id))
-        predictions = async_either.AsyncEither.from_either(predictions)
+        parameters:
+            shifts (Iterable[int])
+            country_ids (Optional[Iterable[Optional[int]]]) = None
+            approximate (bool) = False: Count distinct participants approximately
 
-        #authors = await predictions.async_then(self._prediction_authors)
-        countries = await predictions.async_then(self._prediction_countries)
+        returns:
+            Either[cc_backend_lib.errors.http_error.HttpError, Dict[Tuple[int, Optional[int]], cc_backend_lib.models.emailer.ParticipationSummary]]
+
+        Returns participation summaries for every combination of shift and
+        country id, keyed by (shift, country_id). A country id of None
+        summarizes all countries, and passing country_ids = None returns only
+        those summaries. Each entry is equal to what participant_summary
+        returns for the same shift and country_id.
+
+        Predictions for the whole range of shifts are fetched in a single
+        request and sorted into partitions locally, and country properties
+        are fetched once for all summaries.
+
+        With approximate, distinct participants are counted with
+        HyperLogLogs instead of sets of author ids, which keeps memory
+        constant per country and shift for long time ranges, at the cost of
+        a relative error of about 1.6% (see cc_backend_lib.hyperloglog).
+        """
+        shifts = list(dict.fromkeys(shifts))
+        country_ids = [None] if country_ids is None else list(dict.fromkeys(country_ids))
+
+        partitions, _ = await asyncio.gather(
+                asyncio.gather(*(self.time_partition(shift) for shift in shifts)),
+                self._load_country_registry())
+        partitions = helpers.combine_http_errors(partitions).then(lambda p: dict(zip(shifts, p)))
+        if partitions.is_left() or not shifts:
+            return partitions.then(lambda _: {})
+        partitions = partitions.value
+
+        span = models.time_partition.TimePartition(
+                start = min(p.start for p in partitions.values()),
+                end = max(p.end for p in partitions.values()),
+                duration_months = 0)
+        single_country = country_ids[0] if len(country_ids) == 1 else None
+        predictions = await self._predictions_in_partition(single_country, span)
+        if predictions.is_left():
+            return predictions
+
+        features = predictions.value.features
+        tallies = await self._offloader.run(len(features), aggregation.tally_partitions, features, partitions, approximate)
+        subsets = {(shift, country_id): aggregation.restrict(tallies[shift], country_id)
+                for shift in shifts for country_id in country_ids}
+
+        country_properties = await self._country_properties({gwno for subset in subsets.values() for gwno in subset})
+        return country_properties.then(lambda props: {c.gwno: c for c in props}).then(
+                lambda props: {(shift, country_id): aggregation.participation_summary(subset, partitions[shift], props)
+                    for (shift, country_id), subset in subsets.items()})
+
+    async def _incremental_summary(self,
+            country_id: Optional[int],
+            schedule: models.time_partition.TimePartition
+            ) -> Either[http_error.HttpError, models.emailer.ParticipationSummary]:
+        watermark = self._summary_store.watermark(schedule)
+        start = max(schedule.start, watermark) if watermark is not None else schedule.start
 
-        participants = (predictions
-            .then(curry(map, lambda p: p.properties["author"]))
-            .then(set)
-            .then(len))
+        predictions = await self._shared(
+                ("predictions", None, start, schedule.end),
+                lambda: self._predictions.list(start_date = start, end_date = schedule.end))
+        if predictions.is_left():
+            return predictions
 
-        return (Either.apply(curry(lambda p, c, s: models.emailer.ParticipationSummary(
-                number_of_users = p,
-                partition = s,
-                countries = c
-            ))).to_arguments(participants, countries, schedule))
+        self._summary_store.ingest(schedule, predictions.value.features)
+        tallies = aggregation.restrict(self._summary_store.tallies(schedule), country_id)
+        country_properties = await self._country_properties(set(tallies))
+        return country_properties.then(lambda props: aggregation.participation_summary(tallies, schedule, {c.gwno: c for c in props}))
 
     async def _prediction_authors(self, predictions: models.prediction.PredFeatureCollection) -> Either[http_error.HttpError, models.user.UserList]:
-        requests = [self._users.detail(id) for id in {p.properties["author"] for p in predictions}]
-        authors = await asyncio.gather(*requests)
-        authors = helpers.combine_http_errors(authors)
+        authors = await self._user_details(list({p.properties.author for p in predictions}))
+        authors = helpers.combine_http_errors(result for _, result in authors)
         authors = authors.then(lambda a: models.user.UserList(users = a))
         return authors
 
-    async def _prediction_countries(self, predictions: models.prediction.PredFeatureCollection):
-        def add_pred_metadata(
-                predictions: models.prediction.PredFeatureCollection,
-                country_props: models.country.CountryProperties
-                ) -> models.country.CountryProperties:
-            country_predictions = [p for p in predictions if p.properties["country"] == country_props.gwno]
-            country_props.predictions = len(country_predictions)
-            country_props.participants = len({p.properties["author"] for p in country_predictions})
-            return country_props
-
-        requests = [self._countries.detail(id) for id in {p.properties["country"] for p in predictions.features}]
-        countries = await asyncio.gather(*requests)
-        countries = helpers.combine_http_errors(countries)
-        country_properties = countries.then(lambda ctries: [c.properties for c in ctries])
-        return country_properties.then(curry(map,curry(add_pred_metadata, predictions))).then(list)
+    async def _partial_prediction_authors(self, predictions: models.prediction.PredFeatureCollection) -> Either[http_error.HttpError, models.user.PartialUserList]:
+        results = await self._user_details(list({p.properties.author for p in predictions}))
+        users, errors = helpers.partition_http_errors(results)
+        return Right(models.user.PartialUserList(users = list(users.values()), errors = errors))
+
+    async def _compact_prediction_authors(self, predictions: models.prediction.PredFeatureCollection) -> Either[http_error.HttpError, models.user.CompactUserList]:
+        # Users are fetched in batches, and each batch is added as it
+        # arrives, so that only the models of batches in flight are kept
+        ids = list({p.properties.author for p in predictions})
+        batches = [self._users.details(ids[i:i + COMPACT_BATCH_SIZE]) for i in range(0, len(ids), COMPACT_BATCH_SIZE)]
+        users = models.user.CompactUserList()
+        errors = []
+        for batch in asyncio.as_completed(batches):
+            for result in await batch:
+                if result.is_right():
+                    users.append(result.value)
+                else:
+                    errors.append(result)
+
+        if errors:
+            return helpers.combine_http_errors(errors)
+        return Right(users)
+
+    async def _user_details(self, ids: List[int]) -> List[Tuple[int, Either[http_error.HttpError, models.user.UserDetail]]]:
+        return list(zip(ids, await self._users.details(ids)))
+
+    async def _load_country_registry(self) -> None:
+        if self._country_registry is not None:
+            await self._country_registry.ensure_loaded()
+
+    async def _country_properties(self, ids: Set[int]) -> Either[http_error.HttpError, List[models.country.CountryProperties]]:
+        if self._country_registry is not None:
+            return await self._country_registry.properties(ids)
+
+        countries = helpers.combine_http_errors(await self._countries.details(list(ids)))
+        return countries.then(lambda ctries: [c.properties for c in ctries])
 
     async def _predictions_in_partition(self,
             country_id: Optional[int],
             schedule: models.time_partition.TimePartition
             ) -> Either[http_error.HttpError, models.prediction.PredFeatureCollection]:
 
+        all_countries_key = ("predictions", None, schedule.start, schedule.end)
+        if country_id is not None and self._scope is not None and all_countries_key in self._scope:
+            all_predictions = await self._scope.result(all_countries_key)
+            return all_predictions.then(lambda collection: models.prediction.PredFeatureCollection(
+                features = [f for f in collection.features if f.properties.country == country_id]))
+
         kwargs = {"start_date": schedule.start, "end_date":  schedule.end}
         kwargs = helpers.dictadd(kwargs, {"country": country_id}) if country_id is not None else kwargs
 
-        predictions = await self._predictions.list(**kwargs)
-        return predictions
+        return await self._shared(
+                ("predictions", country_id, schedule.start, schedule.end),
+                lambda: self._predictions.list(**kwargs))
 
     @staticmethod
     def _serialize_cached_model(model: pydantic.BaseModel) -> str:
-        return model.json()
+        return compat.model_dump_json(model).decode()
 
     @staticmethod
     def _deserialize_cached_model(as_model: T, data: str) -> Maybe[T]:
@@ -1,6 +1,6 @@
 
 import logging
-import mailjet_rest
+from cc_backend_lib import compat
 from . import emailer, mailjet_models
 
 logger = logging.getLogger(__name__)
@@ -14,6 +14,7 @@ class MailjetEmailer(emailer.Emailer):
             api_url: str = "https://api.mailjet.com",
             version: str = "v3.1"):
         super().__init__(from_address, from_name)
+        import mailjet_rest
         self._client = mailjet_rest.Client(auth = (api_key, api_secret), version = version, api_url = api_url)
 
     def send(self, subject:  str, to_email: str, text_content:  str, html_content: str, to_name:  str = "user"):
@@ -33,4 +34,4 @@ class MailjetEmailer(emailer.Emailer):
                 )
             ])
 
-        result = self._client.send.create(data = data.dict())
+        result = self._client.send.create(data = compat.model_dump(data))
@@ -1,26 +1,50 @@
 
-from typing import Optional
+from typing import Iterable, Optional
 import datetime
-from pydantic import BaseModel, validator, ConstrainedInt
+from pydantic import BaseModel, conint
 from pydantic import AnyHttpUrl
+from cc_backend_lib import compat
 
-class HttpCode(ConstrainedInt):
-    ge = 100
-    le = 500
+HttpCode = conint(ge = 100, le = 500)
 
 class HttpError(BaseModel):
     http_code: HttpCode
     message:   str               = ""
-    url:       Optional[AnyHttpUrl]
+    url:       Optional[AnyHttpUrl] = None
     time:      Optional[datetime.datetime] = None
 
-    @validator("time")
+    @compat.validator("time")
+    @classmethod
     def set_time(cls, time: Optional[datetime.datetime]):
         return time if time is not None else datetime.datetime.now()
 
     def __add__(self, other: "HttpError"):
-        return HttpError(
-                http_code = max(self.http_code, other.http_code),
-                message = "\n".join((self.message, other.message)),
-                time = max(self.time, other.time) if any((t is not None for t in (self.time,other.time))) else None
-            )
+        return HttpError.combine((self, other))
+
+    @classmethod
+    def combine(cls, errors: Iterable["HttpError"]) -> "HttpError":
+        """
+        combine
+        =======
+
+        parameters:
+            errors (Iterable[HttpError]): At least one error
+        returns:
+            HttpError
+
+        Combine errors in a single pass, the same way as adding them
+        together: The highest http_code, all messages on separate lines and
+        the latest time. The url is kept if all errors share it, and a
+        single error is returned as it is. The result is built from values
+        that are already valid, and is not validated again.
+        """
+        errors = list(errors)
+        if len(errors) == 1:
+            return errors[0]
+        times = [e.time for e in errors if e.time is not None]
+        urls = {e.url for e in errors}
+        return compat.model_construct(cls,
+                http_code = max(e.http_code for e in errors),
+                message = "\n".join(e.message for e in errors),
+                url = urls.pop() if len(urls) == 1 else None,
+                time = max(times) if times else datetime.datetime.now())
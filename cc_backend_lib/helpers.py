@@ -5,25 +5,52 @@ helpers
 A module containing various helper functions that are useful when doing
 functional programming with toolz.functoolz and pymonad.
 """
-from operator import add
-from typing import TypeVar, Union, List
-from toolz.functoolz import reduce
+from typing import Dict, Hashable, Iterable, Tuple, TypeVar, Union, List
 from pymonad.either import Either, Left, Right
 
 from cc_backend_lib.errors import http_error
 
 T = TypeVar("T")
 U = TypeVar("U")
+K = TypeVar("K", bound = Hashable)
 
 def dictadd(a,b):
     return dict(list(a.items()) + list(b.items()))
 
-def combine_http_errors(results: List[Either[http_error.HttpError, T]]) -> Either[http_error.HttpError, List[T]]:
-    errors = [extract_either(r) for r in results if r.is_left()]
+def combine_http_errors(results: Iterable[Either[http_error.HttpError, T]]) -> Either[http_error.HttpError, List[T]]:
+    values: List[T] = []
+    errors: List[http_error.HttpError] = []
+    for result in results:
+        if result.is_right():
+            values.append(result.value)
+        else:
+            errors.append(result.monoid[0])
     if errors:
-        return Left(reduce(add, errors))
+        return Left(http_error.HttpError.combine(errors))
     else:
-        return Right([extract_either(r) for r in results])
+        return Right(values)
+
+def partition_http_errors(results: Iterable[Tuple[K, Either[http_error.HttpError, T]]]) -> Tuple[Dict[K, T], Dict[K, http_error.HttpError]]:
+    """
+    partition_http_errors
+    =====================
+
+    parameters:
+        results (Iterable[Tuple[K, Either[cc_backend_lib.errors.http_error.HttpError, T]]]): Results by key
+    returns:
+        Tuple[Dict[K, T], Dict[K, cc_backend_lib.errors.http_error.HttpError]]: Successes and errors by key
+
+    Like combine_http_errors, but keeps successes when some results are
+    errors.
+    """
+    values: Dict[K, T] = {}
+    errors: Dict[K, http_error.HttpError] = {}
+    for key, result in results:
+        if result.is_right():
+            values[key] = result.value
+        else:
+            errors[key] = result.monoid[0]
+    return values, errors
 
 def extract_either(e: Either[T,U]) -> Union[T,U]:
     return e.either(lambda x:x, lambda x:x)
@@ -0,0 +1,141 @@
+"""
+hyperloglog
+===========
+
+Approximate distinct counting with HyperLogLog, for counting participants
+over long time ranges without keeping every author id in memory.
+
+A HyperLogLog with precision p uses 2^p one-byte registers, regardless of
+how many values are added, and estimates the number of distinct values with
+a relative standard error of about 1.04 / sqrt(2^p):
+
+    precision   memory   standard error
+    10          1 KiB    3.25%
+    12          4 KiB    1.63%
+    14          16 KiB   0.81%
+
+Estimates are within one standard error about 65% of the time, and within
+three standard errors about 99% of the time. Small counts (below 2.5 * 2^p)
+are corrected with linear counting, and are close to exact.
+
+HyperLogLogs of the same precision can be merged, and the result is the same
+as if all values had been added to one HyperLogLog, so counts can be kept
+per country and per shift and combined into any union.
+"""
+import math
+import hashlib
+from collections import Counter
+from typing import Hashable, Iterable
+
+DEFAULT_PRECISION = 12
+
+class HyperLogLog():
+    """
+    HyperLogLog
+    ===========
+
+    parameters:
+        precision (int): Number of index bits, between 4 and 16 = 12
+
+    A mergeable distinct counter, that can be used in place of a set for
+    counting: values are added with add, unions are made with | and |=, and
+    len returns the estimated number of distinct values.
+    """
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"Precision must be between 4 and 16, not {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: Hashable) -> None:
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size = 8).digest(), "big")
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Hashable]) -> None:
+        for value in values:
+            self.add(value)
+
+    def count(self) -> int:
+        """
+        count
+        =====
+
+        returns:
+            int: The estimated number of distinct values added
+        """
+        m = len(self.registers)
+        ranks = Counter(self.registers)
+        estimate = _alpha(m) * m * m / sum(n * 2.0 ** -rank for rank, n in ranks.items())
+        zeros = ranks.get(0, 0)
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        merge
+        =====
+
+        parameters:
+            other (HyperLogLog): A HyperLogLog of the same precision
+
+        Add all values counted by other to this HyperLogLog.
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Can not merge HyperLogLogs with precision {self.precision} and {other.precision}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def copy(self) -> "HyperLogLog":
+        copy = HyperLogLog(self.precision)
+        copy.registers = bytearray(self.registers)
+        return copy
+
+    def to_bytes(self) -> bytes:
+        return bytes((self.precision,)) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        """
+        from_bytes
+        ==========
+
+        parameters:
+            data (bytes): Data written with to_bytes
+        returns:
+            HyperLogLog
+        """
+        hll = cls(data[0])
+        if len(data) - 1 != len(hll.registers):
+            raise ValueError("Data does not match the precision of the HyperLogLog")
+        hll.registers = bytearray(data[1:])
+        return hll
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __ior__(self, other: "HyperLogLog") -> "HyperLogLog":
+        self.merge(other)
+        return self
+
+    def __or__(self, other: "HyperLogLog") -> "HyperLogLog":
+        union = self.copy()
+        union.merge(other)
+        return union
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, HyperLogLog) and self.precision == other.precision and self.registers == other.registers
+
+def _alpha(m: int) -> float:
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
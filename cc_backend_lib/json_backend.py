@@ -0,0 +1,62 @@
+"""
+json_backend
+============
+
+The JSON implementation used to parse API responses and cached values.
+orjson is used when it is installed, falling back to the standard library
+json module. Another backend can be chosen with set_backend:
+
+    from cc_backend_lib import json_backend
+    json_backend.set_backend(json_backend.STDLIB)
+"""
+import json
+from typing import Any, Callable, NamedTuple, Optional, Union
+
+class Backend(NamedTuple):
+    name:  str
+    loads: Callable[[Union[bytes, str]], Any]
+    dumps: Callable[[Any, Optional[Callable[[Any], Any]]], bytes]
+
+def _stdlib_dumps(value: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    return json.dumps(value, default = default).encode()
+
+STDLIB = Backend("json", json.loads, _stdlib_dumps)
+
+try:
+    import orjson
+except ImportError:
+    ORJSON: Optional[Backend] = None
+else:
+    def _orjson_dumps(value: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        return orjson.dumps(value, default = default, option = orjson.OPT_NON_STR_KEYS)
+
+    ORJSON = Backend("orjson", orjson.loads, _orjson_dumps)
+
+_backend: Backend = ORJSON if ORJSON is not None else STDLIB
+
+def set_backend(backend: Backend) -> None:
+    global _backend
+    _backend = backend
+
+def get_backend() -> Backend:
+    return _backend
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    loads
+    =====
+
+    Parse JSON with the current backend. Raises json.JSONDecodeError (which
+    orjson.JSONDecodeError subclasses) for invalid input.
+    """
+    return _backend.loads(data)
+
+def dumps(value: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    dumps
+    =====
+
+    Serialize a value to JSON bytes with the current backend. default is
+    called for objects the backend cannot serialize.
+    """
+    return _backend.dumps(value, default)
@@ -0,0 +1,164 @@
+"""
+metrics
+=======
+
+A pluggable metrics hook. The library reports counters and observations
+(latencies, sizes) through the Metrics instance set with set_metrics. The
+default does nothing.
+
+To export Prometheus metrics (requires prometheus_client):
+
+    from cc_backend_lib import metrics
+    metrics.set_metrics(metrics.PrometheusMetrics())
+
+Reported metrics:
+    cc_http_request_seconds     (host, method, status)
+    cc_http_response_bytes      (host, method, status)
+    cc_http_sessions_opened     (host)
+    cc_cache_requests           (function, result): result is hit, miss or skip
+    cc_cache_get_seconds        (function)
+    cc_cache_serializer_seconds (function, operation): operation is loads or dumps
+    cc_cache_payload_bytes      (function)
+    cc_cache_invalidations      (function): cached results deleted by invalidating a tag
+    cc_cache_compression_ratio  (function): compressed / uncompressed size of RedisCache values
+    cc_cache_skipped            (function, reason): values not cached, reason is size
+    cc_dal_seconds              (method)
+    cc_offload_seconds          (function): time to run offloaded work in an executor
+    cc_warmer_jobs              (job, result): result is success or failure
+    cc_warmer_seconds           (): time of a warming round
+"""
+import abc
+import time
+import inspect
+import functools
+import contextlib
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+# Histogram buckets of observations that are not latencies, by name suffix
+BYTES_BUCKETS = tuple(float(4 ** i) for i in range(4, 14))
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+DEFAULT_BUCKETS = {"_bytes": BYTES_BUCKETS, "_ratio": RATIO_BUCKETS}
+
+class Metrics(abc.ABC):
+    """
+    Metrics
+    =======
+
+    Base class for metrics backends. Labels are passed as keyword arguments,
+    and a given metric name is always reported with the same label names.
+    """
+    @abc.abstractmethod
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+class NullMetrics(Metrics):
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        pass
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+class PrometheusMetrics(Metrics):
+    """
+    PrometheusMetrics
+    =================
+
+    parameters:
+        registry (Optional[prometheus_client.CollectorRegistry]): Defaults to the global registry
+        buckets (Optional[Dict[str, Sequence[float]]]): Histogram buckets by metric name = None
+
+    Reports increments as Prometheus counters and observations as histograms,
+    creating each metric on first use. Histograms of metrics named *_bytes
+    have buckets from 256 bytes to 64 MiB, *_ratio ones from 0.05 to 1, and
+    others (latencies in seconds) the default buckets of prometheus_client.
+    The buckets of any metric can be set with buckets.
+    """
+    def __init__(self, registry = None, buckets: Optional[Dict[str, Sequence[float]]] = None):
+        import prometheus_client
+        self._prometheus = prometheus_client
+        self._registry = registry if registry is not None else prometheus_client.REGISTRY
+        self._buckets = buckets if buckets is not None else {}
+        self._metrics: Dict[Tuple[str, str], object] = {}
+
+    def _metric(self, kind: str, name: str, labels: Dict[str, str]):
+        try:
+            metric = self._metrics[(kind, name)]
+        except KeyError:
+            if kind == "counter":
+                metric = self._prometheus.Counter(name, name.replace("_", " "), sorted(labels), registry = self._registry)
+            else:
+                metric = self._prometheus.Histogram(name, name.replace("_", " "), sorted(labels),
+                        registry = self._registry, buckets = self._histogram_buckets(name))
+            self._metrics[(kind, name)] = metric
+        return metric.labels(**labels) if labels else metric
+
+    def _histogram_buckets(self, name: str) -> Sequence[float]:
+        if name in self._buckets:
+            return self._buckets[name]
+        for suffix, buckets in DEFAULT_BUCKETS.items():
+            if name.endswith(suffix):
+                return buckets
+        return self._prometheus.Histogram.DEFAULT_BUCKETS
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        self._metric("counter", name, labels).inc(value)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self._metric("histogram", name, labels).observe(value)
+
+_metrics: Metrics = NullMetrics()
+
+def set_metrics(metrics: Metrics) -> None:
+    global _metrics
+    _metrics = metrics
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+@contextlib.contextmanager
+def timer(name: str, **labels: str) -> Iterator[None]:
+    """
+    timer
+    =====
+
+    parameters:
+        name (str)
+        **labels (str)
+
+    Context manager that observes the time spent in its body, in seconds.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _metrics.observe(name, time.perf_counter() - start, **labels)
+
+def timed(name: str, **labels: str):
+    """
+    timed
+    =====
+
+    parameters:
+        name (str)
+        **labels (str)
+
+    Decorator that observes the time spent in a sync or async function, in
+    seconds.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def inner(*args, **kwargs):
+                with timer(name, **labels):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with timer(name, **labels):
+                    return fn(*args, **kwargs)
+        return inner
+    return decorator
@@ -1,2 +1,19 @@
+"""
+Submodules are loaded on first attribute access (PEP 562), so that using
+one model does not import the dependencies of all the others.
+"""
+import importlib
+from typing import TYPE_CHECKING
 
-from . import prediction, user, time_partition, country, emailer
+_SUBMODULES = ("prediction", "user", "time_partition", "country", "emailer", "scales")
+
+if TYPE_CHECKING:
+    from . import prediction, user, time_partition, country, emailer, scales
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
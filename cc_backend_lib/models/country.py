@@ -1,12 +1,14 @@
 
-from typing import List, Optional
+from typing import List, Optional, Literal
 from pydantic import BaseModel
 from geojson_pydantic import features, geometries
+from cc_backend_lib import compat
 
 class Country(features.Feature):
     class Meta:
         QUERY_ORDER = ["gwno","name","iso2c","shape"]
 
+    type: Literal["Feature"] = "Feature"
     properties: "CountryProperties"
 
     @classmethod
@@ -40,4 +42,4 @@ class CountryPropertiesList(BaseModel):
 class CountryList(BaseModel):
     countries: List[CountryIdentity]
 
-Country.update_forward_refs()
+compat.rebuild(Country)
@@ -54,7 +54,7 @@ class ParticipationEmailSpecification(BaseModel):
     countries: List[int]
     content:   str
     template:  int
-    links:     Optional[Dict[str, str]]
+    links:     Optional[Dict[str, str]] = None
 
 class SingleEmailSpecification(BaseModel):
     """
@@ -1,11 +1,20 @@
 
 import datetime
-from typing import List,Dict,Union,Any, Optional
+from typing import List,Any, Optional, Literal
 from pydantic import BaseModel
 from geojson_pydantic import features
+from cc_backend_lib import compat
 from . import scales
 
 class PredictionProperties(BaseModel):
+    """
+    PredictionProperties
+    ====================
+
+    The properties of a PredictionFeature. Properties can also be accessed
+    by key (properties["author"]), for compatibility with code written when
+    properties were a dict. Only fields can be accessed by key.
+    """
     intensity: int
     confidence: int
     author: int
@@ -13,10 +22,16 @@ class PredictionProperties(BaseModel):
     date: datetime.date
     casualties: scales.CasualtyRange
 
+    def __getitem__(self, key: str) -> Any:
+        if key not in compat.field_names(type(self)):
+            raise KeyError(key)
+        return getattr(self, key)
+
 class PredictionFeature(features.Feature):
     class Meta:
         QUERY_ORDER = ["id","shape","values","author_id","country_id","date"]
-    properties: Dict[str,Union[int,float,scales.CasualtyRange,datetime.date,str]] #PredictionProperties
+    type: Literal["Feature"] = "Feature"
+    properties: PredictionProperties
 
     @classmethod
     def from_row(cls,id,shape,values,author_id,country_id,date,*_,**__):
@@ -34,6 +49,7 @@ class PredictionFeature(features.Feature):
         )
 
 class PredFeatureCollection(features.FeatureCollection):
+    type: Literal["FeatureCollection"] = "FeatureCollection"
     features: List[PredictionFeature]
 
     @classmethod
@@ -51,6 +67,7 @@ class CountryFeature(features.Feature):
     class Meta:
         QUERY_ORDER = ["gwno","name","iso2c","shape"]
 
+    type: Literal["Feature"] = "Feature"
     properties: CountryProperties
 
     @classmethod
@@ -89,9 +106,9 @@ class QuarterlyData(BaseModel):
 class PredictionsSummary(BaseModel):
     confidence: float
     intensity: float
-    accuracy: Optional[float]
-    coverage: Optional[float]
-    gwno: Optional[int]
+    accuracy: Optional[float] = None
+    coverage: Optional[float] = None
+    gwno: Optional[int]       = None
     @property
     def evaluated(self):
         return self.accuracy is not None and self.coverage is not None
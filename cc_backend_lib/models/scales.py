@@ -9,8 +9,8 @@ import pydantic
 
 class CasualtyRange(pydantic.BaseModel):
     lower: int
-    upper: Optional[int]
-    text: Optional[str]
+    upper: Optional[int] = None
+    text: Optional[str]  = None
 
     @property
     def zero(self):
@@ -1,6 +1,9 @@
+import array
 import datetime
-from typing import Optional, List, Dict
-from pydantic import BaseModel
+from typing import Any, Optional, List, Dict, Iterable, Iterator
+from pydantic import BaseModel, PrivateAttr
+from cc_backend_lib.errors import http_error
+from cc_backend_lib import compat
 
 class UserIdentification(BaseModel):
     id:    int
@@ -30,14 +33,33 @@ class Scrubbable:
 
     @property
     def identifiable(self):
+        values = self.__dict__
         for field in self.Meta.person_identifiable_fields:
-            if getattr(self, field) is not None:
+            if values.get(field) is not None:
                 return True
         return False
 
     def scrub(self):
-        for field in self.Meta.person_identifiable_fields:
-            setattr(self, field, None)
+        # Bypasses BaseModel.__setattr__, since None is always valid for
+        # identifiable fields
+        self.__dict__.update(dict.fromkeys(self.Meta.person_identifiable_fields))
+
+    @classmethod
+    def scrub_data(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        scrub_data
+        ==========
+
+        parameters:
+            data (Dict[str, Any]): Parsed JSON data for this model
+        returns:
+            Dict[str, Any]
+
+        Returns a copy of data without identifiable fields, for
+        constructing scrubbed models without ever parsing the identifiable
+        values.
+        """
+        return {k: v for k, v in data.items() if k not in cls.Meta.person_identifiable_fields}
 
 
 class UserDetail(
@@ -64,16 +86,149 @@ class UserListed(UserIdentification, UserPersonIdentification, Scrubbable):
                 "email",
             ]
 
+    if compat.PYDANTIC_V2:
+        # Lets lists of users be built from UserDetail models, as under v1
+        model_config = {"from_attributes": True}
+
 class UserList(BaseModel):
+    """
+    UserList
+    ========
+
+    A list of users. Lists that are scrubbed, or constructed from data
+    passed through scrub_data, are marked as such, which makes checking
+    identifiable free until the list is scrubbed again. Modifying the users
+    of a scrubbed list directly is not tracked.
+    """
     users: List[UserListed]
+    _scrubbed: bool = PrivateAttr(default = False)
+
+    def mark_scrubbed(self) -> "UserList":
+        """
+        Mark the list as scrubbed, for lists constructed from data passed
+        through scrub_data. Returns the list itself.
+        """
+        self._scrubbed = True
+        return self
 
     @property
     def identifiable(self):
-        return any((u.identifiable for u in self.users))
+        if self._scrubbed:
+            return False
+        fields = UserListed.Meta.person_identifiable_fields
+        return any(u.__dict__.get(f) is not None for u in self.users for f in fields)
 
     def scrub(self):
+        empty = dict.fromkeys(UserListed.Meta.person_identifiable_fields)
         for user in self.users:
-            user.scrub()
+            user.__dict__.update(empty)
+        self._scrubbed = True
+
+    @classmethod
+    def scrub_data(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        scrub_data
+        ==========
+
+        parameters:
+            data (Dict[str, Any]): Parsed JSON data for a UserList
+        returns:
+            Dict[str, Any]
+
+        Scrub the data of each user, as with Scrubbable.scrub_data.
+        """
+        return {**data, "users": [UserListed.scrub_data(u) for u in data.get("users", [])]}
+
+class PartialUserList(UserList):
+    """
+    PartialUserList
+    ===============
+
+    A UserList of the users that could be retrieved, along with the errors
+    for those that could not, by user id.
+    """
+    errors: Dict[int, http_error.HttpError] = {}
+
+    @property
+    def complete(self) -> bool:
+        return not self.errors
+
+class CompactUserList():
+    """
+    CompactUserList
+    ===============
+
+    parameters:
+        ids (Iterable[int])
+        names (Optional[List[Optional[str]]]): None if no user has a name
+        emails (Optional[List[Optional[str]]]): None if no user has an email
+
+    A memory-compact alternative to UserList, which stores users as columns
+    (ids in an array) instead of as one pydantic model per user. Users are
+    materialized as UserListed models on demand, when indexing or iterating.
+    Use to_user_list to get a regular UserList.
+    """
+    __slots__ = ("ids", "names", "emails")
+
+    def __init__(self,
+            ids: Iterable[int] = (),
+            names: Optional[List[Optional[str]]] = None,
+            emails: Optional[List[Optional[str]]] = None):
+        self.ids = array.array("q", ids)
+        self.names = names
+        self.emails = emails
+
+    @classmethod
+    def from_users(cls, users: Iterable[UserIdentification]) -> "CompactUserList":
+        compact = cls()
+        for user in users:
+            compact.append(user)
+        return compact
+
+    def append(self, user: UserIdentification) -> None:
+        """
+        append
+        ======
+
+        parameters:
+            user (UserIdentification): Any user model with an id, and optionally name and email
+
+        Add a user. The model itself is not kept.
+        """
+        self.names = self._append(self.names, getattr(user, "name", None))
+        self.emails = self._append(self.emails, getattr(user, "email", None))
+        self.ids.append(user.id)
+
+    def _append(self, column: Optional[List[Optional[str]]], value: Optional[str]) -> Optional[List[Optional[str]]]:
+        if column is None:
+            if value is None:
+                return None
+            column = [None] * len(self.ids)
+        column.append(value)
+        return column
+
+    @property
+    def identifiable(self) -> bool:
+        return any(v is not None for column in (self.names, self.emails) if column is not None for v in column)
+
+    def scrub(self) -> None:
+        self.names = None
+        self.emails = None
+
+    def to_user_list(self) -> UserList:
+        return UserList(users = list(self))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> UserListed:
+        return UserListed(
+                id = self.ids[index],
+                name = self.names[index] if self.names is not None else None,
+                email = self.emails[index] if self.emails is not None else None)
+
+    def __iter__(self) -> Iterator[UserListed]:
+        return (self[i] for i in range(len(self)))
 
 class UserEmailStatus(UserIdentification, EmailStatus):
     """
@@ -0,0 +1,71 @@
+"""
+offload
+=======
+
+Running CPU-bound work (deserializing large payloads, aggregating many
+predictions) in an executor, so that it does not block the event loop and
+stall every other request being served by the same worker.
+
+Work is only offloaded above a size threshold, since handing small jobs to
+an executor costs more than it saves. Either kind of executor can be used:
+
+    * A ThreadPoolExecutor returns results without copying them. Pure
+      Python work still holds the GIL, but the event loop gets to run
+      between the switch intervals of the interpreter (5ms by default),
+      instead of waiting for the work to finish.
+    * A ProcessPoolExecutor runs work in parallel with the event loop, but
+      the arguments and results are pickled, so it pays off for work that
+      takes small arguments and returns a result that is cheap to pickle
+      compared to computing it, such as deserializing a response.
+"""
+import time
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Callable, Optional, TypeVar
+from cc_backend_lib import metrics
+
+T = TypeVar("T")
+
+class Offloader():
+    """
+    Offloader
+    =========
+
+    parameters:
+        executor (Optional[concurrent.futures.Executor]): Executor to run work in, or None to run it inline = None
+        threshold (int): Size of work, in the units of the caller, from which it is offloaded = 0
+
+    Runs functions in an executor when the work is large enough.
+    """
+    def __init__(self, executor: Optional[Executor] = None, threshold: int = 0):
+        self._executor = executor
+        self._threshold = threshold
+
+    def offloads(self, size: int) -> bool:
+        return self._executor is not None and size >= self._threshold
+
+    async def run(self, size: int, fn: Callable[..., T], *args) -> T:
+        """
+        run
+        ===
+
+        parameters:
+            size (int): Size of the work, such as a number of bytes or items
+            fn (Callable[..., T])
+            *args: Arguments to fn
+        returns:
+            T
+
+        Call fn with args, in the executor if size is at least the
+        threshold, or directly otherwise. With a process pool, fn, args and
+        the result must be picklable.
+        """
+        name = getattr(fn, "__name__", type(fn).__name__)
+        if not self.offloads(size):
+            return fn(*args)
+
+        start = time.perf_counter()
+        result = await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+        metrics.get_metrics().observe("cc_offload_seconds", time.perf_counter() - start, function = name)
+        return result
@@ -0,0 +1,62 @@
+"""
+request_scope
+=============
+
+Sharing of intermediate results between Dal calls that serve the same
+request.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+class RequestScope():
+    """
+    RequestScope
+    ============
+
+    Memoizes awaitables by key. The first caller for a key starts the
+    computation, and every later (or concurrent) caller for the same key
+    awaits the same task, so each upstream request is made exactly once per
+    scope.
+
+    A scope should live only as long as the request it serves, since results
+    are never expired.
+    """
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        run
+        ===
+
+        parameters:
+            key (Hashable)
+            factory (Callable[[], Awaitable[T]])
+        returns:
+            T
+
+        Return the result for key, calling factory to compute it if no
+        result is available or in progress.
+        """
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.ensure_future(factory())
+        return await asyncio.shield(self._tasks[key])
+
+    async def result(self, key: Hashable) -> Any:
+        """
+        result
+        ======
+
+        parameters:
+            key (Hashable)
+        returns:
+            Any
+
+        Await the result for a key that has already been started.
+        """
+        return await asyncio.shield(self._tasks[key])
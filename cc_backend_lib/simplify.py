@@ -0,0 +1,254 @@
+"""
+simplify
+========
+
+Precomputed bounding boxes and simplified geometries for features, so that
+overview endpoints can serve (and cache) polygons at the resolution of the
+map they are shown on, instead of at full resolution.
+
+Lines and rings are simplified with the Douglas-Peucker algorithm: vertices
+closer than the tolerance to the simplified line are removed, after a linear
+pass that drops vertices closer than the tolerance to the previous kept
+vertex. Tolerances are in the units of the coordinates (degrees, for
+GeoJSON), and tolerance(zoom) gives the size of a pixel at a web map zoom
+level, which is the largest tolerance that is invisible at that zoom.
+
+Rings keep at least four positions, so polygons stay valid GeoJSON, but
+simplified polygons may self-intersect, and should only be used for
+display.
+
+LevelCache stores a collection at full resolution along with simplified
+versions for a set of zoom levels, and returns the version to use for a
+requested zoom.
+"""
+from typing import Any, Dict, Generic, Iterable, List, Optional, Sequence, TypeVar
+from pymonad.maybe import Maybe
+from cc_backend_lib import compat, spatial, trusted
+from cc_backend_lib.cache import base_cache, cache_serializer
+
+F = TypeVar("F")
+C = TypeVar("C")
+
+Position = Sequence[float]
+
+def tolerance(zoom: int, tile_size: int = 256) -> float:
+    """
+    tolerance
+    =========
+
+    parameters:
+        zoom (int): Web map zoom level
+        tile_size (int): Size of map tiles in pixels = 256
+    returns:
+        float: Degrees of longitude per pixel at the zoom level
+    """
+    return 360 / (tile_size * 2 ** zoom)
+
+def simplify_geometry(geometry: Any, tolerance: float) -> Dict[str, Any]:
+    """
+    simplify_geometry
+    =================
+
+    parameters:
+        geometry (Any): A GeoJSON geometry, as a geojson_pydantic model or a dict
+        tolerance (float)
+    returns:
+        Dict[str, Any]: The simplified geometry, as a GeoJSON dict
+    """
+    kind = spatial.member(geometry, "type")
+    if kind == "GeometryCollection":
+        return {"type": kind, "geometries": [simplify_geometry(g, tolerance) for g in spatial.member(geometry, "geometries")]}
+
+    coordinates = spatial.member(geometry, "coordinates")
+    if kind == "LineString":
+        coordinates = _simplify_line(coordinates, tolerance, 2)
+    elif kind == "MultiLineString":
+        coordinates = [_simplify_line(line, tolerance, 2) for line in coordinates]
+    elif kind == "Polygon":
+        coordinates = [_simplify_line(ring, tolerance, 4) for ring in coordinates]
+    elif kind == "MultiPolygon":
+        coordinates = [[_simplify_line(ring, tolerance, 4) for ring in polygon] for polygon in coordinates]
+    else:
+        coordinates = _plain(coordinates)
+    return {"type": kind, "coordinates": coordinates}
+
+def with_bbox(feature: F) -> F:
+    """
+    with_bbox
+    =========
+
+    parameters:
+        feature (F): A feature model, such as a PredictionFeature or a Country
+    returns:
+        F
+
+    Returns a copy of the feature with its bbox set from its geometry.
+    """
+    return compat.model_copy(feature, update = {"bbox": spatial.bbox(feature.geometry)})
+
+def simplify_feature(feature: F, tolerance: float, bbox: Optional[spatial.BBox] = None) -> F:
+    """
+    simplify_feature
+    ================
+
+    parameters:
+        feature (F): A feature model, such as a PredictionFeature or a Country
+        tolerance (float)
+        bbox (Optional[Tuple[float, float, float, float]]): The bbox of the feature, if already known = None
+    returns:
+        F
+
+    Returns a copy of the feature with a simplified geometry. The bbox is
+    set from the full resolution geometry, so that it stays exact.
+    """
+    simplified = simplify_geometry(feature.geometry, tolerance)
+    if compat.PYDANTIC_V2:
+        geometry = compat.validate(type(feature.geometry), simplified)
+    else:
+        # Simplification keeps a valid geometry valid
+        geometry = trusted.construct(type(feature.geometry), simplified)
+    return compat.model_copy(feature, update = {"geometry": geometry, "bbox": bbox or spatial.bbox(feature.geometry)})
+
+def levels(collection: C, zooms: Iterable[int]) -> Dict[Optional[int], C]:
+    """
+    levels
+    ======
+
+    parameters:
+        collection (C): A model with features (such as a PredFeatureCollection), or a list of features
+        zooms (Iterable[int]): Zoom levels to simplify for
+    returns:
+        Dict[Optional[int], C]: Collections by zoom level, with None for full resolution
+
+    Process a collection into a full resolution version, with bounding boxes,
+    and a simplified version for each zoom level.
+    """
+    full = _map_features(collection, with_bbox)
+    bboxes = {id(f): b.bbox for f, b in zip(_features(collection), _features(full))}
+
+    result: Dict[Optional[int], C] = {None: full}
+    for zoom in zooms:
+        result[zoom] = _map_features(collection, lambda f, t = tolerance(zoom): simplify_feature(f, t, bboxes[id(f)]))
+    return result
+
+class LevelCache(Generic[C]):
+    """
+    LevelCache
+    ==========
+
+    parameters:
+        cache (cc_backend_lib.cache.base_cache.BaseCache)
+        serializer (cc_backend_lib.cache.cache_serializer.CacheSerializer[C])
+        zooms (Iterable[int]): Zoom levels to store simplified versions for
+
+    Stores collections at full resolution and simplified for each zoom level,
+    under keys derived from a common key. Overview endpoints get a version
+    that transfers and parses far less than the full resolution one.
+    """
+    def __init__(self,
+            cache: base_cache.BaseCache,
+            serializer: cache_serializer.CacheSerializer[C],
+            zooms: Iterable[int]):
+        self._cache = cache
+        self._serializer = serializer
+        self._zooms = sorted(set(zooms))
+
+    def set(self, key: str, collection: C) -> None:
+        for zoom, level in levels(collection, self._zooms).items():
+            self._cache.set(self._key(key, zoom), self._serializer.dumps(level))
+
+    def get(self, key: str, zoom: Optional[int] = None) -> Maybe[C]:
+        """
+        get
+        ===
+
+        parameters:
+            key (str)
+            zoom (Optional[int]): Zoom level the collection is shown at, or None for full resolution
+        returns:
+            pymonad.maybe.Maybe[C]
+
+        Returns the version for the lowest stored zoom level that is not
+        below zoom (that is, the coarsest version that looks the same at
+        zoom), or full resolution if zoom is above all stored levels.
+        """
+        return self._cache.get(self._key(key, self.level(zoom))).map(self._serializer.loads)
+
+    def level(self, zoom: Optional[int]) -> Optional[int]:
+        if zoom is None:
+            return None
+        return next((z for z in self._zooms if z >= zoom), None)
+
+    @staticmethod
+    def _key(key: str, zoom: Optional[int]) -> str:
+        return key if zoom is None else f"{key}@z{zoom}"
+
+def _features(collection: Any) -> List[Any]:
+    return collection if isinstance(collection, list) else collection.features
+
+def _map_features(collection: C, function) -> C:
+    if isinstance(collection, list):
+        return [function(f) for f in collection]
+    return compat.model_copy(collection, update = {"features": [function(f) for f in collection.features]})
+
+def _plain(coordinates: Any) -> Any:
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return list(coordinates)
+    return [_plain(c) for c in coordinates]
+
+def _simplify_line(points: Sequence[Position], tolerance: float, minimum: int) -> List[List[float]]:
+    points = [[p[0], p[1]] for p in points]
+    if len(points) <= minimum:
+        return points
+
+    squared_tolerance = tolerance * tolerance
+    reduced = _radial_reduce(points, squared_tolerance)
+    keep = [False] * len(reduced)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(reduced) - 1)]
+    while stack:
+        first, last = stack.pop()
+        farthest, distance = -1, squared_tolerance
+        x, y = reduced[first]
+        dx, dy = reduced[last][0] - x, reduced[last][1] - y
+        length = dx * dx + dy * dy
+        for i in range(first + 1, last):
+            px, py = reduced[i]
+            if length > 0:
+                t = ((px - x) * dx + (py - y) * dy) / length
+                t = 0 if t < 0 else 1 if t > 1 else t
+                ex, ey = px - x - dx * t, py - y - dy * t
+            else:
+                ex, ey = px - x, py - y
+            d = ex * ex + ey * ey
+            if d > distance:
+                farthest, distance = i, d
+        if farthest != -1:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    simplified = [p for p, k in zip(reduced, keep) if k]
+    if len(simplified) < minimum:
+        return _keep_farthest(points, minimum)
+    return simplified
+
+def _radial_reduce(points: List[List[float]], squared_tolerance: float) -> List[List[float]]:
+    reduced = [points[0]]
+    x, y = points[0]
+    for point in points[1:-1]:
+        dx, dy = point[0] - x, point[1] - y
+        if dx * dx + dy * dy > squared_tolerance:
+            reduced.append(point)
+            x, y = point
+    reduced.append(points[-1])
+    return reduced
+
+def _keep_farthest(points: List[List[float]], minimum: int) -> List[List[float]]:
+    # A ring collapsed below the minimum: keep the vertices farthest from the
+    # first one, in their original order, so the ring keeps its extent
+    first = points[0]
+    interior = sorted(range(1, len(points) - 1),
+            key = lambda i: (points[i][0] - first[0]) ** 2 + (points[i][1] - first[1]) ** 2,
+            reverse = True)[:minimum - 2]
+    return [first] + [points[i] for i in sorted(interior)] + [points[-1]]
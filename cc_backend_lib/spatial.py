@@ -0,0 +1,265 @@
+"""
+spatial
+=======
+
+A static spatial index over features, for answering which predictions or
+countries intersect a bounding box, or contain a point, without scanning
+every feature.
+
+The index is an R-tree bulk-loaded with the Sort-Tile-Recursive (STR)
+algorithm: entries are sorted into vertical slices by the x center of their
+bounding boxes, and each slice is sorted by y center and packed into nodes,
+level by level. Packed trees have nearly full nodes with little overlap, and
+since the index is built once from a collection and never modified, no
+rebalancing is needed. It is pure Python, with no dependencies beyond the
+library.
+
+Geometries can be geojson_pydantic models or plain GeoJSON dicts. Bounding
+boxes are (min_x, min_y, max_x, max_y), in the coordinates of the
+geometries.
+"""
+import math
+from typing import Any, Generic, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+BBox = Tuple[float, float, float, float]
+
+DEFAULT_NODE_CAPACITY = 16
+
+def bbox(geometry: Any) -> BBox:
+    """
+    bbox
+    ====
+
+    parameters:
+        geometry (Any): A GeoJSON geometry, as a geojson_pydantic model or a dict
+    returns:
+        Tuple[float, float, float, float]: (min_x, min_y, max_x, max_y)
+
+    Compute the bounding box of a geometry. Raises ValueError for geometries
+    without coordinates.
+    """
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    for x, y in _positions(geometry):
+        if x < min_x:
+            min_x = x
+        if x > max_x:
+            max_x = x
+        if y < min_y:
+            min_y = y
+        if y > max_y:
+            max_y = y
+    if min_x == math.inf:
+        raise ValueError("Geometry has no coordinates")
+    return (min_x, min_y, max_x, max_y)
+
+def contains_point(geometry: Any, x: float, y: float) -> bool:
+    """
+    contains_point
+    ==============
+
+    parameters:
+        geometry (Any): A GeoJSON geometry, as a geojson_pydantic model or a dict
+        x (float)
+        y (float)
+    returns:
+        bool
+
+    Whether a Polygon or MultiPolygon contains the point (even-odd rule,
+    holes excluded). For other geometry types, whether the point is inside
+    their bounding box.
+    """
+    kind = member(geometry, "type")
+    if kind == "Polygon":
+        return _polygon_contains(member(geometry, "coordinates"), x, y)
+    if kind == "MultiPolygon":
+        return any(_polygon_contains(polygon, x, y) for polygon in member(geometry, "coordinates"))
+    return _intersects(bbox(geometry), (x, y, x, y))
+
+def member(value: Any, name: str) -> Any:
+    """
+    member
+    ======
+
+    parameters:
+        value (Any): A GeoJSON object, as a geojson_pydantic model or a dict
+        name (str)
+    returns:
+        Any: The member, or None if the object has none of that name
+
+    Get a member of a GeoJSON object, such as the type or coordinates of a
+    geometry, whether it is a model or a dict.
+    """
+    if isinstance(value, dict):
+        return value.get(name)
+    return getattr(value, name, None)
+
+class _Node():
+    __slots__ = ("bbox", "children", "leaf")
+
+    def __init__(self, children: List[Any], leaf: bool):
+        self.children = children
+        self.leaf = leaf
+        self.bbox = _union(child[0] if leaf else child.bbox for child in children)
+
+class SpatialIndex(Generic[T]):
+    """
+    SpatialIndex
+    ============
+
+    parameters:
+        entries (Iterable[Tuple[Tuple[float, float, float, float], T, Any]]): (bbox, item, geometry) triples
+        node_capacity (int): Maximum number of children per node = 16
+
+    An STR-packed R-tree of items by bounding box. Use from_features to
+    index features (such as the features of a PredFeatureCollection, or a
+    list of countries), which computes bounding boxes from their geometries.
+    """
+    def __init__(self, entries: Iterable[Tuple[BBox, T, Any]], node_capacity: int = DEFAULT_NODE_CAPACITY):
+        if node_capacity < 2:
+            raise ValueError("Node capacity must be at least 2")
+        self._capacity = node_capacity
+        entries = list(entries)
+        self._size = len(entries)
+        self._root: Optional[_Node] = self._build(entries) if entries else None
+
+    @classmethod
+    def from_features(cls, features: Iterable[T], node_capacity: int = DEFAULT_NODE_CAPACITY) -> "SpatialIndex[T]":
+        """
+        from_features
+        =============
+
+        parameters:
+            features (Iterable[T]): GeoJSON features, as models or dicts
+            node_capacity (int) = 16
+        returns:
+            SpatialIndex[T]
+
+        Index features by the bounding boxes of their geometries. Features
+        with a bbox member use it instead of computing it. Features without
+        a geometry are not indexed.
+        """
+        entries = []
+        for feature in features:
+            geometry = member(feature, "geometry")
+            if geometry is None:
+                continue
+            box = member(feature, "bbox")
+            entries.append((_flat_bbox(box) if box else bbox(geometry), feature, geometry))
+        return cls(entries, node_capacity)
+
+    def query(self, box: BBox) -> List[T]:
+        """
+        query
+        =====
+
+        parameters:
+            box (Tuple[float, float, float, float]): (min_x, min_y, max_x, max_y)
+        returns:
+            List[T]
+
+        Items whose bounding boxes intersect box.
+        """
+        return [item for _, item, _ in self._search(box)]
+
+    def query_point(self, x: float, y: float, exact: bool = True) -> List[T]:
+        """
+        query_point
+        ===========
+
+        parameters:
+            x (float)
+            y (float)
+            exact (bool) = True: Test polygons for containment, and not just their bounding boxes
+        returns:
+            List[T]
+
+        Items that contain the point (see contains_point).
+        """
+        return [item for _, item, geometry in self._search((x, y, x, y))
+                if not exact or contains_point(geometry, x, y)]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _search(self, box: BBox) -> Iterator[Tuple[BBox, T, Any]]:
+        if self._root is None or not _intersects(self._root.bbox, box):
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.leaf:
+                for entry in node.children:
+                    if _intersects(entry[0], box):
+                        yield entry
+            else:
+                stack.extend(child for child in node.children if _intersects(child.bbox, box))
+
+    def _build(self, entries: List[Tuple[BBox, T, Any]]) -> _Node:
+        nodes = [_Node(group, True) for group in self._pack(entries, lambda e: e[0])]
+        while len(nodes) > 1:
+            nodes = [_Node(group, False) for group in self._pack(nodes, lambda n: n.bbox)]
+        return nodes[0]
+
+    def _pack(self, items: List[Any], box_of) -> List[List[Any]]:
+        capacity = self._capacity
+        node_count = math.ceil(len(items) / capacity)
+        slice_size = math.ceil(math.sqrt(node_count)) * capacity
+
+        items = sorted(items, key = lambda i: _center(box_of(i), 0))
+        groups = []
+        for start in range(0, len(items), slice_size):
+            vertical = sorted(items[start:start + slice_size], key = lambda i: _center(box_of(i), 1))
+            groups.extend(vertical[i:i + capacity] for i in range(0, len(vertical), capacity))
+        return groups
+
+def _flat_bbox(box: Sequence[float]) -> BBox:
+    # GeoJSON bboxes of 3D geometries are (min_x, min_y, min_z, max_x, max_y, max_z)
+    if len(box) == 6:
+        return (box[0], box[1], box[3], box[4])
+    return (box[0], box[1], box[2], box[3])
+
+def _positions(geometry: Any) -> Iterator[Tuple[float, float]]:
+    if member(geometry, "type") == "GeometryCollection":
+        for part in member(geometry, "geometries"):
+            yield from _positions(part)
+        return
+
+    stack = [member(geometry, "coordinates")]
+    while stack:
+        coordinates = stack.pop()
+        if not coordinates:
+            continue
+        if isinstance(coordinates[0], (int, float)):
+            yield coordinates[0], coordinates[1]
+        else:
+            stack.extend(coordinates)
+
+def _polygon_contains(rings: Sequence[Sequence[Sequence[float]]], x: float, y: float) -> bool:
+    inside = False
+    for ring in rings:
+        previous = ring[-1]
+        for point in ring:
+            if (point[1] > y) != (previous[1] > y):
+                crossing = (previous[0] - point[0]) * (y - point[1]) / (previous[1] - point[1]) + point[0]
+                if x < crossing:
+                    inside = not inside
+            previous = point
+    return inside
+
+def _intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def _union(boxes: Iterable[BBox]) -> BBox:
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    for box in boxes:
+        min_x = min(min_x, box[0])
+        min_y = min(min_y, box[1])
+        max_x = max(max_x, box[2])
+        max_y = max(max_y, box[3])
+    return (min_x, min_y, max_x, max_y)
+
+def _center(box: BBox, axis: int) -> float:
+    return (box[axis] + box[axis + 2]) / 2
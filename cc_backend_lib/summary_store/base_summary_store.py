@@ -0,0 +1,48 @@
+"""
+base_summary_store
+==================
+
+Incrementally updated participation aggregates, kept per time partition.
+"""
+import datetime
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Optional
+from cc_backend_lib import models, aggregation, compat
+
+class BaseSummaryStore(ABC):
+    """
+    BaseSummaryStore
+    ================
+
+    Base class for stores of per-partition aggregates: the number of
+    predictions and the set of distinct authors per country, along with a
+    watermark, which is the latest prediction date that has been ingested.
+
+    Predictions are identified by their id (or a hash of the feature if it
+    has none), so ingesting the same prediction more than once does not
+    change the aggregates. This lets callers fetch predictions from the
+    watermark date inclusive, to pick up predictions made later on that
+    same day.
+    """
+    @abstractmethod
+    def watermark(self, partition: models.time_partition.TimePartition) -> Optional[datetime.date]:
+        pass
+
+    @abstractmethod
+    def ingest(self, partition: models.time_partition.TimePartition, features: Iterable[models.prediction.PredictionFeature]) -> None:
+        pass
+
+    @abstractmethod
+    def tallies(self, partition: models.time_partition.TimePartition) -> Dict[int, aggregation.CountryTally]:
+        pass
+
+    @staticmethod
+    def _partition_key(partition: models.time_partition.TimePartition) -> str:
+        return f"{partition.start.isoformat()}/{partition.end.isoformat()}"
+
+    @staticmethod
+    def _prediction_key(feature: models.prediction.PredictionFeature) -> str:
+        if feature.id is not None:
+            return str(feature.id)
+        return hashlib.sha1(compat.model_dump_json(feature)).hexdigest()
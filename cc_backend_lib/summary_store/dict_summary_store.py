@@ -0,0 +1,60 @@
+import datetime
+from typing import Dict, Iterable, Optional, Set
+from cc_backend_lib import models, aggregation
+from . import base_summary_store
+
+class _PartitionState():
+    __slots__ = ("watermark", "seen", "tallies")
+
+    def __init__(self):
+        self.watermark: Optional[datetime.date] = None
+        self.seen: Set[str] = set()
+        self.tallies: Dict[int, aggregation.CountryTally] = {}
+
+class DictSummaryStore(base_summary_store.BaseSummaryStore):
+    """
+    DictSummaryStore
+    ================
+
+    parameters:
+        approximate (bool) = False: Count distinct authors with HyperLogLogs (see cc_backend_lib.hyperloglog)
+
+    A summary store kept in memory, for a single process.
+    """
+    def __init__(self, approximate: bool = False):
+        self._partitions: Dict[str, _PartitionState] = {}
+        self._approximate = approximate
+
+    def watermark(self, partition: models.time_partition.TimePartition) -> Optional[datetime.date]:
+        state = self._partitions.get(self._partition_key(partition))
+        return state.watermark if state is not None else None
+
+    def ingest(self, partition: models.time_partition.TimePartition, features: Iterable[models.prediction.PredictionFeature]) -> None:
+        state = self._partitions.setdefault(self._partition_key(partition), _PartitionState())
+        for feature in features:
+            key = self._prediction_key(feature)
+            if key in state.seen:
+                continue
+            state.seen.add(key)
+
+            properties = feature.properties
+            tally = state.tallies.get(properties.country)
+            if tally is None:
+                tally = state.tallies[properties.country] = aggregation.CountryTally(self._approximate)
+            tally.predictions += 1
+            tally.authors.add(properties.author)
+            if state.watermark is None or properties.date > state.watermark:
+                state.watermark = properties.date
+
+    def tallies(self, partition: models.time_partition.TimePartition) -> Dict[int, aggregation.CountryTally]:
+        state = self._partitions.get(self._partition_key(partition))
+        if state is None:
+            return {}
+        return {gwno: self._copy(tally) for gwno, tally in state.tallies.items()}
+
+    @staticmethod
+    def _copy(tally: aggregation.CountryTally) -> aggregation.CountryTally:
+        copy = aggregation.CountryTally()
+        copy.predictions = tally.predictions
+        copy.authors = tally.authors.copy()
+        return copy
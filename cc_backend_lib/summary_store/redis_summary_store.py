@@ -0,0 +1,193 @@
+import datetime
+import logging
+from typing import Dict, FrozenSet, Iterable, Optional
+from cc_backend_lib import models, aggregation
+from . import base_summary_store
+
+logger = logging.getLogger(__name__)
+
+# Adds the predictions that have not been seen before to the aggregates of
+# a partition, and moves the watermark forward, atomically. All keys are
+# passed in KEYS, so the script can run on a cluster: the keys of a
+# partition share a hash tag.
+#
+# KEYS[1]: Set of seen predictions
+# KEYS[2]: Hash of prediction counts by country
+# KEYS[3]: Watermark
+# KEYS[4..]: Sets (or HyperLogLogs) of authors, one per country in the batch
+# ARGV:    expiry time (0 for none), watermark ("" to leave it), "1" to add
+#          authors to HyperLogLogs, then (prediction, country, index of the
+#          authors key, author) tuples
+_INGEST = """
+local expiry = tonumber(ARGV[1])
+local add_author = ARGV[3] == '1' and 'PFADD' or 'SADD'
+local added = 0
+for i = 4, #ARGV, 4 do
+    if redis.call('SADD', KEYS[1], ARGV[i]) == 1 then
+        redis.call('HINCRBY', KEYS[2], ARGV[i + 1], 1)
+        redis.call(add_author, KEYS[tonumber(ARGV[i + 2])], ARGV[i + 3])
+        added = added + 1
+    end
+end
+if ARGV[2] ~= '' then
+    local current = redis.call('GET', KEYS[3])
+    if not current or current < ARGV[2] then
+        redis.call('SET', KEYS[3], ARGV[2])
+    end
+end
+if expiry > 0 then
+    for i = 1, #KEYS do
+        redis.call('EXPIRE', KEYS[i], expiry)
+    end
+end
+return added
+"""
+
+# Predictions ingested per script call, to keep the number of arguments and
+# the time the server is blocked by a single call bounded
+_BATCH_SIZE = 1000
+
+class RedisHyperLogLog():
+    """
+    RedisHyperLogLog
+    ================
+
+    parameters:
+        redis (redis.Redis)
+        keys (FrozenSet[str]): Keys of HyperLogLogs
+        count (Optional[int]): PFCOUNT of the keys, if known = None
+
+    The union of HyperLogLogs kept in Redis, which can be used in place of a
+    set of authors for counting: unions are made with | and |=, without
+    reading or writing anything, and len returns PFCOUNT of all the keys,
+    which Redis computes without storing the union.
+    """
+    __slots__ = ("_redis", "_keys", "_count")
+
+    def __init__(self, redis, keys: FrozenSet[str], count: Optional[int] = None):
+        self._redis = redis
+        self._keys = keys
+        self._count = count
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = self._redis.pfcount(*self._keys) if self._keys else 0
+        return self._count
+
+    def copy(self) -> "RedisHyperLogLog":
+        return RedisHyperLogLog(self._redis, self._keys, self._count)
+
+    def __ior__(self, other: "RedisHyperLogLog") -> "RedisHyperLogLog":
+        if not other._keys <= self._keys:
+            self._keys = self._keys | other._keys
+            self._count = None
+        return self
+
+    def __or__(self, other: "RedisHyperLogLog") -> "RedisHyperLogLog":
+        union = self.copy()
+        union |= other
+        return union
+
+class RedisSummaryStore(base_summary_store.BaseSummaryStore):
+    """
+    RedisSummaryStore
+    =================
+
+    parameters:
+        host (str)
+        expiry_time (Optional[int]): Seconds to keep aggregates after they were last updated = None
+        port (int) = 6379
+        db (int) = 0
+        prefix (str) = "cc_summaries"
+        batch_size (int): Predictions ingested per script call = 1000
+        approximate (bool): Count distinct authors with Redis HyperLogLogs = False
+
+    A summary store kept in Redis, which lets all workers share aggregates.
+    Ingestion is done by a script, in batches of batch_size predictions, so
+    concurrent ingestion of the same predictions by several workers counts
+    each prediction once. The watermark is moved with the last batch, so if
+    ingestion is interrupted, the remaining predictions are fetched again.
+
+    With approximate, the authors of each country are added to a Redis
+    HyperLogLog (PFADD) instead of a set, which takes at most 12 KiB however
+    many authors there are, and counts have a standard error of 0.81%.
+    Tallies then hold RedisHyperLogLog authors, counted with PFCOUNT.
+    Exact and approximate aggregates are kept under different keys.
+    """
+    def __init__(self,
+            host: str,
+            expiry_time: Optional[int] = None,
+            port: int = 6379,
+            db: int = 0,
+            prefix: str = "cc_summaries",
+            batch_size: int = _BATCH_SIZE,
+            approximate: bool = False):
+        import redis
+        self._redis = redis.Redis(host = host, port = port, db = db)
+        self._ingest = self._redis.register_script(_INGEST)
+        self._expiry_time = expiry_time
+        self._prefix = prefix
+        self._batch_size = batch_size
+        self._approximate = approximate
+        logger.debug("Initialized redis summary store: redis://%s:%s/%s", host, port, db)
+
+    def watermark(self, partition: models.time_partition.TimePartition) -> Optional[datetime.date]:
+        value = self._redis.get(self._base(partition) + "watermark")
+        return datetime.date.fromisoformat(value.decode()) if value is not None else None
+
+    def ingest(self, partition: models.time_partition.TimePartition, features: Iterable[models.prediction.PredictionFeature]) -> None:
+        features = list(features)
+        if not features:
+            return
+        watermark = max(feature.properties.date for feature in features)
+
+        base = self._base(partition)
+        added = 0
+        for start in range(0, len(features), self._batch_size):
+            batch = features[start:start + self._batch_size]
+            keys = [base + "seen", base + "counts", base + "watermark"]
+            author_keys: Dict[int, int] = {}
+            arguments = []
+            for feature in batch:
+                country = feature.properties.country
+                if country not in author_keys:
+                    keys.append(self._authors_key(base, country))
+                    author_keys[country] = len(keys)
+                arguments.extend((self._prediction_key(feature), country, author_keys[country], feature.properties.author))
+
+            last = start + self._batch_size >= len(features)
+            added += self._ingest(keys = keys, args = [
+                self._expiry_time or 0,
+                watermark.isoformat() if last else "",
+                "1" if self._approximate else "0",
+                *arguments])
+        logger.debug("Ingested %s new predictions into %s", added, base)
+
+    def tallies(self, partition: models.time_partition.TimePartition) -> Dict[int, aggregation.CountryTally]:
+        base = self._base(partition)
+        counts = {int(gwno): int(count) for gwno, count in self._redis.hgetall(base + "counts").items()}
+
+        pipeline = self._redis.pipeline()
+        for gwno in counts:
+            if self._approximate:
+                pipeline.pfcount(self._authors_key(base, gwno))
+            else:
+                pipeline.smembers(self._authors_key(base, gwno))
+
+        tallies = {}
+        for (gwno, count), authors in zip(counts.items(), pipeline.execute()):
+            tally = aggregation.CountryTally()
+            tally.predictions = count
+            if self._approximate:
+                tally.authors = RedisHyperLogLog(self._redis, frozenset([self._authors_key(base, gwno)]), authors)
+            else:
+                tally.authors = {int(a) for a in authors}
+            tallies[gwno] = tally
+        return tallies
+
+    def _authors_key(self, base: str, gwno: int) -> str:
+        return f"{base}{'authors_hll' if self._approximate else 'authors'}/{gwno}"
+
+    def _base(self, partition: models.time_partition.TimePartition) -> str:
+        # The partition is the hash tag, so its keys are in the same slot
+        return f"{self._prefix}/{{{self._partition_key(partition)}}}/"
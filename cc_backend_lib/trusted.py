@@ -0,0 +1,152 @@
+"""
+trusted
+=======
+
+Construction of pydantic models from known-good data without validation.
+
+For upstream services that are trusted to return well-formed data, running
+full validation on every response is wasted work. construct builds a model
+(and all nested models) with BaseModel.construct, only doing the cheap
+conversions needed for the result to behave like a validated model:
+
+    * Nested models, and lists and dicts of models, are constructed
+    * Unions of models are resolved by their "type" field (as in GeoJSON)
+    * ISO formatted strings are parsed for date and datetime fields
+    * Integers are converted to strings for str fields
+
+No other coercion or validation is done, so data that is not well-formed
+results in models that are not either.
+"""
+import datetime
+import functools
+import typing
+from typing import Any, Callable, Dict, Literal, Tuple, Type, TypeVar, Union
+import pydantic
+from cc_backend_lib import compat
+
+M = TypeVar("M", bound = pydantic.BaseModel)
+Converter = Callable[[Any], Any]
+
+_ANNOTATED = getattr(typing, "Annotated", None)
+
+def construct(model: Type[M], data: Dict[str, Any]) -> M:
+    """
+    construct
+    =========
+
+    parameters:
+        model (Type[pydantic.BaseModel])
+        data (Dict[str, Any]): Parsed JSON data
+    returns:
+        pydantic.BaseModel
+
+    Construct model from data, without validation.
+    """
+    values = {}
+    for name, (alias, convert) in _plan(model).items():
+        if alias in data:
+            values[name] = convert(data[alias])
+    return compat.model_construct(model, **values)
+
+def convert(tp: Any, data: Any) -> Any:
+    """
+    convert
+    =======
+
+    parameters:
+        tp (Any): A pydantic model, or a type such as List[Model]
+        data (Any): Parsed JSON data
+    returns:
+        Any
+
+    Like construct, but for any type that construct knows how to convert.
+    """
+    return _converter(tp)(data)
+
+@functools.lru_cache(maxsize = None)
+def _plan(model: Type[pydantic.BaseModel]) -> Dict[str, Tuple[str, Converter]]:
+    hints = typing.get_type_hints(model)
+    return {name: (alias, _converter(hints.get(name, Any))) for name, (alias, _) in compat.fields(model).items()}
+
+def _identity(value: Any) -> Any:
+    return value
+
+def _parse_date(value: Any) -> Any:
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+def _parse_datetime(value: Any) -> Any:
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+def _to_str(value: Any) -> Any:
+    return str(value) if isinstance(value, int) else value
+
+def _optional(convert: Converter) -> Converter:
+    return lambda value: None if value is None else convert(value)
+
+def _model_type(model: Type[pydantic.BaseModel]) -> Any:
+    _, default = compat.fields(model).get("type", (None, None))
+    if isinstance(default, str):
+        return default
+    annotation = typing.get_type_hints(model).get("type")
+    if typing.get_origin(annotation) is Literal:
+        return typing.get_args(annotation)[0]
+    return None
+
+@functools.lru_cache(maxsize = None)
+def _converter(tp: Any) -> Converter:
+    if isinstance(tp, TypeVar):
+        return _converter(tp.__bound__) if tp.__bound__ is not None else _identity
+
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+
+    if _ANNOTATED is not None and origin is _ANNOTATED:
+        return _converter(args[0])
+
+    if origin is Union:
+        members = [a for a in args if a is not type(None)]
+        if len(members) == 1:
+            return _optional(_converter(members[0]))
+        return _optional(_union_converter(members))
+
+    if origin in (list, typing.List):
+        item = _converter(args[0]) if args else _identity
+        if item is _identity:
+            return _identity
+        return _optional(lambda value: [item(v) for v in value])
+
+    if origin in (dict, typing.Dict):
+        item = _converter(args[1]) if args else _identity
+        if item is _identity:
+            return _identity
+        return _optional(lambda value: {k: item(v) for k,v in value.items()})
+
+    if isinstance(tp, type):
+        if issubclass(tp, pydantic.BaseModel):
+            return _optional(lambda value: construct(tp, value) if isinstance(value, dict) else value)
+        if issubclass(tp, datetime.datetime):
+            return _parse_datetime
+        if issubclass(tp, datetime.date):
+            return _parse_date
+        if issubclass(tp, str):
+            return _to_str
+    return _identity
+
+def _union_converter(members) -> Converter:
+    models = [m for m in members if isinstance(m, type) and issubclass(m, pydantic.BaseModel)]
+    by_type = {_model_type(m): m for m in models if _model_type(m) is not None}
+    dates = [m for m in members if isinstance(m, type) and issubclass(m, datetime.date)]
+    parse_date = _converter(dates[0]) if dates else None
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, dict) and models:
+            return construct(by_type.get(value.get("type"), models[0]), value)
+        if isinstance(value, str) and parse_date is not None:
+            try:
+                return parse_date(value)
+            except ValueError:
+                return value
+        return value
+    return convert
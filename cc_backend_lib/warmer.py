@@ -0,0 +1,315 @@
+"""
+warmer
+======
+
+Background cache warming, so that the first request after a cache entry
+expires (or after a deploy) does not have to wait for upstream APIs.
+
+A CacheWarmer runs a set of jobs periodically, on an asyncio schedule with
+jitter, and with a limit on how many jobs run at once. When several replicas
+run a warmer, pass a RedisLock: the replica holding the lock is the only one
+that warms, and keeps the lock by renewing it every round. If it stops, the
+lock expires and another replica takes over.
+
+Jobs are async callables without arguments. summaries_job and
+predictions_job make jobs that compute the summaries or predictions of a
+set of shifts for all countries, with as few upstream requests as possible,
+and pass each result to a store function. Use the prime method of functions
+decorated with cc_backend_lib.cache.cache.cache to store them:
+
+    @cache.cache(...)
+    async def summary(shift, country_id):
+        ...
+
+    warmer = CacheWarmer([summaries_job(dal, lambda shift, country_id, s: summary.prime(s, shift, country_id))], interval = 60)
+    warmer.start()
+"""
+import uuid
+import random
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Iterable, Optional
+from pymonad.either import Either, Right
+from cc_backend_lib import models, metrics, dal as dal_module
+from cc_backend_lib.errors import http_error
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[Any]]
+
+class BaseLock(ABC):
+    """
+    BaseLock
+    ========
+
+    A lock held for a limited time, used to elect a single replica to warm.
+    """
+    @abstractmethod
+    def acquire(self) -> bool:
+        """
+        acquire
+        =======
+
+        returns:
+            bool: Whether the lock is held
+
+        Acquire the lock, or renew it if it is already held.
+        """
+
+    @abstractmethod
+    def release(self) -> None:
+        pass
+
+# Renews the lock if it is held with this token.
+#
+# KEYS[1]: The lock
+# ARGV:    token, milliseconds to hold the lock for
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Deletes the lock if it is held with this token.
+#
+# KEYS[1]: The lock
+# ARGV:    token
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class RedisLock(BaseLock):
+    """
+    RedisLock
+    =========
+
+    parameters:
+        host (str)
+        ttl (float): Seconds to hold the lock for after acquiring or renewing it
+        name (str) = "cc_cache_warmer"
+        port (int) = 6379
+        db (int) = 0
+
+    A lock kept in Redis, with a random token per instance, so that only
+    the holder can renew or release it. The ttl should be longer than the
+    interval between renewals.
+    """
+    def __init__(self,
+            host: str,
+            ttl: float,
+            name: str = "cc_cache_warmer",
+            port: int = 6379,
+            db: int = 0):
+        import redis
+        self._redis = redis.Redis(host = host, port = port, db = db)
+        self._renew = self._redis.register_script(_RENEW)
+        self._release = self._redis.register_script(_RELEASE)
+        self._name = name
+        self._ttl = int(ttl * 1000)
+        self._token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        if self._renew(keys = [self._name], args = [self._token, self._ttl]):
+            return True
+        return bool(self._redis.set(self._name, self._token, nx = True, px = self._ttl))
+
+    def release(self) -> None:
+        self._release(keys = [self._name], args = [self._token])
+
+class CacheWarmer():
+    """
+    CacheWarmer
+    ===========
+
+    parameters:
+        jobs (Iterable[Callable[[], Awaitable[Any]]]): Jobs to run every round
+        interval (float): Seconds between rounds
+        jitter (float): Fraction of the interval to randomly add to or subtract from it = 0.1
+        concurrency (int): Maximum number of jobs to run at once = 4
+        lock (Optional[BaseLock]): Lock to hold while warming = None
+
+    Runs jobs in the background (see start / stop), or once with warm.
+    Jobs that raise, or return a Left, are logged and counted as failures,
+    and do not stop the warmer. The interval should be shorter than the
+    expiry time of the warmed caches, so that entries are replaced before
+    they expire.
+    """
+    def __init__(self,
+            jobs: Iterable[Job],
+            interval: float,
+            jitter: float = 0.1,
+            concurrency: int = 4,
+            lock: Optional[BaseLock] = None):
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        self._jobs = list(jobs)
+        self._interval = interval
+        self._jitter = jitter
+        self._concurrency = concurrency
+        self._lock = lock
+        self._task: Optional[asyncio.Task] = None
+
+    async def warm(self) -> Optional[int]:
+        """
+        warm
+        ====
+
+        returns:
+            Optional[int]: The number of jobs that succeeded, or None if another replica holds the lock
+
+        Run all jobs once, if the lock is held (or there is no lock).
+        """
+        if self._lock is not None and not self._lock.acquire():
+            logger.debug("Not warming, the lock is held by another replica")
+            return None
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+        async def run(job: Job) -> bool:
+            async with semaphore:
+                return await self._run(job)
+
+        with metrics.timer("cc_warmer_seconds"):
+            results = await asyncio.gather(*(run(job) for job in self._jobs))
+        return sum(results)
+
+    def start(self) -> None:
+        """
+        start
+        =====
+
+        Start warming periodically in the background. Must be called from
+        within a running event loop.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._warm_periodically())
+
+    async def stop(self) -> None:
+        """
+        stop
+        ====
+
+        Stop warming, and release the lock.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock is not None:
+            self._lock.release()
+
+    def _delay(self) -> float:
+        return max(0.0, self._interval * (1 + random.uniform(-self._jitter, self._jitter)))
+
+    async def _run(self, job: Job) -> bool:
+        name = getattr(job, "__name__", repr(job))
+        try:
+            result = await job()
+        except Exception: # pylint: disable=broad-except
+            logger.exception("Warming job %s failed", name)
+            result = None
+        else:
+            if not isinstance(result, Either) or result.is_right():
+                metrics.get_metrics().increment("cc_warmer_jobs", job = name, result = "success")
+                return True
+            logger.warning("Warming job %s failed: %s", name, result.monoid[0].message)
+        metrics.get_metrics().increment("cc_warmer_jobs", job = name, result = "failure")
+        return False
+
+    async def _warm_periodically(self) -> None:
+        # Replicas started at the same time are spread out from the first round
+        await asyncio.sleep(random.uniform(0, self._interval * self._jitter))
+        while True:
+            await self.warm()
+            await asyncio.sleep(self._delay())
+
+def summaries_job(
+        dal: dal_module.Dal,
+        store: Callable[[int, Optional[int], models.emailer.ParticipationSummary], Any],
+        shifts: Iterable[int] = (0, -1),
+        country_ids: Optional[Iterable[int]] = None) -> Job:
+    """
+    summaries_job
+    =============
+
+    parameters:
+        dal (cc_backend_lib.dal.Dal)
+        store (Callable[[int, Optional[int], cc_backend_lib.models.emailer.ParticipationSummary], Any]): Called with (shift, country_id, summary)
+        shifts (Iterable[int]) = (0, -1): The current and previous shift
+        country_ids (Optional[Iterable[int]]) = None: Countries to warm, or all countries with predictions
+    returns:
+        Callable[[], Awaitable[Either[cc_backend_lib.errors.http_error.HttpError, int]]]
+
+    A job that computes the participant summaries of shifts, for all
+    countries and for each country, and stores them. Predictions are
+    fetched once for all shifts and countries.
+    """
+    shifts = list(shifts)
+    country_ids = list(country_ids) if country_ids is not None else None
+
+    async def warm_summaries() -> Either[http_error.HttpError, int]:
+        scoped = dal.scoped()
+        if country_ids is not None:
+            summaries = await scoped.participant_summaries(shifts, [None, *country_ids])
+        else:
+            # The countries with predictions are those of the summaries of
+            # all countries, and the predictions are shared by both calls
+            summaries = await scoped.participant_summaries(shifts, [None])
+            ids = summaries.then(lambda s: sorted({c.gwno for summary in s.values() for c in summary.countries}))
+            if ids.is_right() and ids.value:
+                by_country = await scoped.participant_summaries(shifts, ids.value)
+                summaries = summaries.then(lambda s: by_country.then(lambda b: {**s, **b}))
+        if summaries.is_left():
+            return summaries
+        for (shift, country_id), summary in summaries.value.items():
+            store(shift, country_id, summary)
+        return Right(len(summaries.value))
+    return warm_summaries
+
+def predictions_job(
+        dal: dal_module.Dal,
+        store: Callable[[int, Optional[int], models.prediction.PredFeatureCollection], Any],
+        shifts: Iterable[int] = (0, -1),
+        country_ids: Optional[Iterable[int]] = None) -> Job:
+    """
+    predictions_job
+    ===============
+
+    parameters:
+        dal (cc_backend_lib.dal.Dal)
+        store (Callable[[int, Optional[int], cc_backend_lib.models.prediction.PredFeatureCollection], Any]): Called with (shift, country_id, predictions)
+        shifts (Iterable[int]) = (0, -1): The current and previous shift
+        country_ids (Optional[Iterable[int]]) = None: Countries to warm, or all countries with predictions
+    returns:
+        Callable[[], Awaitable[Either[cc_backend_lib.errors.http_error.HttpError, int]]]
+
+    A job that fetches the predictions of shifts, for all countries and for
+    each country, and stores them. Predictions are fetched once per shift,
+    and filtered by country locally.
+    """
+    shifts = list(shifts)
+
+    async def warm_predictions() -> Either[http_error.HttpError, int]:
+        scoped = dal.scoped()
+        stored = 0
+        for shift in shifts:
+            predictions = await scoped.predictions(shift, None)
+            if predictions.is_left():
+                return predictions
+            store(shift, None, predictions.value)
+            ids = country_ids if country_ids is not None else sorted({f.properties.country for f in predictions.value.features})
+            for country_id in ids:
+                country_predictions = await scoped.predictions(shift, country_id)
+                if country_predictions.is_left():
+                    return country_predictions
+                store(shift, country_id, country_predictions.value)
+            stored += 1 + len(ids)
+        return Right(stored)
+    return warm_predictions
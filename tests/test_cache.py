@@ -1,7 +1,18 @@
 
 import asyncio
 import unittest
-from cc_backend_lib.cache import cache, dict_cache, signature, identity_serializer
+import functools
+from unittest import mock
+from cc_backend_lib import metrics
+from cc_backend_lib.cache import cache, base_cache, dict_cache, signature, identity_serializer
+from .test_metrics import RecordingMetrics
+
+class UntaggedCache(base_cache.BaseCache):
+    def get(self, key):
+        raise AssertionError("Not called")
+
+    def set(self, key, val):
+        raise AssertionError("Not called")
 
 class TestCache(unittest.TestCase):
     def test_sig(self):
@@ -32,6 +43,45 @@ class TestCache(unittest.TestCase):
 
         self.assertEqual(called["n"], 3)
 
+    def test_call_shapes(self):
+        called = {"n": 0}
+
+        @cache.cache(dict_cache.DictCache, identity_serializer.IdentitySerializer)
+        def my_function(a, b = None, *args, **kwargs):
+            called["n"] += 1
+            return a
+
+        my_function(1)
+        my_function(1, None)
+        my_function(a = 1)
+        my_function(b = None, a = 1)
+        self.assertEqual(called["n"], 1)
+
+        my_function(1, 2)
+        my_function(1, 2, 3)
+        my_function(1, c = 3)
+        self.assertEqual(called["n"], 4)
+
+        my_function.prime(5, a = 5)
+        self.assertEqual(my_function(5, None), 5)
+        self.assertEqual(called["n"], 4)
+
+    def test_many(self):
+        c = dict_cache.DictCache()
+        c.set_name("fn")
+        c.set_many({"a": 1, "b": 2})
+        self.assertEqual([m.maybe(None, lambda x: x) for m in c.get_many(["a", "x", "b"])], [1, None, 2])
+        self.assertEqual(c.get("b").value, 2)
+
+    def test_expiry(self):
+        c = dict_cache.DictCache(expiry_time = 0)
+        c.set("a", 1)
+        self.assertFalse(c.get("a").is_just())
+
+        c = dict_cache.DictCache(expiry_time = 60)
+        c.set("a", 1)
+        self.assertEqual(c.get("a").value, 1)
+
     def test_conditional(self):
         called = {"n": 0}
 
@@ -62,3 +112,151 @@ class TestCache(unittest.TestCase):
 
         asyncio.run(_test())
         self.assertEqual(called["n"], 2)
+
+    def test_tags(self):
+        called = {"n": 0}
+
+        @cache.cache(dict_cache.DictCache, identity_serializer.IdentitySerializer,
+                tags = lambda shift, country: [f"shift:{shift}", f"country:{country}"])
+        def summary(shift, country):
+            called["n"] += 1
+            return (shift, country)
+
+        for shift, country in [(0,1), (0,2), (1,1), (1,2)]:
+            summary(shift, country)
+
+        self.assertEqual(summary.invalidate("country:1"), 2)
+        self.assertEqual(summary.invalidate("country:1"), 0)
+        summary(0,2)
+        summary(0,1)
+        self.assertEqual(called["n"], 5)
+
+        summary.delete(0, 2)
+        summary(0,2)
+        self.assertEqual(called["n"], 6)
+
+        self.assertEqual(summary.invalidate("shift:0"), 2)
+        summary(1,2)
+        self.assertEqual(called["n"], 6)
+
+    def test_tag_index(self):
+        c = dict_cache.DictCache()
+        c.set_tagged("a", 1, ["x", "y"])
+        c.set_tagged("b", 2, ["x"])
+        c.set_tagged("a", 3, ["y"])
+        self.assertEqual(c._tags, {"x": {"b"}, "y": {"a"}})
+
+        c.delete("b")
+        self.assertEqual(c._tags, {"y": {"a"}})
+        self.assertEqual(c.invalidate("y"), 1)
+        self.assertEqual((c._tags, c._key_tags), ({}, {}))
+
+        c = dict_cache.DictCache(expiry_time = 0)
+        c.set_tagged("a", 1, ["x"])
+        self.assertFalse(c.get("a").is_just())
+        self.assertEqual((c._tags, c._key_tags), ({}, {}))
+
+    def test_tags_unsupported(self):
+        called = {"n": 0}
+        with self.assertRaises(ValueError):
+            @cache.cache(UntaggedCache, identity_serializer.IdentitySerializer, tags = lambda a: [str(a)])
+            def my_function(a):
+                called["n"] += 1
+
+        self.assertEqual(called["n"], 0)
+
+    def test_redis_tags(self):
+        try:
+            import fakeredis
+            from cc_backend_lib.cache import redis_cache
+        except ImportError:
+            self.skipTest("fakeredis is not installed")
+
+        called = {"n": 0}
+        with mock.patch("redis.Redis", fakeredis.FakeRedis):
+            @cache.cache(functools.partial(redis_cache.RedisCache, "localhost", expiry_time = None),
+                    identity_serializer.IdentitySerializer,
+                    tags = lambda shift, country: [f"shift:{shift}", f"country:{country}"])
+            def summary(shift, country):
+                called["n"] += 1
+                return f"{shift},{country}"
+
+        for shift, country in [(0,1), (0,2), (1,1), (1,2)]:
+            summary(shift, country)
+
+        self.assertEqual(summary.invalidate("country:1"), 2)
+        self.assertEqual(summary.invalidate("country:1"), 0)
+        summary.delete(0, 2)
+        self.assertEqual(summary(1,2), "1,2")
+        self.assertEqual(called["n"], 4)
+
+        # Only (1,2) is left, in the index of each of its tags
+        client = fakeredis.FakeRedis(host = "localhost")
+        members = {k.decode(): {m.decode() for m in client.smembers(k)} for k in client.keys("summary#tags/*")}
+        self.assertEqual(set(members), {"summary#tags/shift:1", "summary#tags/country:2"})
+        self.assertTrue(all(len(m) == 1 for m in members.values()))
+        self.assertEqual(len(client.keys("summary#keytags/*")), 1)
+        client.flushall()
+
+    def test_redis_encoding(self):
+        try:
+            from cc_backend_lib.cache import redis_cache
+        except ImportError:
+            self.skipTest("redis is not installed")
+
+        # No connection is made until a command is sent
+        c = redis_cache.RedisCache("localhost", compress_threshold = 100, max_value_size = 200)
+        large = '{"features": [' + ", ".join(['{"a": 1}'] * 100) + "]}"
+        for value in ["{}", large, "\x00not compressed", "\x01raw"]:
+            stored = c._encode(value)
+            self.assertEqual(c._decode(stored), value)
+        self.assertTrue(len(c._encode(large)) < 200 < len(large))
+
+        # Values written without a header are read as they are
+        self.assertEqual(c._decode(b'{"a": 1}'), '{"a": 1}')
+
+        incompressible = bytes(range(256)).decode("latin-1")
+        self.assertIsNone(c._encode(incompressible))
+
+    def test_redis_round_trips(self):
+        try:
+            import fakeredis
+            from cc_backend_lib.cache import redis_cache
+        except ImportError:
+            self.skipTest("fakeredis is not installed")
+
+        with mock.patch("redis.Redis", fakeredis.FakeRedis):
+            c = redis_cache.RedisCache("round-trips", compress_threshold = 100, max_value_size = 200)
+        c.set_name("fn")
+        client = c._redis
+        large = '{"features": [' + ", ".join(['{"a": 1}'] * 100) + "]}"
+        incompressible = bytes(range(256)).decode("latin-1")
+
+        with mock.patch.object(client, "pipeline", wraps = client.pipeline) as pipeline:
+            c.set_many({"a": "{}", "b": large, "c": "\x01raw"})
+        self.assertEqual(pipeline.call_count, 1)
+
+        with mock.patch.object(client, "mget", wraps = client.mget) as mget:
+            values = c.get_many(["a", "x", "b", "c"])
+            self.assertEqual(c.get_many([]), [])
+        self.assertEqual(mget.call_count, 1)
+        self.assertEqual([v.maybe(None, lambda x: x) for v in values], ["{}", None, large, "\x01raw"])
+
+        # Short text is stored as it is, and header bytes mark the others
+        self.assertEqual(client.get("fn/a"), b"{}")
+        self.assertEqual(client.get("fn/b")[:1], b"\x00")
+        self.assertEqual(client.get("fn/c"), b"\x01\x01raw")
+        self.assertEqual(client.ttl("fn/a"), 10)
+
+        # Values that are too large replace what was cached with nothing
+        recorded = RecordingMetrics()
+        metrics.set_metrics(recorded)
+        try:
+            c.set("a", incompressible)
+            c.set_many({"b": incompressible, "c": "{}"})
+            c.set_tagged("c", incompressible, ["x"])
+        finally:
+            metrics.set_metrics(metrics.NullMetrics())
+        self.assertEqual(client.keys("fn*"), [])
+        self.assertEqual(recorded.counters[("cc_cache_skipped", (("function", "fn"), ("reason", "size")))], 3)
+        client.flushall()
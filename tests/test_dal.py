@@ -3,23 +3,27 @@ from toolz.functoolz import do, compose, curry
 from typing import Optional
 import asyncio
 import unittest
+import unittest.mock
+import aioresponses
 import datetime
 from geojson_pydantic import geometries
 from pymonad.either import Left, Right
 from cc_backend_lib import dal, models
-from cc_backend_lib.clients import predictions_client, scheduler_client, users_client, countries_client
+from cc_backend_lib.clients import predictions_client, scheduler_client, users_client, countries_client, country_registry
 from cc_backend_lib.errors import http_error
+from cc_backend_lib.cache import dict_cache
+from cc_backend_lib.summary_store import dict_summary_store
 
-def pred_feature(author_id: int, country_id: int):
+def pred_feature(author_id: int, country_id: int, date = datetime.date(1000,10,1)):
     return models.prediction.PredictionFeature(
-            geometry = geometries.Point(coordinates = [10,10]),
+            geometry = geometries.Point(type = "Point", coordinates = [10,10]),
             properties = {
                     "intensity": 0,
                     "confidence": 0,
                     "author": author_id,
                     "country": country_id,
-                    "date": "",
-                    "casualties": "yeehaw"
+                    "date": date,
+                    "casualties": {"lower": 1, "upper": 25}
                 }
         )
 
@@ -65,7 +69,7 @@ class TestSummaries(unittest.TestCase):
 
         async def country(id: int, *_,**__):
             return Right(models.country.Country(
-                    geometry = geometries.Point(coordinates = [10,10]),
+                    geometry = geometries.Point(type = "Point", coordinates = [10,10]),
                     properties = {
                         "gwno": id,
                         "name": str(id),
@@ -130,6 +134,113 @@ class TestSummaries(unittest.TestCase):
         self.assertTrue(res.is_right())
         self.assertEqual({usr.id for usr in res.value.users},{1,2})
 
+    def test_participants_compact(self):
+        res = asyncio.run(self.client.participants(compact = True))
+        self.assertTrue(res.is_right())
+        self.assertIsInstance(res.value, models.user.CompactUserList)
+        self.assertEqual(set(res.value.ids), {1,2})
+        self.assertEqual({usr.id for usr in res.value.to_user_list().users}, {1,2})
+
+        async def fail(id: int, *_, **__):
+            return Left(http_error.HttpError(http_code = 404, message = f"User {id} not found"))
+
+        self.users.detail = fail
+        res = asyncio.run(self.client.participants(compact = True))
+        self.assertTrue(res.is_left())
+        self.assertEqual(len(res.monoid[0].message.split("\n")), 2)
+
+    def test_participants_partial(self):
+        users = users_client.UsersClient("http://foo.bar.baz", entity_cache = dict_cache.DictCache())
+        client = dal.Dal(
+                predictions = self.predictions,
+                scheduler   = self.scheduler,
+                users       = users,
+                countries   = self.countries,
+            )
+
+        with aioresponses.aioresponses() as m:
+            m.get("/1/", payload = {"id": 1, "name": "1"})
+            m.get("/2/", status = 404, repeat = True)
+
+            res = asyncio.run(client.participants(partial = True))
+            self.assertTrue(res.is_right())
+            self.assertEqual([u.id for u in res.value.users], [1])
+            self.assertEqual(set(res.value.errors), {2})
+            self.assertEqual(res.value.errors[2].http_code, 404)
+            self.assertFalse(res.value.complete)
+
+            # Successes are cached, even when the whole fan-out fails
+            self.assertTrue(asyncio.run(client.participants()).is_left())
+            self.assertEqual({str(url): len(r) for (_, url), r in m.requests.items()},
+                    {"/1/": 1, "/2/": 2})
+
+        with self.assertRaises(ValueError):
+            asyncio.run(client.participants(compact = True, partial = True))
+
+    def test_participants_batch_cache(self):
+        class CountingCache(dict_cache.DictCache):
+            def __init__(self):
+                super().__init__()
+                self.calls = []
+
+            def get_many(self, keys):
+                self.calls.append(("get_many", len(keys)))
+                return super().get_many(keys)
+
+            def set_many(self, values):
+                self.calls.append(("set_many", len(values)))
+                return super().set_many(values)
+
+        for compact in (False, True):
+            cache = CountingCache()
+            client = dal.Dal(
+                    predictions = self.predictions,
+                    scheduler   = self.scheduler,
+                    users       = users_client.UsersClient("http://foo.bar.baz", entity_cache = cache),
+                    countries   = self.countries,
+                )
+
+            with aioresponses.aioresponses() as m:
+                m.get("/1/", payload = {"id": 1, "name": "1"})
+                m.get("/2/", payload = {"id": 2, "name": "2"})
+                for _ in range(2):
+                    users = asyncio.run(client.participants(compact = compact)).value
+                    self.assertEqual(sorted(u.id for u in (users if compact else users.users)), [1,2])
+            self.assertEqual(cache.calls, [("get_many", 2), ("set_many", 2), ("get_many", 2)])
+
+    def test_user_cache_deprecated(self):
+        cache = dict_cache.DictCache()
+        with self.assertWarns(DeprecationWarning):
+            client = dal.Dal(
+                    predictions = self.predictions,
+                    scheduler   = self.scheduler,
+                    users       = users_client.UsersClient("http://foo.bar.baz"),
+                    countries   = self.countries,
+                    user_cache  = cache,
+                )
+
+        with aioresponses.aioresponses() as m:
+            m.get("/1/", payload = {"id": 1, "name": "1"})
+            m.get("/2/", payload = {"id": 2, "name": "2"})
+            self.assertTrue(asyncio.run(client.participants()).is_right())
+            self.assertTrue(asyncio.run(client.participants()).is_right())
+
+        # Users are cached once, under the keys of the entity cache
+        self.assertEqual(sorted(cache._dict), ["UsersClient:http://foo.bar.baz/1/", "UsersClient:http://foo.bar.baz/2/"])
+
+    def test_compact_batches(self):
+        calls = []
+        details = self.users.details
+        async def counted(ids, *args, **kwargs):
+            calls.append(len(ids))
+            return await details(ids, *args, **kwargs)
+        self.users.details = counted
+
+        with unittest.mock.patch.object(dal, "COMPACT_BATCH_SIZE", 1):
+            users = asyncio.run(self.client.participants(compact = True)).value
+        self.assertEqual(sorted(u.id for u in users), [1,2])
+        self.assertEqual(calls, [1, 1])
+
     def test_participants_failure(self):
 
         async def fail(id: int, *_, **__):
@@ -146,3 +257,174 @@ class TestSummaries(unittest.TestCase):
         summary = asyncio.run(self.client.participant_summary()).value
         self.assertEqual({c.participants for c in summary.countries}, {2,1})
         self.assertEqual(summary.number_of_users, 2)
+
+    def test_country_registry(self):
+        calls = {"n": 0}
+        async def countries(*_, **__):
+            calls["n"] += 1
+            return Right(models.country.CountryPropertiesList(countries = [
+                {"gwno": 10, "name": "Ten"},
+                {"gwno": 12, "name": "Twelve"},
+                ]))
+
+        async def fail(*_, **__):
+            return Left(http_error.HttpError(http_code = 500))
+
+        self.countries.list = countries
+        self.countries.detail = fail
+        registry = country_registry.CountryRegistry(self.countries)
+        client = dal.Dal(
+                predictions = self.predictions,
+                scheduler   = self.scheduler,
+                users       = self.users,
+                countries   = self.countries,
+                country_registry = registry,
+            )
+
+        summary = asyncio.run(client.participant_summary()).value
+        self.assertEqual({c.name for c in summary.countries}, {"Ten", "Twelve"})
+        self.assertEqual({c.participants for c in summary.countries}, {2,1})
+
+        asyncio.run(client.participant_summary(country_id = 10))
+        self.assertEqual(calls["n"], 1)
+        self.assertIsNone(registry.get(10).value.participants)
+        self.assertTrue(registry.get(20).is_nothing())
+
+    def test_country_registry_missing(self):
+        async def countries(*_, **__):
+            return Right(models.country.CountryPropertiesList(countries = [{"gwno": 10, "name": "Ten"}]))
+
+        details = {"n": 0}
+        country = self.countries.detail
+        async def counted(id: int, *args, **kwargs):
+            details["n"] += 1
+            return await country(id, *args, **kwargs)
+
+        self.countries.list = countries
+        self.countries.detail = counted
+        registry = country_registry.CountryRegistry(self.countries)
+
+        # Countries added after the registry was loaded are fetched once
+        properties = asyncio.run(registry.properties([10, 12, 12])).value
+        self.assertEqual([p.name for p in properties], ["Ten", "12", "12"])
+        asyncio.run(registry.properties([12]))
+        self.assertEqual(details["n"], 1)
+        self.assertEqual(registry.get(12).value.name, "12")
+
+        async def fail(*_, **__):
+            return Left(http_error.HttpError(http_code = 404, message = "Not found"))
+
+        self.countries.detail = fail
+        missing = asyncio.run(registry.properties([10, 20]))
+        self.assertEqual(missing.monoid[0].http_code, 404)
+
+    def test_scoped(self):
+        calls = {"predictions": 0, "time_partition": 0}
+        def counted(name, fn):
+            async def inner(*args, **kwargs):
+                calls[name] += 1
+                return await fn(*args, **kwargs)
+            return inner
+
+        self.predictions.list = counted("predictions", self.predictions.list)
+        self.scheduler.time_partition = counted("time_partition", self.scheduler.time_partition)
+
+        async def page(client):
+            return await asyncio.gather(
+                    client.participants(0),
+                    client.participant_summary(0),
+                    client.participant_summary(0, 10))
+
+        participants, summary, country_summary = asyncio.run(page(self.client.scoped()))
+        self.assertEqual({usr.id for usr in participants.value.users},{1,2})
+        self.assertEqual(summary.value.number_of_users, 2)
+        self.assertEqual(country_summary.value.number_of_users, 2)
+        self.assertEqual(calls, {"predictions": 1, "time_partition": 1})
+
+        asyncio.run(page(self.client))
+        self.assertEqual(calls, {"predictions": 4, "time_partition": 4})
+
+    def test_participant_summaries(self):
+        calls = {"n": 0}
+        async def predictions(*_, **__):
+            calls["n"] += 1
+            return Right(models.prediction.PredFeatureCollection(features = [
+                pred_feature(1, 10, datetime.date(1000,10,1)),
+                pred_feature(2, 10, datetime.date(1000,10,1)),
+                pred_feature(2, 12, datetime.date(1000,12,10)),
+                pred_feature(3, 12, datetime.date(1000,7,1)),
+                pred_feature(3, 12, datetime.date(999,1,1)),
+                ]))
+
+        async def time_partition(shift: int, *_, **__):
+            start = datetime.date(1000,9,10) if shift == 0 else datetime.date(1000,6,10)
+            end = datetime.date(1000,12,10) if shift == 0 else datetime.date(1000,9,10)
+            return Right(models.time_partition.TimePartition(start = start, end = end, duration_months = 3))
+
+        self.predictions.list = predictions
+        self.scheduler.time_partition = time_partition
+
+        summaries = asyncio.run(self.client.participant_summaries([0, -1], [None, 10, 12]))
+        self.assertTrue(summaries.is_right())
+        summaries = summaries.value
+        self.assertEqual(calls["n"], 1)
+        self.assertEqual(len(summaries), 6)
+
+        self.assertEqual(summaries[(0, None)].number_of_users, 2)
+        self.assertEqual(summaries[(0, 10)].number_of_users, 2)
+        self.assertEqual(summaries[(0, 12)].number_of_users, 1)
+        self.assertEqual(summaries[(-1, None)].number_of_users, 1)
+        self.assertEqual(summaries[(-1, 10)].number_of_users, 0)
+        self.assertEqual(summaries[(-1, 10)].countries, [])
+        self.assertEqual(summaries[(0, 10)].countries[0].predictions, 2)
+        self.assertEqual(summaries[(0, None)].partition.start, datetime.date(1000,9,10))
+
+    def test_participant_summaries_approximate(self):
+        exact = asyncio.run(self.client.participant_summaries([0], [None, 10, 12])).value
+        approximate = asyncio.run(self.client.participant_summaries([0], [None, 10, 12], approximate = True)).value
+        self.assertEqual(exact, approximate)
+
+    def test_participant_summaries_scheduler_error(self):
+        async def fail(*_, **__):
+            return Left(http_error.HttpError(http_code = 500))
+
+        self.scheduler.time_partition = fail
+        summaries = asyncio.run(self.client.participant_summaries([0, -1]))
+        self.assertTrue(summaries.is_left())
+
+    def test_incremental_summary(self):
+        features = [pred_feature(1,10,datetime.date(1000,10,1)), pred_feature(2,12,datetime.date(1000,10,2))]
+        for i, feature in enumerate(features):
+            feature.id = i
+        requests = []
+
+        async def predictions(start_date = None, end_date = None, *_, **__):
+            requests.append(start_date)
+            return Right(models.prediction.PredFeatureCollection(features = [f for f in features if f.properties.date >= start_date]))
+
+        self.predictions.list = predictions
+        store = dict_summary_store.DictSummaryStore()
+        client = dal.Dal(
+                predictions   = self.predictions,
+                scheduler     = self.scheduler,
+                users         = self.users,
+                countries     = self.countries,
+                summary_store = store,
+            )
+
+        summary = asyncio.run(client.participant_summary()).value
+        self.assertEqual(summary.number_of_users, 2)
+
+        features.append(pred_feature(3,10,datetime.date(1000,10,2)))
+        features[-1].id = 2
+        features.append(pred_feature(1,10,datetime.date(1000,10,3)))
+        features[-1].id = 3
+
+        summary = asyncio.run(client.participant_summary()).value
+        self.assertEqual(summary.number_of_users, 3)
+        self.assertEqual({c.gwno: (c.predictions, c.participants) for c in summary.countries}, {10: (3, 2), 12: (1, 1)})
+
+        summary = asyncio.run(client.participant_summary(country_id = 12)).value
+        self.assertEqual(summary.number_of_users, 1)
+        self.assertEqual(requests, [datetime.date(1000,9,10), datetime.date(1000,10,2), datetime.date(1000,10,3)])
+        self.assertEqual(store.watermark(summary.partition), datetime.date(1000,10,3))
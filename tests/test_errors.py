@@ -0,0 +1,41 @@
+import datetime
+import unittest
+from pymonad.either import Left, Right
+from cc_backend_lib.errors import http_error
+from cc_backend_lib import helpers
+
+class TestHttpError(unittest.TestCase):
+    def test_combine(self):
+        errors = [
+                http_error.HttpError(http_code = 404, message = "a", time = datetime.datetime(2021,1,1)),
+                http_error.HttpError(http_code = 500, message = "b"),
+                http_error.HttpError(http_code = 403, message = "c", time = datetime.datetime(2021,1,2)),
+            ]
+        combined = http_error.HttpError.combine(errors)
+        self.assertEqual(combined.http_code, 500)
+        self.assertEqual(combined.message, "a\nb\nc")
+        self.assertEqual(combined.time, datetime.datetime(2021,1,2))
+        self.assertEqual(combined, errors[0] + errors[1] + errors[2])
+
+    def test_combine_http_errors(self):
+        self.assertEqual(helpers.combine_http_errors([Right(1), Right(2)]).value, [1,2])
+
+        result = helpers.combine_http_errors([
+            Right(1),
+            Left(http_error.HttpError(http_code = 404, message = "a")),
+            Left(http_error.HttpError(http_code = 500, message = "b")),
+            ])
+        self.assertTrue(result.is_left())
+        self.assertEqual(result.monoid[0].http_code, 500)
+        self.assertEqual(result.monoid[0].message, "a\nb")
+
+    def test_combine_keeps_url(self):
+        url = "http://foo.bar/users/1/"
+        error = http_error.HttpError(http_code = 404, message = "a", url = url)
+        self.assertIs(helpers.combine_http_errors([Right(1), Left(error)]).monoid[0], error)
+        self.assertEqual(str(helpers.combine_http_errors([Left(error)]).monoid[0].url), url)
+
+        other = http_error.HttpError(http_code = 500, message = "b", url = url)
+        self.assertEqual(str((error + other).url), url)
+        elsewhere = http_error.HttpError(http_code = 500, message = "b", url = "http://foo.bar/users/2/")
+        self.assertIsNone((error + elsewhere).url)
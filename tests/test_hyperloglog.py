@@ -0,0 +1,30 @@
+import unittest
+from cc_backend_lib import hyperloglog
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_count(self):
+        for n in (0, 1, 100, 20000):
+            hll = hyperloglog.HyperLogLog()
+            hll.update(range(n))
+            hll.update(range(n))
+            # Three standard errors
+            self.assertLessEqual(abs(len(hll) - n), max(3 * 0.0163 * n, 1))
+
+    def test_merge(self):
+        a, b, union = hyperloglog.HyperLogLog(), hyperloglog.HyperLogLog(), hyperloglog.HyperLogLog()
+        a.update(range(0, 3000))
+        b.update(range(2000, 5000))
+        union.update(range(0, 5000))
+        self.assertEqual(a | b, union)
+        a |= b
+        self.assertEqual(a, union)
+
+        with self.assertRaises(ValueError):
+            a.merge(hyperloglog.HyperLogLog(10))
+
+    def test_serialization(self):
+        hll = hyperloglog.HyperLogLog(10)
+        hll.update(range(500))
+        self.assertEqual(hyperloglog.HyperLogLog.from_bytes(hll.to_bytes()), hll)
+        with self.assertRaises(ValueError):
+            hyperloglog.HyperLogLog.from_bytes(hll.to_bytes()[:-1])
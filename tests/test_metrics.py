@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from collections import defaultdict
+from cc_backend_lib import metrics
+from cc_backend_lib.cache import cache, dict_cache, identity_serializer
+
+class RecordingMetrics(metrics.Metrics):
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.observations = defaultdict(list)
+
+    def increment(self, name, value = 1, **labels):
+        self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name, value, **labels):
+        self.observations[(name, tuple(sorted(labels.items())))].append(value)
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.recorded = RecordingMetrics()
+        metrics.set_metrics(self.recorded)
+
+    def tearDown(self):
+        metrics.set_metrics(metrics.NullMetrics())
+
+    def test_cache_metrics(self):
+        @cache.cache(dict_cache.DictCache, identity_serializer.IdentitySerializer, lambda a: a > 0)
+        def my_function(a):
+            return b"x" * a
+
+        my_function(1)
+        my_function(1)
+        my_function(2)
+        my_function(0)
+
+        function = ("function", "my_function")
+        self.assertEqual(self.recorded.counters[("cc_cache_requests", (function, ("result", "hit")))], 1)
+        self.assertEqual(self.recorded.counters[("cc_cache_requests", (function, ("result", "miss")))], 2)
+        self.assertEqual(self.recorded.counters[("cc_cache_requests", (function, ("result", "skip")))], 1)
+        self.assertEqual(self.recorded.observations[("cc_cache_payload_bytes", (function,))], [1, 2])
+
+    def test_compression_metrics(self):
+        try:
+            from cc_backend_lib.cache import redis_cache
+        except ImportError:
+            self.skipTest("redis is not installed")
+
+        c = redis_cache.RedisCache("localhost", compress_threshold = 10, max_value_size = 50)
+        c.set_name("f")
+        c._encode("a" * 100)
+        c._encode(bytes(range(100)))
+
+        function = ("function", "f")
+        ratios = self.recorded.observations[("cc_cache_compression_ratio", (function,))]
+        self.assertEqual(len(ratios), 2)
+        self.assertLess(ratios[0], 0.5)
+        self.assertEqual(self.recorded.counters[("cc_cache_skipped", (function, ("reason", "size")))], 1)
+
+    def test_timed(self):
+        @metrics.timed("my_seconds", method = "f")
+        async def f():
+            return 1
+
+        self.assertEqual(asyncio.run(f()), 1)
+        self.assertEqual(len(self.recorded.observations[("my_seconds", (("method", "f"),))]), 1)
+
+    def test_prometheus(self):
+        try:
+            import prometheus_client
+        except ImportError:
+            self.skipTest("prometheus_client is not installed")
+
+        registry = prometheus_client.CollectorRegistry()
+        prometheus = metrics.PrometheusMetrics(registry)
+        prometheus.increment("cc_test_requests", function = "f")
+        prometheus.increment("cc_test_requests", function = "f")
+        prometheus.observe("cc_test_seconds", 0.5, function = "f")
+
+        self.assertEqual(registry.get_sample_value("cc_test_requests_total", {"function": "f"}), 2)
+        self.assertEqual(registry.get_sample_value("cc_test_seconds_count", {"function": "f"}), 1)
+
+    def test_prometheus_buckets(self):
+        try:
+            import prometheus_client
+        except ImportError:
+            self.skipTest("prometheus_client is not installed")
+
+        registry = prometheus_client.CollectorRegistry()
+        prometheus = metrics.PrometheusMetrics(registry, buckets = {"cc_test_seconds": [1, 2]})
+        prometheus.observe("cc_test_response_bytes", 2000)
+        prometheus.observe("cc_test_compression_ratio", 0.25)
+        prometheus.observe("cc_test_seconds", 1.5)
+        prometheus.observe("cc_test_other_seconds", 0.007)
+
+        self.assertEqual(registry.get_sample_value("cc_test_response_bytes_bucket", {"le": "1024.0"}), 0)
+        self.assertEqual(registry.get_sample_value("cc_test_response_bytes_bucket", {"le": "4096.0"}), 1)
+        self.assertEqual(registry.get_sample_value("cc_test_compression_ratio_bucket", {"le": "0.2"}), 0)
+        self.assertEqual(registry.get_sample_value("cc_test_compression_ratio_bucket", {"le": "0.3"}), 1)
+        self.assertEqual(registry.get_sample_value("cc_test_seconds_bucket", {"le": "2.0"}), 1)
+        self.assertEqual(registry.get_sample_value("cc_test_other_seconds_bucket", {"le": "0.01"}), 1)
@@ -0,0 +1,67 @@
+import pickle
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import aioresponses
+from cc_backend_lib import offload, dal
+from cc_backend_lib.cache import dict_cache
+from cc_backend_lib.clients import predictions_client
+from . import test_dal
+
+FEATURE = {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [10, 10]},
+        "properties": {
+            "intensity": 0,
+            "confidence": 0,
+            "author": 1,
+            "country": 10,
+            "date": "2021-01-01",
+            "casualties": {"lower": 1, "upper": 25},
+        },
+    }
+
+class TestOffload(unittest.TestCase):
+    def test_threshold(self):
+        with ThreadPoolExecutor(1) as executor:
+            offloader = offload.Offloader(executor, threshold = 10)
+            small = asyncio.run(offloader.run(9, threading.get_ident))
+            large = asyncio.run(offloader.run(10, threading.get_ident))
+        self.assertEqual(small, threading.get_ident())
+        self.assertNotEqual(large, threading.get_ident())
+        self.assertFalse(offload.Offloader().offloads(10 ** 9))
+
+    def test_process_pool_deserialization(self):
+        payload = {"type": "FeatureCollection", "features": [FEATURE] * 20}
+        with ProcessPoolExecutor(1) as executor:
+            client = predictions_client.PredictionsClient("http://foo.bar", "predictions",
+                    executor = executor, offload_threshold = 0, entity_cache = dict_cache.DictCache())
+            with aioresponses.aioresponses() as m:
+                m.get("/predictions/", payload = payload)
+                m.get("/predictions/", status = 500)
+                predictions = asyncio.run(client.list())
+                failed = asyncio.run(client.list())
+
+        self.assertEqual(len(predictions.value.features), 20)
+        self.assertEqual(predictions.value.features[0].properties.country, 10)
+        self.assertTrue(failed.is_left())
+
+        # The executor and caches stay behind when pickled
+        self.assertIsNone(pickle.loads(pickle.dumps(client))._entity_cache)
+
+class TestOffloadedSummaries(test_dal.TestSummaries):
+    def setUp(self):
+        super().setUp()
+        self.executor = ThreadPoolExecutor(1)
+        self.client = dal.Dal(
+                predictions = self.predictions,
+                scheduler   = self.scheduler,
+                users       = self.users,
+                countries   = self.countries,
+                executor = self.executor,
+                offload_threshold = 0,
+            )
+
+    def tearDown(self):
+        self.executor.shutdown()
@@ -1,10 +1,20 @@
 import asyncio
+import datetime
 import unittest
 import aioresponses
 from geojson_pydantic import geometries
 from cc_backend_lib.clients import predictions_client
 from cc_backend_lib import models 
 
+PROPERTIES = {
+        "intensity": 1,
+        "confidence": 50,
+        "author": 1,
+        "country": 2,
+        "date": "2021-01-01",
+        "casualties": {"lower": 1, "upper": 25},
+    }
+
 class TestPredictionsApi(unittest.TestCase):
 
     def test_list_success(self):
@@ -16,7 +26,7 @@ class TestPredictionsApi(unittest.TestCase):
 
     def test_detail_success(self):
         with aioresponses.aioresponses() as m:
-            m.get("/shapes/1/", payload = models.prediction.PredictionFeature(properties = {}, geometry = geometries.Point(coordinates = [1,1])).dict())
+            m.get("/shapes/1/", payload = {"type": "Feature", "properties": PROPERTIES, "geometry": {"type": "Point", "coordinates": [1,1]}})
             client = predictions_client.PredictionsClient("http://foo.bar","shapes")
             result = asyncio.run(client.detail("1"))
             self.assertTrue(result.is_right())
@@ -42,3 +52,87 @@ class TestPredictionsApi(unittest.TestCase):
             result = asyncio.run(client.detail("1"))
             self.assertTrue(result.is_left())
             self.assertEqual(result.either(lambda x:x, lambda x:x).http_code, 404)
+
+    def test_conditional_request(self):
+        with aioresponses.aioresponses() as m:
+            m.get("/shapes/", payload = models.prediction.PredFeatureCollection(features = []).dict(), headers = {"ETag": '"abc"'})
+            m.get("/shapes/", status = 304)
+            client = predictions_client.PredictionsClient("http://foo.bar","shapes", conditional_requests = True)
+
+            first = asyncio.run(client.list())
+            second = asyncio.run(client.list())
+            self.assertTrue(second.is_right())
+            self.assertEqual(first.value, second.value)
+
+            revalidation = list(m.requests.values())[0][1]
+            self.assertEqual(revalidation.kwargs["headers"]["If-None-Match"], '"abc"')
+
+    def test_not_modified_copies(self):
+        feature = {"type": "Feature", "properties": PROPERTIES, "geometry": {"type": "Point", "coordinates": [1,1]}}
+        with aioresponses.aioresponses() as m:
+            m.get("/shapes/", payload = {"type": "FeatureCollection", "features": [feature]}, headers = {"ETag": '"abc"'})
+            m.get("/shapes/", status = 304)
+            m.get("/shapes/", status = 304)
+            client = predictions_client.PredictionsClient("http://foo.bar","shapes", conditional_requests = True)
+
+            first = asyncio.run(client.list()).value
+            first.features[0].properties.intensity = 2
+            first.features.clear()
+
+            second = asyncio.run(client.list()).value
+            self.assertEqual(second.features[0].properties.intensity, 1)
+            second.features[0].properties.intensity = 2
+
+            third = asyncio.run(client.list()).value
+            self.assertEqual(third.features[0].properties.intensity, 1)
+
+    def test_validators_bounded(self):
+        feature = {"type": "Feature", "properties": PROPERTIES, "geometry": {"type": "Point", "coordinates": [1,1]}}
+        with aioresponses.aioresponses() as m:
+            for name in ["1", "2", "1"]:
+                m.get(f"/shapes/{name}/", payload = feature, headers = {"ETag": f'"{name}"'})
+            client = predictions_client.PredictionsClient("http://foo.bar","shapes", conditional_requests = True, max_validators = 1)
+            for name in ["1", "2", "1"]:
+                self.assertTrue(asyncio.run(client.detail(name)).is_right())
+
+            # Validators of the first request were dropped for the second
+            requests = [r for rs in m.requests.values() for r in rs]
+            self.assertEqual([r.kwargs["headers"] for r in requests], [{}, {}, {}])
+            self.assertEqual(len(client._validators), 1)
+
+    def test_not_modified_without_validators(self):
+        with aioresponses.aioresponses() as m:
+            m.get("/shapes/", status = 304)
+            client = predictions_client.PredictionsClient("http://foo.bar","shapes", conditional_requests = True)
+            result = asyncio.run(client.list())
+            self.assertTrue(result.is_left())
+            self.assertEqual(result.either(lambda x:x, lambda x:x).http_code, 304)
+
+    def test_trusted(self):
+        feature = {
+                "type": "Feature",
+                "id": 1,
+                "geometry": {"type": "Point", "coordinates": [1, 1]},
+                "properties": PROPERTIES,
+            }
+        with aioresponses.aioresponses() as m:
+            m.get("/shapes/", payload = {"type": "FeatureCollection", "features": [feature]})
+            client = predictions_client.PredictionsClient("http://foo.bar","shapes", trusted = True)
+            result = asyncio.run(client.list())
+
+        self.assertTrue(result.is_right())
+        constructed = result.value.features[0]
+        self.assertIsInstance(constructed.geometry, geometries.Point)
+        self.assertEqual(constructed.properties["date"], datetime.date(2021,1,1))
+        self.assertEqual(constructed.properties["casualties"].upper, 25)
+        self.assertEqual(constructed.id, models.prediction.PredictionFeature(**feature).id)
+
+    def test_typed_properties(self):
+        feature = models.prediction.PredictionFeature(properties = PROPERTIES, geometry = geometries.Point(type = "Point", coordinates = [1,1]))
+        self.assertEqual(feature.properties.author, 1)
+        self.assertEqual(feature.properties["date"], datetime.date(2021,1,1))
+        with self.assertRaises(KeyError):
+            feature.properties["junk"]
+        for attribute in ["dict", "json", "copy", "__class__", "__fields__"]:
+            with self.assertRaises(KeyError):
+                feature.properties[attribute]
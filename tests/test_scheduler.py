@@ -0,0 +1,67 @@
+import asyncio
+import datetime
+import unittest
+import aioresponses
+from cc_backend_lib.clients import scheduler_client
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.client = scheduler_client.SchedulerClient("http://foo.bar", "schedule", cache_partitions = True, derive_shifts = True)
+        self.client._today = lambda: datetime.date(2021, 5, 1)
+
+    def test_shift_months(self):
+        cases = [
+                (datetime.date(2021,3,31), 3, datetime.date(2021,6,30)),
+                (datetime.date(2021,6,30), 3, datetime.date(2021,9,30)),
+                (datetime.date(2021,9,30), 3, datetime.date(2021,12,31)),
+                (datetime.date(2021,1,1), -3, datetime.date(2020,10,1)),
+                (datetime.date(2021,1,15), 1, datetime.date(2021,2,15)),
+            ]
+        for date, months, expected in cases:
+            self.assertEqual(scheduler_client.shift_months(date, months), expected)
+
+    def test_cached_and_derived(self):
+        with aioresponses.aioresponses() as m:
+            m.get("/schedule/?shift=0", payload = {"start": "2021-04-01", "end": "2021-06-30", "duration_months": 3})
+
+            current = asyncio.run(self.client.time_partition(0))
+            again = asyncio.run(self.client.time_partition(0))
+            previous = asyncio.run(self.client.time_partition(-1))
+
+            self.assertEqual(current.value, again.value)
+            self.assertEqual(previous.value.start, datetime.date(2021,1,1))
+            self.assertEqual(previous.value.end, datetime.date(2021,3,31))
+            self.assertEqual(sum(len(r) for r in m.requests.values()), 1)
+
+    def test_expiry(self):
+        with aioresponses.aioresponses() as m:
+            m.get("/schedule/?shift=0", payload = {"start": "2021-04-01", "end": "2021-06-30", "duration_months": 3})
+            m.get("/schedule/?shift=0", payload = {"start": "2021-07-01", "end": "2021-09-30", "duration_months": 3})
+
+            asyncio.run(self.client.time_partition(0))
+            self.client._today = lambda: datetime.date(2021, 7, 1)
+            current = asyncio.run(self.client.time_partition(0))
+            self.assertEqual(current.value.start, datetime.date(2021,7,1))
+
+    def test_boundary_day(self):
+        with aioresponses.aioresponses() as m:
+            m.get("/schedule/?shift=0", payload = {"start": "2021-04-01", "end": "2021-06-30", "duration_months": 3})
+            m.get("/schedule/?shift=0", payload = {"start": "2021-07-01", "end": "2021-09-30", "duration_months": 3})
+
+            asyncio.run(self.client.time_partition(0))
+            self.client._today = lambda: datetime.date(2021, 6, 30)
+            last_day = asyncio.run(self.client.time_partition(0))
+            self.assertEqual(last_day.value.end, datetime.date(2021,6,30))
+            self.assertEqual(sum(len(r) for r in m.requests.values()), 1)
+
+    def test_not_cached_by_default(self):
+        client = scheduler_client.SchedulerClient("http://foo.bar", "schedule")
+        with aioresponses.aioresponses() as m:
+            m.get("/schedule/?shift=0", payload = {"start": "2021-04-01", "end": "2021-06-30", "duration_months": 3}, repeat = True)
+            asyncio.run(client.time_partition(0))
+            asyncio.run(client.time_partition(0))
+            self.assertEqual(sum(len(r) for r in m.requests.values()), 2)
+
+    def test_derive_requires_cache(self):
+        with self.assertRaises(ValueError):
+            scheduler_client.SchedulerClient("http://foo.bar", "schedule", derive_shifts = True)
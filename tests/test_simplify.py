@@ -0,0 +1,56 @@
+import math
+import unittest
+from cc_backend_lib import models, simplify, spatial
+from cc_backend_lib.cache import dict_cache, pydantic_serializer
+
+def circle(points: int, radius: float = 2):
+    ring = [[math.cos(2 * math.pi * i / points) * radius, math.sin(2 * math.pi * i / points) * radius] for i in range(points)]
+    return ring + [ring[0]]
+
+def feature(id: int, ring):
+    return models.prediction.PredictionFeature(
+            id = id,
+            geometry = {"type": "Polygon", "coordinates": [ring]},
+            properties = {
+                    "intensity": 0,
+                    "confidence": 0,
+                    "author": 1,
+                    "country": 1,
+                    "date": "2021-01-01",
+                    "casualties": {"lower": 1, "upper": 25}
+                }
+        )
+
+class TestSimplify(unittest.TestCase):
+    def test_simplify_geometry(self):
+        line = {"type": "LineString", "coordinates": [[0, 0], [1, 0.01], [2, 0], [3, 5]]}
+        self.assertEqual(simplify.simplify_geometry(line, 0.1)["coordinates"], [[0, 0], [2, 0], [3, 5]])
+
+        polygon = simplify.simplify_geometry({"type": "Polygon", "coordinates": [circle(100)]}, 10)
+        ring = polygon["coordinates"][0]
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(ring[0], ring[-1])
+
+        point = {"type": "Point", "coordinates": [1, 2]}
+        self.assertEqual(simplify.simplify_geometry(point, 1), point)
+
+    def test_levels(self):
+        collection = models.prediction.PredFeatureCollection(features = [feature(1, circle(200)), feature(2, circle(50, 0.1))])
+        levels = simplify.levels(collection, [2, 6])
+        self.assertEqual(set(levels), {None, 2, 6})
+        self.assertEqual(levels[None].features[0].geometry, collection.features[0].geometry)
+
+        for level in levels.values():
+            self.assertEqual([f.bbox for f in level.features], [spatial.bbox(f.geometry) for f in collection.features])
+        self.assertLess(len(levels[2].features[0].geometry.coordinates[0]), len(levels[6].features[0].geometry.coordinates[0]))
+        self.assertLess(len(levels[6].features[0].geometry.coordinates[0]), 201)
+
+    def test_level_cache(self):
+        collection = models.prediction.PredFeatureCollection(features = [feature(1, circle(200))])
+        cache = simplify.LevelCache(dict_cache.DictCache(), pydantic_serializer.PydanticSerializer(models.prediction.PredFeatureCollection), [2, 6])
+        self.assertTrue(cache.get("a", 2).is_nothing())
+        cache.set("a", collection)
+
+        self.assertEqual([cache.level(z) for z in (None, 0, 2, 5, 6, 7)], [None, 2, 2, 6, 6, None])
+        self.assertEqual(len(cache.get("a").value.features[0].geometry.coordinates[0]), 201)
+        self.assertLess(len(cache.get("a", 3).value.features[0].geometry.coordinates[0]), 201)
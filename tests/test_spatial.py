@@ -0,0 +1,53 @@
+import random
+import unittest
+from geojson_pydantic import geometries
+from cc_backend_lib import models, spatial
+
+def square(x: float, y: float, size: float = 1):
+    return {"type": "Polygon", "coordinates": [[[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]]}
+
+def feature(id: int, geometry):
+    return models.prediction.PredictionFeature(
+            id = id,
+            geometry = geometry,
+            properties = {
+                    "intensity": 0,
+                    "confidence": 0,
+                    "author": 1,
+                    "country": 1,
+                    "date": "2021-01-01",
+                    "casualties": {"lower": 1, "upper": 25}
+                }
+        )
+
+class TestSpatial(unittest.TestCase):
+    def test_bbox(self):
+        self.assertEqual(spatial.bbox(square(1, 2)), (1, 2, 2, 3))
+        self.assertEqual(spatial.bbox(geometries.Point(type = "Point", coordinates = [3, 4])), (3, 4, 3, 4))
+        self.assertEqual(spatial.bbox({"type": "MultiPolygon", "coordinates": [square(0,0)["coordinates"], square(5,5)["coordinates"]]}), (0, 0, 6, 6))
+
+    def test_contains_point(self):
+        donut = {"type": "Polygon", "coordinates": [square(0, 0, 3)["coordinates"][0], square(1, 1)["coordinates"][0]]}
+        self.assertTrue(spatial.contains_point(donut, 0.5, 0.5))
+        self.assertFalse(spatial.contains_point(donut, 1.5, 1.5))
+        self.assertFalse(spatial.contains_point(donut, 4, 4))
+
+    def test_query(self):
+        rng = random.Random(0)
+        features = [feature(i, square(rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(0.1, 3))) for i in range(500)]
+        index = spatial.SpatialIndex.from_features(features, node_capacity = 4)
+        self.assertEqual(len(index), 500)
+
+        for _ in range(50):
+            x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+            box = (x, y, x + rng.uniform(0, 10), y + rng.uniform(0, 10))
+            expected = {f.id for f in features if spatial._intersects(spatial.bbox(f.geometry), box)}
+            self.assertEqual({f.id for f in index.query(box)}, expected)
+
+            expected = {f.id for f in features if spatial.contains_point(f.geometry, x, y)}
+            self.assertEqual({f.id for f in index.query_point(x, y)}, expected)
+
+    def test_empty(self):
+        index = spatial.SpatialIndex.from_features([])
+        self.assertEqual(index.query((0, 0, 1, 1)), [])
+        self.assertEqual(index.query_point(0, 0), [])
@@ -0,0 +1,96 @@
+import datetime
+import unittest
+from unittest import mock
+from cc_backend_lib import models, aggregation
+from cc_backend_lib.summary_store import dict_summary_store
+from .test_dal import pred_feature
+
+PARTITION = models.time_partition.TimePartition(
+        start = datetime.date(1000,9,10),
+        end = datetime.date(1000,12,10),
+        duration_months = 3)
+
+def features():
+    features = [
+            pred_feature(1, 10, datetime.date(1000,10,3)),
+            pred_feature(2, 10, datetime.date(1000,10,1)),
+            pred_feature(1, 12, datetime.date(1000,10,2)),
+            pred_feature(3, 10, datetime.date(1000,10,2)),
+            pred_feature(3, 14, datetime.date(1000,10,1)),
+        ]
+    for i, feature in enumerate(features):
+        feature.id = i
+    return features
+
+class TestSummaryStore(unittest.TestCase):
+    def assert_ingests(self, store):
+        self.assertIsNone(store.watermark(PARTITION))
+        store.ingest(PARTITION, features()[:3])
+        store.ingest(PARTITION, features())
+        store.ingest(PARTITION, [])
+
+        self.assertEqual(store.watermark(PARTITION), datetime.date(1000,10,3))
+        tallies = store.tallies(PARTITION)
+        self.assertEqual({gwno: t.predictions for gwno, t in tallies.items()}, {10: 3, 12: 1, 14: 1})
+        self.assertEqual(tallies[10].authors, {1, 2, 3})
+
+    def test_dict_summary_store(self):
+        self.assert_ingests(dict_summary_store.DictSummaryStore())
+
+    def test_redis_summary_store(self):
+        try:
+            import fakeredis
+            from cc_backend_lib.summary_store import redis_summary_store
+        except ImportError:
+            self.skipTest("fakeredis is not installed")
+
+        with mock.patch("redis.Redis", fakeredis.FakeRedis):
+            store = redis_summary_store.RedisSummaryStore("summary-store", expiry_time = 60, batch_size = 2)
+
+        calls = []
+        ingest = store._ingest
+        def recorded(keys, args):
+            calls.append((keys, args))
+            return ingest(keys = keys, args = args)
+        store._ingest = recorded
+
+        self.assert_ingests(store)
+
+        # Batches of two predictions, with the watermark moved by the last
+        self.assertEqual([len(args[3:]) // 4 for _, args in calls], [2, 1, 2, 2, 1])
+        self.assertEqual([args[1] for _, args in calls], ["", "1000-10-03", "", "", "1000-10-03"])
+
+        # The script only touches the keys it is passed, which share a hash tag
+        client = fakeredis.FakeRedis(host = "summary-store")
+        declared = {key for keys, _ in calls for key in keys}
+        stored = {key.decode() for key in client.keys("*")}
+        self.assertTrue(stored <= declared)
+        self.assertTrue(all("{1000-09-10/1000-12-10}" in key for key in stored))
+        self.assertTrue(all(0 < client.ttl(key) <= 60 for key in stored))
+        client.flushall()
+
+    def test_redis_summary_store_approximate(self):
+        try:
+            import fakeredis
+            from cc_backend_lib.summary_store import redis_summary_store
+        except ImportError:
+            self.skipTest("fakeredis is not installed")
+
+        with mock.patch("redis.Redis", fakeredis.FakeRedis):
+            store = redis_summary_store.RedisSummaryStore("summary-store-hll", approximate = True)
+        store.ingest(PARTITION, features())
+        store.ingest(PARTITION, features())
+
+        tallies = store.tallies(PARTITION)
+        self.assertEqual({gwno: (t.predictions, len(t.authors)) for gwno, t in tallies.items()}, {10: (3, 3), 12: (1, 1), 14: (1, 1)})
+
+        # Unions are counted by Redis, across the HyperLogLogs of each country
+        properties = {gwno: models.country.CountryProperties(gwno = gwno, name = str(gwno)) for gwno in tallies}
+        self.assertEqual(aggregation.participation_summary(tallies, PARTITION, properties).number_of_users, 3)
+        self.assertEqual(len(tallies[12].authors | tallies[14].authors), 2)
+        self.assertEqual(len(tallies[12].authors), 1)
+
+        client = fakeredis.FakeRedis(host = "summary-store-hll")
+        self.assertEqual(client.keys("*authors/*"), [])
+        self.assertEqual(len(client.keys("*authors_hll/*")), 3)
+        client.flushall()
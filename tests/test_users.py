@@ -0,0 +1,123 @@
+import json
+import asyncio
+import unittest
+import aioresponses
+from cc_backend_lib.clients import users_client, countries_client
+from cc_backend_lib import models
+from cc_backend_lib.cache import dict_cache
+
+USER = {
+        "id": 1,
+        "name": "Jane",
+        "email": "jane@example.com",
+        "date_joined": "2021-01-01T00:00:00",
+        "last_login": "not a date",
+        "submitted_metadata": {"a": "b"},
+        "has_signed_waiver": True,
+    }
+
+class TestUsers(unittest.TestCase):
+    def test_anonymize_detail(self):
+        for trusted in (False, True):
+            client = users_client.UsersClient("http://foo.bar", "users", anonymize = True, trusted = trusted)
+            user = client.deserialize_detail(json.dumps(USER).encode())
+            self.assertTrue(user.is_right())
+            self.assertFalse(user.value.identifiable)
+            self.assertEqual(user.value.id, 1)
+            self.assertTrue(user.value.has_signed_waiver)
+
+        # Identifiable fields are validated when not anonymizing
+        client = users_client.UsersClient("http://foo.bar", "users")
+        self.assertTrue(client.deserialize_detail(json.dumps(USER).encode()).is_left())
+
+    def test_anonymize_list(self):
+        data = json.dumps({"users": [{"id": i, "name": str(i), "email": f"{i}@x"} for i in range(3)]}).encode()
+
+        users = users_client.UsersClient("http://foo.bar", "users", anonymize = True).deserialize_list(data).value
+        self.assertFalse(users.identifiable)
+        self.assertEqual([u.id for u in users.users], [0,1,2])
+        self.assertTrue(all(u.name is None and u.email is None for u in users.users))
+
+        users = users_client.UsersClient("http://foo.bar", "users").deserialize_list(data).value
+        self.assertTrue(users.identifiable)
+        users.scrub()
+        self.assertFalse(users.identifiable)
+        self.assertFalse(any(u.identifiable for u in users.users))
+
+    def test_compact(self):
+        users = models.user.CompactUserList.from_users([models.user.UserListed(id = 1), models.user.UserListed(id = 2, name = "b")])
+        self.assertEqual(len(users), 2)
+        self.assertEqual(users[1].name, "b")
+        self.assertIsNone(users[0].name)
+        self.assertIsNone(users.emails)
+        self.assertTrue(users.identifiable)
+        users.scrub()
+        self.assertFalse(users.identifiable)
+        self.assertEqual([u.id for u in users.to_user_list().users], [1,2])
+
+    def test_entity_cache(self):
+        client = users_client.UsersClient("http://foo.bar", "users", anonymize = True, entity_cache = dict_cache.DictCache())
+        with aioresponses.aioresponses() as m:
+            m.get("/users/1/", payload = USER)
+            m.get("/users/2/", payload = {**USER, "id": 2})
+            m.get("/users/3/", status = 404)
+
+            first = asyncio.run(client.detail(1))
+            users = asyncio.run(client.details([1, 2, 3]))
+            self.assertEqual(first.value.id, 1)
+            self.assertEqual([u.value.id for u in users[:2]], [1, 2])
+            self.assertTrue(users[2].is_left())
+
+            # Cached users are anonymized when deserialized, and failures are not cached
+            m.get("/users/3/", payload = {**USER, "id": 3})
+            users = asyncio.run(client.details([1, 2, 3]))
+            self.assertEqual([u.value.id for u in users], [1, 2, 3])
+            self.assertFalse(any(u.value.identifiable for u in users))
+            self.assertEqual(sum(len(r) for r in m.requests.values()), 4)
+
+    def test_entity_cache_round_trips(self):
+        calls = {"get": 0, "get_many": 0, "set": 0, "set_many": 0}
+
+        class CountingCache(dict_cache.DictCache):
+            def get(self, key):
+                calls["get"] += 1
+                return super().get(key)
+
+            def get_many(self, keys):
+                calls["get_many"] += 1
+                return [dict_cache.DictCache.get(self, key) for key in keys]
+
+            def set_many(self, values):
+                calls["set_many"] += 1
+                for key, val in values.items():
+                    dict_cache.DictCache.set(self, key, val)
+
+        client = users_client.UsersClient("http://foo.bar", "users", anonymize = True, entity_cache = CountingCache())
+        with aioresponses.aioresponses() as m:
+            for id in (1, 2, 3):
+                m.get(f"/users/{id}/", payload = {**USER, "id": id})
+            users = asyncio.run(client.details([1, 2, 3]))
+            self.assertEqual([u.value.id for u in users], [1, 2, 3])
+            self.assertEqual(calls, {"get": 0, "get_many": 1, "set": 0, "set_many": 1})
+
+            asyncio.run(client.details([1, 2, 3]))
+            self.assertEqual(calls, {"get": 0, "get_many": 2, "set": 0, "set_many": 1})
+
+    def test_entity_cache_shared(self):
+        shared = dict_cache.DictCache()
+        users = users_client.UsersClient("http://foo.bar", anonymize = True, entity_cache = shared)
+        countries = countries_client.CountriesClient("http://foo.bar", entity_cache = shared)
+        country = {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [10, 10]},
+                "properties": {"gwno": 1, "name": "1", "iso2c": "1"},
+            }
+        with aioresponses.aioresponses() as m:
+            m.get("/1/", payload = USER)
+            m.get("/1/", payload = country)
+            self.assertEqual(asyncio.run(users.detail(1)).value.id, 1)
+            self.assertEqual(asyncio.run(countries.detail(1)).value.properties.gwno, 1)
+            # Both are served from the cache, without overwriting each other
+            self.assertEqual(asyncio.run(users.detail(1)).value.id, 1)
+            self.assertEqual(asyncio.run(countries.detail(1)).value.properties.gwno, 1)
+            self.assertEqual(sum(len(r) for r in m.requests.values()), 2)
@@ -0,0 +1,132 @@
+import asyncio
+import datetime
+import unittest
+from typing import Optional
+from geojson_pydantic import geometries
+from pymonad.either import Left, Right
+from cc_backend_lib import dal, models, warmer
+from cc_backend_lib.clients import predictions_client, scheduler_client, users_client, countries_client
+from cc_backend_lib.cache import cache, dict_cache, identity_serializer
+from cc_backend_lib.errors import http_error
+from .test_dal import pred_feature
+
+class FixedLock(warmer.BaseLock):
+    def __init__(self, held: bool):
+        self.held = held
+
+    def acquire(self) -> bool:
+        return self.held
+
+    def release(self) -> None:
+        self.held = False
+
+class TestWarmer(unittest.TestCase):
+    def setUp(self):
+        self.requests = {"predictions": 0}
+
+        async def predictions(country: Optional[int] = None, *_, **__):
+            self.requests["predictions"] += 1
+            features = [pred_feature(1,10), pred_feature(2,10), pred_feature(2,12)]
+            if country is not None:
+                features = [f for f in features if f.properties.country == country]
+            return Right(models.prediction.PredFeatureCollection(features = features))
+
+        async def time_partition(shift: int, *_, **__):
+            return Right(models.time_partition.TimePartition(
+                start = datetime.date(1000,9,10) + datetime.timedelta(days = 100 * shift),
+                end = datetime.date(1000,12,10) + datetime.timedelta(days = 100 * shift),
+                duration_months = 3))
+
+        async def country(id: int, *_, **__):
+            return Right(models.country.Country(
+                    geometry = geometries.Point(type = "Point", coordinates = [10,10]),
+                    properties = {"gwno": id, "name": str(id), "iso2c": str(id)}))
+
+        clients = {
+                "predictions": predictions_client.PredictionsClient("http://foo.bar.baz"),
+                "scheduler": scheduler_client.SchedulerClient("http://foo.bar.baz"),
+                "users": users_client.UsersClient("http://foo.bar.baz"),
+                "countries": countries_client.CountriesClient("http://foo.bar.baz"),
+            }
+        clients["predictions"].list = predictions
+        clients["scheduler"].time_partition = time_partition
+        clients["countries"].detail = country
+        self.dal = dal.Dal(**clients)
+
+    def test_summaries_job(self):
+        called = {"n": 0}
+
+        @cache.cache(dict_cache.DictCache, identity_serializer.IdentitySerializer)
+        async def summary(shift, country_id = None):
+            called["n"] += 1
+            return await self.dal.participant_summary(shift, country_id)
+
+        job = warmer.summaries_job(self.dal, lambda shift, country_id, s: summary.prime(Right(s), shift, country_id))
+        stored = asyncio.run(warmer.CacheWarmer([job], interval = 60).warm())
+        self.assertEqual(stored, 1)
+
+        # One request for both shifts, shared between looking up countries and summarizing
+        self.assertEqual(self.requests["predictions"], 1)
+
+        # All predictions are in shift 0
+        for (shift, country_id), users in {(0, None): 2, (0, 10): 2, (0, 12): 1, (-1, None): 0, (-1, 10): 0, (-1, 12): 0}.items():
+            self.assertEqual(asyncio.run(summary(shift, country_id)).value.number_of_users, users)
+
+        # Primed results are found however the hot path passes the arguments
+        self.assertEqual(asyncio.run(summary(0)).value.number_of_users, 2)
+        self.assertEqual(asyncio.run(summary(shift = -1)).value.number_of_users, 0)
+        self.assertEqual(asyncio.run(summary(shift = 0, country_id = 12)).value.number_of_users, 1)
+        self.assertEqual(called["n"], 0)
+
+    def test_predictions_job(self):
+        stored = {}
+        job = warmer.predictions_job(self.dal, lambda shift, country_id, p: stored.update({(shift, country_id): p}), shifts = [0])
+        self.assertEqual(asyncio.run(job()).value, 3)
+        self.assertEqual(self.requests["predictions"], 1)
+        self.assertEqual({k: len(v.features) for k, v in stored.items()}, {(0, None): 3, (0, 10): 2, (0, 12): 1})
+
+    def test_failures_and_lock(self):
+        async def failing():
+            raise RuntimeError("Upstream down")
+
+        async def left():
+            return Left(http_error.HttpError(http_code = 500, message = "Error"))
+
+        ran = []
+        async def succeeding():
+            ran.append(True)
+
+        jobs = [failing, left, succeeding]
+        self.assertEqual(asyncio.run(warmer.CacheWarmer(jobs, interval = 60, lock = FixedLock(True)).warm()), 1)
+        self.assertIsNone(asyncio.run(warmer.CacheWarmer(jobs, interval = 60, lock = FixedLock(False)).warm()))
+        self.assertEqual(len(ran), 1)
+
+    def test_concurrency(self):
+        running = {"now": 0, "max": 0}
+
+        async def job():
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+
+        warm = warmer.CacheWarmer([job] * 10, interval = 60, concurrency = 3)
+        self.assertEqual(asyncio.run(warm.warm()), 10)
+        self.assertEqual(running["max"], 3)
+
+    def test_start_stop(self):
+        ran = []
+        async def job():
+            ran.append(True)
+
+        async def run():
+            lock = FixedLock(True)
+            warm = warmer.CacheWarmer([job], interval = 0.01, jitter = 0.5, lock = lock)
+            warm.start()
+            await asyncio.sleep(0.1)
+            await warm.stop()
+            return lock
+
+        lock = asyncio.run(run())
+        self.assertGreater(len(ran), 2)
+        self.assertFalse(lock.held)